@@ -0,0 +1,177 @@
+import os
+import struct
+
+import numpy as np
+import pytest
+
+# Small rosbags written with the mcap format (chunked or not) for the tests of the bag readers
+
+mcap_magic = b'\x89MCAP0\r\n'
+
+header_definitions = """
+================================================================================
+MSG: std_msgs/Header
+builtin_interfaces/Time stamp
+string frame_id
+================================================================================
+MSG: builtin_interfaces/Time
+int32 sec
+uint32 nanosec
+"""
+
+mcap_schemas = {
+    # Fixed size (bulk decoded)
+    "test_msgs/msg/Sample": "std_msgs/Header header\nfloat64 value\nint32 index\nfloat32[3] vector"
+                            + header_definitions,
+    # Variable size (deserialized one by one)
+    "test_msgs/msg/Text": "# comment\nuint8 INFO=20\nstd_msgs/Header header\nuint8 level\nstring text\n"
+                          "float32[] values" + header_definitions,
+}
+
+mcap_topics = {"/sample": "test_msgs/msg/Sample", "/text": "test_msgs/msg/Text"}
+
+
+def record(opcode, content):
+    return struct.pack('<BQ', opcode, len(content)) + content
+
+
+def string(value):
+    data = value.encode('utf-8')
+    return struct.pack('<I', len(data)) + data
+
+
+class CdrWriter(object):
+    # Little endian CDR, alignment relative to the end of the encapsulation header
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def write(self, fmt, *values):
+        self.buffer += b'\x00' * (-len(self.buffer) % min(struct.calcsize(fmt.lstrip('0123456789')), 8))
+        self.buffer += struct.pack('<' + fmt, *values)
+
+    def write_string(self, value):
+        data = value.encode('utf-8') + b'\x00'
+        self.write('I', len(data))
+        self.buffer += data
+
+    def write_header(self, t, frame_id):
+        self.write('i', t // 1000000000)
+        self.write('I', t % 1000000000)
+        self.write_string(frame_id)
+
+    def get_payload(self):
+        return b'\x00\x01\x00\x00' + bytes(self.buffer) + b'\x00' * (-len(self.buffer) % 4)
+
+
+def get_sample(i, t, frame_id="base_link"):
+    writer = CdrWriter()
+    writer.write_header(t, frame_id)
+    writer.write('d', 0.5 * i)
+    writer.write('i', i)
+    writer.write('3f', i, 2 * i, 3 * i)
+    return writer.get_payload()
+
+
+def get_text(i, t):
+    writer = CdrWriter()
+    writer.write_header(t, "")
+    writer.write('B', 20)
+    writer.write_string("message " * (i % 4))
+    writer.write('I', i % 3)
+    for k in range(i % 3):
+        writer.write('f', k)
+    return writer.get_payload()
+
+
+def get_messages(nb_messages=3000, t0=1700000000 * 1000000000, dt=100000000):
+    # (topic, log time, payload) in recording order: a text message every 10 samples
+    messages = []
+    for i in range(nb_messages):
+        t = t0 + i * dt
+        messages.append(("/sample", t, get_sample(i, t, "base_link" if i % 500 < 250 else "gps")))
+        if i % 10 == 0:
+            messages.append(("/text", t + 1, get_text(i, t + 1)))
+    return messages
+
+
+def compress(data, compression):
+    if compression == "zstd":
+        import zstandard
+        return zstandard.ZstdCompressor().compress(data)
+    elif compression == "lz4":
+        import lz4.frame
+        return lz4.frame.compress(data)
+    return data
+
+
+def write_mcap(file_path, messages, chunk_size=None, summary=True, compression=""):
+    # Messages in chunks of chunk_size messages (written outside of chunks if None), summary with the chunk indexes
+    # and the statistics
+    schema_ids = {name: i + 1 for i, name in enumerate(mcap_schemas)}
+    channel_ids = {topic: i + 1 for i, topic in enumerate(mcap_topics)}
+    definitions = b''.join(record(0x03, struct.pack('<H', schema_ids[name]) + string(name) + string("ros2msg")
+                                  + struct.pack('<I', len(text)) + text.encode('utf-8'))
+                           for name, text in mcap_schemas.items())
+    definitions += b''.join(record(0x04, struct.pack('<HH', channel_ids[topic], schema_ids[type_name])
+                                   + string(topic) + string("cdr") + struct.pack('<I', 0))
+                            for topic, type_name in mcap_topics.items())
+    message_records = [record(0x05, struct.pack('<HIQQ', channel_ids[topic], sequence, t, t) + data)
+                       for sequence, (topic, t, data) in enumerate(messages)]
+
+    data = bytearray(mcap_magic + record(0x01, string("ros2") + string("test")) + definitions)
+    chunk_indexes = []
+    if chunk_size is None:
+        data += b''.join(message_records)
+    else:
+        for k in range(0, len(messages), chunk_size):
+            records = b''.join(message_records[k:k + chunk_size])
+            times = [t for _, t, _ in messages[k:k + chunk_size]]
+            channels = sorted({channel_ids[topic] for topic, _, _ in messages[k:k + chunk_size]})
+            compressed = compress(records, compression)
+            content = struct.pack('<QQQI', min(times), max(times), len(records), 0) + string(compression) \
+                + struct.pack('<Q', len(compressed)) + compressed
+            chunk_indexes.append(struct.pack('<QQQQ', min(times), max(times), len(data), 9 + len(content))
+                                 + struct.pack('<I', 10 * len(channels))
+                                 + b''.join(struct.pack('<HQ', channel_id, 0) for channel_id in channels)
+                                 + struct.pack('<Q', 0) + string(compression) + struct.pack('<QQ', len(compressed), len(records)))
+            data += record(0x06, content)
+    data += record(0x0F, struct.pack('<QI', 0, 0))
+
+    summary_start = 0
+    if summary:
+        summary_start = len(data)
+        data += definitions
+        data += b''.join(record(0x08, chunk_index) for chunk_index in chunk_indexes)
+        counts = {channel_id: sum(1 for topic, _, _ in messages if channel_ids[topic] == channel_id)
+                  for channel_id in channel_ids.values()}
+        times = [t for _, t, _ in messages]
+        data += record(0x0B, struct.pack('<QHIIII', len(messages), len(mcap_schemas), len(mcap_topics), 0, 0,
+                                         len(chunk_indexes))
+                       + struct.pack('<QQ', min(times), max(times)) + struct.pack('<I', 10 * len(counts))
+                       + b''.join(struct.pack('<HQ', channel_id, count) for channel_id, count in counts.items()))
+    data += record(0x02, struct.pack('<QQI', summary_start, 0, 0)) + mcap_magic
+
+    with open(file_path, 'wb') as file:
+        file.write(data)
+
+
+@pytest.fixture
+def mcap_bag(tmp_path):
+    # Factory of rosbags (folder with a single mcap file), returns the path of the bag and the messages written
+    def make_bag(chunk_size=1000, summary=True, nb_messages=3000, name="bag"):
+        bag_path = str(tmp_path / name)
+        os.makedirs(bag_path)
+        messages = get_messages(nb_messages)
+        write_mcap(os.path.join(bag_path, name + "_0.mcap"), messages, chunk_size, summary)
+        return bag_path, messages
+    return make_bag
+
+
+@pytest.fixture
+def expected_messages():
+    # Payloads and time of the messages of a topic in a time window (start excluded, end included)
+    def get_expected(messages, topic, start_time=None, end_time=None):
+        selected = [(data, t) for name, t, data in messages if name == topic
+                    and (start_time is None or t > start_time) and (end_time is None or t <= end_time)]
+        return [data for data, _ in selected], np.array([t for _, t in selected], dtype='int64')
+    return get_expected
@@ -4,6 +4,8 @@ import time
 from datetime import datetime, timedelta
 
 class SeafoilDB:
+    # Columns of the statistics table (speeds in m/s)
+    statistics_columns = ["v500", "v1850", "vmax", "vjibe", "vhour", "v2s", "v10s", "v5x10s", "alpha500"]
 
     def __init__(self):
         # Get home folder
@@ -70,9 +72,20 @@ class SeafoilDB:
             v1850 REAL,
             vmax REAL,
             vjibe REAL,
-            vhour REAL
+            vhour REAL,
+            v2s REAL,
+            v10s REAL,
+            v5x10s REAL,
+            alpha500 REAL
         )''')
 
+        # Columns added to the statistics table of previous versions
+        self.sqliteCursor.execute('''PRAGMA table_info(statistics)''')
+        columns = [column['name'] for column in self.sqliteCursor.fetchall()]
+        for column in self.statistics_columns:
+            if column not in columns:
+                self.sqliteCursor.execute(f'''ALTER TABLE statistics ADD COLUMN {column} REAL''')
+
         # Create table for session
         self.sqliteCursor.execute('''CREATE TABLE IF NOT EXISTS session
         (
@@ -503,7 +516,7 @@ class SeafoilDB:
 
     # Add new log file to the database if it does not exist and return the id
     # type = 0 for rosbag, 1 for gpx
-    def insert_log(self, name, starting_time, ending_time=None, type='rosbag'):
+    def insert_log(self, name, starting_time, ending_time=None, type='rosbag', commit=True):
         # Test if the log file is already in the database and return the id if it is
         self.sqliteCursor.execute('''SELECT * FROM log WHERE name = ?''', (name,))
         row = self.sqliteCursor.fetchone()
@@ -514,10 +527,44 @@ class SeafoilDB:
         type_id = self.convert_log_type_from_str(type)
 
         self.sqliteCursor.execute('''INSERT INTO log (name, starting_time, ending_time, type) VALUES (?, ?, ?, ?)''', (name, starting_time, ending_time, type_id))
-        self.sqliteConnection.commit()
+        if commit:
+            self.sqliteConnection.commit()
         # Return the if of the last inserted row, is_download = False, is_new = True
         return self.sqliteCursor.lastrowid, False, True
 
+    # Directory of the log files (folder of the rosbag, or gpx file)
+    def get_log_directory(self, id, file_name):
+        ret = self.projet_folder + '/log/' + str(id) + '/' + file_name
+        if not file_name.endswith('.gpx'):
+            ret += "/"
+        return ret
+
+    # Get the logs (with the statistics id) filtered by ids, rider and starting time
+    def get_logs_filtered(self, log_ids=None, rider_id=None, starting_time=None, ending_time=None):
+        conditions = []
+        parameters = []
+        if log_ids is not None:
+            conditions.append('log.id IN (' + ','.join('?' * len(log_ids)) + ')')
+            parameters += list(log_ids)
+        if rider_id is not None:
+            conditions.append('log.rider_id = ?')
+            parameters.append(rider_id)
+        if starting_time is not None:
+            conditions.append('log.starting_time >= ?')
+            parameters.append(starting_time)
+        if ending_time is not None:
+            conditions.append('log.starting_time < ?')
+            parameters.append(ending_time)
+        query = 'SELECT * FROM log'
+        if len(conditions) > 0:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        self.sqliteCursor.execute(query + ' ORDER BY log.id', parameters)
+        return self.sqliteCursor.fetchall()
+
+    # Commit the changes made without commit (batch of updates in a single transaction)
+    def commit(self):
+        self.sqliteConnection.commit()
+
     # Return the log file by id
     def get_log(self, id):
         self.sqliteCursor.execute('''SELECT * FROM log WHERE id = ?''', (id,))
@@ -537,7 +584,7 @@ class SeafoilDB:
         return self.sqliteCursor.fetchone() is not None
 
     # Remove log
-    def remove_log(self, id):
+    def remove_log(self, id, commit=True):
         # Delete links to session
         self.sqliteCursor.execute('''DELETE FROM session_log_link WHERE log = ?''', (id,))
         # Delete links to session association
@@ -549,7 +596,8 @@ class SeafoilDB:
         statistics_id = self.sqliteCursor.fetchone()
         if statistics_id:
             self.sqliteCursor.execute('''DELETE FROM statistics WHERE id = ?''', (statistics_id['statistics_id'],))
-        self.sqliteConnection.commit()
+        if commit:
+            self.sqliteConnection.commit()
 
     # Get log with statistics and rider and sport type
     def get_log_by_id(self, id):
@@ -641,9 +689,10 @@ class SeafoilDB:
         return self.sqliteCursor.fetchone() is None
 
     # Update log folder
-    def set_log_download(self, id):
+    def set_log_download(self, id, commit=True):
         self.sqliteCursor.execute('''UPDATE log SET is_download = 1 WHERE id = ?''', (id,))
-        self.sqliteConnection.commit()
+        if commit:
+            self.sqliteConnection.commit()
 
     # Add a link between a session and a log if it does not exist already
     def add_session_log_link(self, log_id, session_id):
@@ -795,25 +844,26 @@ class SeafoilDB:
             self.sqliteConnection.commit()
             return session_setup['id']
 
-    def add_log_statistics(self, log_id, statistics):
+    def add_log_statistics(self, log_id, statistics, commit=True):
         print(f"Add statistics to log {log_id}")
         # Test if the log already has statistics
         self.sqliteCursor.execute('''SELECT * FROM log WHERE id = ? AND statistics_id IS NOT NULL''', (log_id,))
         stat_id = self.sqliteCursor.fetchone()
         if stat_id:
             # Update the statistics
-            self.sqliteCursor.execute('''UPDATE statistics SET v500 = ?, v1850 = ?, vmax = ?, vjibe = ?, vhour = ? WHERE id = ?''', (statistics['v500'], statistics['v1850'], statistics['vmax'], statistics['vjibe'], statistics['vhour'], stat_id['statistics_id']))
-            self.sqliteConnection.commit()
+            self.sqliteCursor.execute(f'''UPDATE statistics SET {", ".join(column + " = ?" for column in self.statistics_columns)} WHERE id = ?''', [statistics.get(column) for column in self.statistics_columns] + [stat_id['statistics_id']])
+            if commit:
+                self.sqliteConnection.commit()
         else:
             # Create a new entry in the statistics table
-            self.sqliteCursor.execute('''INSERT INTO statistics (v500, v1850, vmax, vjibe, vhour) VALUES (?, ?, ?, ?, ?)''', (statistics['v500'], statistics['v1850'], statistics['vmax'], statistics['vjibe'], statistics['vhour']))
-            self.sqliteConnection.commit()
+            self.sqliteCursor.execute(f'''INSERT INTO statistics ({", ".join(self.statistics_columns)}) VALUES ({", ".join("?" * len(self.statistics_columns))})''', [statistics.get(column) for column in self.statistics_columns])
             # Get the id of the last inserted row
             statistics_id = self.sqliteCursor.lastrowid
 
             # Update the log with the statistics id
             self.sqliteCursor.execute('''UPDATE log SET statistics_id = ? WHERE id = ?''', (statistics_id, log_id))
-            self.sqliteConnection.commit()
+            if commit:
+                self.sqliteConnection.commit()
 
     def get_water_sport_type_all(self):
         self.sqliteCursor.execute('''SELECT * FROM water_sport_type''')
@@ -847,9 +897,10 @@ class SeafoilDB:
         self.sqliteConnection.commit()
         return self.sqliteCursor.lastrowid
 
-    def update_log_time(self, log_id, starting_time, ending_time):
+    def update_log_time(self, log_id, starting_time, ending_time, commit=True):
         self.sqliteCursor.execute('''UPDATE log SET starting_time = ?, ending_time = ? WHERE id = ?''', (starting_time, ending_time, log_id))
-        self.sqliteConnection.commit()
+        if commit:
+            self.sqliteConnection.commit()
 
     # Get the statistics of a session from the statistics table
     def get_session_statistics(self, session_id):
@@ -910,9 +961,10 @@ class SeafoilDB:
         self.sqliteConnection.commit()
 
     # Set a log to default rider if it exists
-    def set_log_default_rider(self, log_id):
+    def set_log_default_rider(self, log_id, commit=True):
         self.sqliteCursor.execute('''UPDATE log SET rider_id = (SELECT id FROM rider WHERE is_default = 1) WHERE id = ?''', (log_id,))
-        self.sqliteConnection.commit()
+        if commit:
+            self.sqliteConnection.commit()
 
     # Get all base de vitesse
     def get_basevitesse_all(self):
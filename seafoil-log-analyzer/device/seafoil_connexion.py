@@ -59,11 +59,7 @@ class SeafoilConnexion(QObject):
             self.ssh_client.close()
 
     def get_file_directory(self, id, file_name):
-        ret = self.log_folder + str(id) + '/' + file_name
-        # if file name is a gpx file
-        if not file_name.endswith('.gpx'):
-            ret += "/"
-        return ret
+        return self.db.get_log_directory(id, file_name)
 
     def check_if_connected(self):
         if not self.is_connected or not self.ssh_client.get_transport().is_active():
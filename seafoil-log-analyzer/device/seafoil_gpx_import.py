@@ -0,0 +1,113 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from concurrent.futures import as_completed
+
+from ..db.seafoil_db import SeafoilDB
+from ..log_analyzer.seafoil_log_data import SeafoilLogData, open_log
+from ..log_analyzer.seafoil_data.seafoil_bag_reader import get_process_pool
+
+
+def get_file_hash(file_path):
+    sha1 = hashlib.sha1()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            sha1.update(block)
+    return sha1.hexdigest()
+
+
+def import_gpx_file(file_path, import_folder):
+    # Run by a worker: copy of the file in its own folder, statistics computed (and saved in its data folder)
+    folder = tempfile.mkdtemp(dir=import_folder)
+    gpx_path = folder + '/' + os.path.basename(file_path)
+    shutil.copy2(file_path, gpx_path)
+
+    log_data = open_log(gpx_path, topics=SeafoilLogData.statistics_topics)
+    statistics = log_data.get_statistics()
+    # Configuration saved now: the folder is renamed (or removed) before the log object is collected
+    log_data.configuration_finalizer.detach()
+    log_data.save_configuration()
+    return {"name": os.path.basename(file_path),
+            "folder": folder,
+            "hash": get_file_hash(gpx_path),
+            "starting_time": log_data.get_starting_time_timestamp(),
+            "ending_time": log_data.get_ending_time_timestamp(),
+            "statistics": {key: statistics[key] for key in SeafoilDB.statistics_columns}}
+
+
+def import_gpx_files(db, file_paths, log_folder, nb_workers=1):
+    # Import of many gpx files: files copied and processed by workers, added to the database in a single transaction
+    list_added = []
+
+    # Files already in the database (or twice in the list) are not imported
+    names = set()
+    new_file_paths = []
+    for file_path in file_paths:
+        name = os.path.basename(file_path)
+        if name in names:
+            continue
+        names.add(name)
+        if not db.is_new_log(name):
+            print(f'This GPX file {name} already exists in the database.')
+            db_id, is_download, is_new = db.insert_log(name, None, type='gpx')
+            list_added.append(db_id)
+            continue
+        new_file_paths.append(file_path)
+    if len(new_file_paths) == 0:
+        return list_added
+
+    # Folder of the files being imported (in the log folder, moved at once in the folder of the log)
+    os.makedirs(log_folder, exist_ok=True)
+    import_folder = tempfile.mkdtemp(prefix="import_", dir=log_folder)
+
+    results = []
+    if nb_workers > 1 and len(new_file_paths) > 1:
+        with get_process_pool(min(nb_workers, len(new_file_paths))) as executor:
+            futures = {executor.submit(import_gpx_file, file_path, import_folder): file_path
+                       for file_path in new_file_paths}
+            for future in as_completed(futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    print(f'An error occurred while importing the GPX file {futures[future]}: {e}')
+    else:
+        for file_path in new_file_paths:
+            try:
+                results.append(import_gpx_file(file_path, import_folder))
+            except Exception as e:
+                print(f'An error occurred while importing the GPX file {file_path}: {e}')
+
+    # Logs added in chronological order, files with the same content imported once
+    hashes = {}
+    for result in sorted(results, key=lambda result: result["starting_time"]):
+        if result["hash"] in hashes:
+            print(f'The GPX file {result["name"]} is a copy of another file.')
+            continue
+
+        db_id, is_download, is_new = db.insert_log(result["name"], result["starting_time"], result["ending_time"],
+                                                   'gpx', commit=False)
+        try:
+            # Folder of a log not downloaded replaced
+            target_folder = log_folder + str(db_id)
+            if os.path.exists(target_folder):
+                shutil.rmtree(target_folder)
+            os.rename(result["folder"], target_folder)
+        except OSError as e:
+            print(f'An error occurred while importing the GPX file {result["name"]}: {e}')
+            # Log added without its folder removed (not committed yet)
+            if is_new:
+                db.remove_log(db_id, commit=False)
+            continue
+
+        db.update_log_time(db_id, result["starting_time"], result["ending_time"], commit=False)
+        db.set_log_default_rider(db_id, commit=False)
+        db.set_log_download(db_id, commit=False)
+        db.add_log_statistics(db_id, result["statistics"], commit=False)
+        hashes[result["hash"]] = db_id
+        list_added.append(db_id)
+        print(f'The GPX file {result["name"]} was added successfully.')
+    db.commit()
+
+    shutil.rmtree(import_folder, ignore_errors=True)
+    return list_added
@@ -5,6 +5,7 @@ from PyQt5.QtCore import pyqtSignal
 
 from ..db.seafoil_db import SeafoilDB
 from .seafoil_connexion import SeafoilConnexion
+from .seafoil_gpx_import import import_gpx_files
 from ..log_analyzer import SeafoilBag
 from ..log_analyzer import SeafoilLogAnalyser
 
@@ -84,14 +85,8 @@ class SeafoilLog:
         self.update()
 
     def add_gpx_files(self, file_paths):
-        list_added = []
-        for file_path in file_paths:
-            is_added, db_id = self.sc.add_gpx_file(file_path)
-            if db_id is not None:
-                list_added.append(db_id)
-
-        for db_id in list_added:
-            self.process_log(db_id)
+        # Files copied and processed in parallel (spawned processes), added to the db at once
+        list_added = import_gpx_files(self.db, file_paths, self.sc.log_folder, nb_workers=os.cpu_count())
 
         self.logs = self.db.get_all_logs()
         return list_added
@@ -205,11 +200,12 @@ class SeafoilLog:
         try:
             # Process the log
             print("Processing log: " + file_path)
-            # Signal
+            # Signal (read in the process of the application, no worker processes inside QGIS)
             sfb = SeafoilBag(file_path)
             if process_ui_function is not None:
                 sfb.signal_load_data.connect(process_ui_function)
-            sfb.load_data()
+            # Only the topics needed by the statistics are loaded
+            sfb.load_data(topics=SeafoilBag.statistics_topics)
 
             # Update db with statistics from the log
             self.db.add_log_statistics(log['id'], sfb.get_statistics())
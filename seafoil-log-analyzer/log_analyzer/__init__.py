@@ -16,9 +16,15 @@ from .seafoil_data.seafoil_wind import SeafoilWind
 from .seafoil_data.seafoil_wind_debug import SeafoilWindDebug
 from .seafoil_data.seafoil_gpx import SeafoilGpx
 #
-from .seafoil_bag import SeafoilBag
-from .seafoil_log_analyzer import SeafoilLogAnalyser
+from .seafoil_log_data import SeafoilLogData, open_log
 from .seafoil_data.seafoil_gpx import correction_of_malformed_gpx
-from .seafoil_log_analyzer import SeafoilLogAnalyser
 
-from .tools.seafoil_statistics import SeafoilStatistics
\ No newline at end of file
+from .tools.seafoil_statistics import SeafoilStatistics
+
+# Qt adapter and user interface (the data API above is used without Qt)
+try:
+    from .seafoil_bag import SeafoilBag
+    from .seafoil_log_analyzer import SeafoilLogAnalyser
+except ModuleNotFoundError as e:
+    if e.name not in ["PyQt5", "pyqtgraph"]:
+        raise
\ No newline at end of file
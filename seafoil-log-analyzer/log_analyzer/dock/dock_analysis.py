@@ -10,22 +10,6 @@ import math
 from .seafoil_dock import SeafoilDock
 from ..tools.seafoil_relationship_plot import SeafoilRelationshipPlot
 
-def compute_diff_yaw(data_yaw, data_time, window_size):
-    # Create vector with the same size as data_imu.yaw
-    yaw = np.zeros(len(data_yaw))
-
-    # Cumulative sum of the difference between two consecutive values of data_yaw with modulo 360
-    for i in range(1, len(data_yaw)):
-        diff = (data_yaw[i] - data_yaw[i - 1])
-        yaw[i] = yaw[i - 1] + min(diff%360, 360 - diff%360)*np.sign(diff)
-
-    yaw = np.convolve(yaw, np.ones(window_size) / window_size, mode='same')
-    data_time = np.convolve(data_time, np.ones(3) / 3, mode='same')
-    time_diff = np.diff(data_time)
-    yaw_diff = np.diff(yaw) / time_diff
-
-    return yaw, yaw_diff
-
 def add_line(position_init=0, unit="", line_color = (255, 255, 255), text_position = [0, 40]):
     # Add an infinit movable vertical line
     r2b = pg.InfiniteLine(pos=position_init, angle=90, movable=True, pen=pg.mkPen(color=line_color, width=2))
@@ -100,7 +84,8 @@ class DockAnalysis(SeafoilDock):
         self.yaw_diff = None
         data_gnss = copy.copy(self.sfb.gps_fix)
         if not data_gnss.is_empty():
-            self.yaw, self.yaw_diff = compute_diff_yaw(data_gnss.track, data_gnss.time, 25*3)
+            data_yaw = self.sfb.statistics.graph.get("yaw_diff")
+            self.yaw, self.yaw_diff = data_yaw["yaw"], data_yaw["yaw_diff"]
 
         self.pg_profile, self.pg_speed = self.plot_height_velocity()
 
@@ -7,7 +7,6 @@ import pyqtgraph.console
 from pyqtgraph.dockarea import *
 from .seafoil_dock import SeafoilDock
 import numpy as np
-from scipy import interpolate
 from pyqtgraph.Qt import QtGui, QtCore
 import copy
 
@@ -117,25 +116,14 @@ class DockGnss(SeafoilDock):
         data_stat = self.sfb.statistics
 
         if (not data.is_empty()):
-            time_interp = np.arange(data.time[0], data.time[-1], data_stat.timestep_filter)
-            # interpolate with mean
-            f_speed = interpolate.interp1d(data.time, data.speed, bounds_error=False, kind="linear")
-            speed = f_speed(time_interp)
-
+            # Stage of the statistics (computed once and saved with the log)
+            data_filter = data_stat.graph.get("gnss_filter")
+            time_interp = data_filter["time_resampled"]
+            speed = data_filter["speed_resampled"]
+            acceleration = data_filter["acceleration"]
+            mask = data_filter["mask_resampled"]
+            mask_interp = data_filter["mask"]
             ms_to_knot = 1.94384
-            # Filter the speed by max acceleration allowed
-            acceleration = np.diff(speed) / np.diff(time_interp)
-            acceleration = np.append(acceleration, 0)
-            # Create a mask where absolute acceleration is less than 3 knots/s^2
-            mask = acceleration > (data_stat.max_acc_kt / ms_to_knot)
-            # Apply a convolution to all True values
-            mask = np.convolve(mask, np.ones(5), mode='same')
-            # opposite mask
-            mask = np.logical_not(mask)
-
-            # interpolate mask on the original time
-            f_mask = interpolate.interp1d(time_interp, mask, bounds_error=False, kind="zero")
-            mask_interp = f_mask(data.time)
 
             pg_speed = pg.PlotWidget()
             self.set_plot_options(pg_speed)
@@ -158,6 +146,8 @@ class DockGnss(SeafoilDock):
             pg_mask = pg.PlotWidget()
             self.set_plot_options(pg_mask)
             pg_mask.plot(data.time, mask_interp[:-1], pen=(255, 0, 0), name="mask", stepMode=True)
+            pg_mask.plot(data.time, data_filter["mask_quality"][:-1].astype('double'), pen=(0, 255, 0),
+                         name="quality", stepMode=True)
             pg_mask.setLabel('left', "mask")
             dock_gnss_filter.addWidget(pg_mask)
             pg_mask.setXLink(pg_speed)
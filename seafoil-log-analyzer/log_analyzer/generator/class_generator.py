@@ -2,6 +2,8 @@
 
 import sys
 import re
+import json
+import hashlib
 from rosidl_runtime_py import utilities
 from jinja2 import Template
 
@@ -13,65 +15,44 @@ import sys
 import numpy as np
 import datetime
 from .seafoil_data import SeafoilData
+from .seafoil_column_builder import SeafoilColumnBuilder
 
 sys.path.append('..')
 
 
 class Seafoil{{ class_name }}(SeafoilData):
+    generator_version = "{{ generator_version }}"
+
+    # Columns of the topic (one record per message)
+    dtype = np.dtype([{% for variable in table %}
+        ('{{ variable["python_name"] }}', '{{ variable["type"] }}'{%if variable["is_tab"] == True%}, ({{variable["tab_count"]}},){%endif%}),{% endfor %}
+    ])
+
+    # Field (and index) of each column in the messages decoded in bulk
+    record_fields = [{% for variable in table %}
+        ('{{ variable["python_name"] }}', '{{ variable["record_name"] }}', {{ variable["record_index"] }}),{% endfor %}
+    ]
+
     def __init__(self, topic_name=None, seafoil_bag=None):
-        SeafoilData.__init__(self, seafoil_bag.file_path, topic_name, seafoil_bag.offset_date, seafoil_bag.data_folder)
-        {% for variable in table %}
-        self.{{ variable["python_name"] }} = np.empty([self.nb_elements{%if variable["is_tab"] == True%}, {{variable["tab_count"]}}{%endif%}], dtype='{{ variable["type"] }}'){% endfor %}
+        SeafoilData.__init__(self, seafoil_bag.file_path, topic_name, seafoil_bag.offset_date, seafoil_bag.data_folder, seafoil_bag.bag_reader, seafoil_bag.metadata, seafoil_bag.end_date, seafoil_bag.manifest)
+        self.records = SeafoilColumnBuilder(self.dtype)
 
         seafoil_bag.emit_signal_process_topic(self.topic_name)
         self.load_message()
         self.resize_data_array()
-        super().resize_data_array()
-        if self.k > 0 and not self.is_loaded_from_file:
+        if self.k > 0 and not self.is_loaded_from_file and not self.is_windowed():
             self.save_data()
 
     def process_message(self, msg):
-        {% for variable in table -%}
-            self.{{ variable["python_name"] }}[self.k{%if variable["is_tab"] == True%}, :{%endif%}] = 
+        self.records.append(({% for variable in table %}
             {%-if variable["is_tab"] == True-%}
                 np.array(msg.{{ variable["ros_name"] }}, dtype='{{ variable["type"] }}')
             {%-else-%}
                 msg.{{ variable["ros_name"] }}
-            {%-endif%}
-        {% endfor %}
+            {%-endif%}{%if not loop.last%},
+                             {% endif %}{% endfor %},))
         return
-
-    def resize_data_array(self):
-        {% for variable in table -%}
-            self.{{ variable["python_name"] }} = np.resize(self.{{ variable["python_name"] }}, 
-        {%-if variable["is_tab"] == True-%}
-            [self.k, {{ variable["tab_count"] }}]
-        {%-else-%}
-            self.k
-        {%-endif-%})
-        {% endfor %}
-        return
-        
-    def save_data(self):
-        import os
-        # Test if save directory exists
-        if not os.path.exists(self.topic_name_dir) and self.k > 0:
-            os.makedirs(self.topic_name_dir)
-            # Save data (compressed)
-        if not os.path.exists(self.topic_full_dir):
-            np.savez_compressed(self.topic_full_dir,
-                                time=self.time + self.starting_time.timestamp(),{% for variable in table %}
-                                {{ variable["python_name"] }}=self.{{ variable["python_name"] }},{% endfor %})
-
-    def load_message_from_file(self):
-        data = np.load(self.topic_full_dir, allow_pickle=True)
-        self.starting_time = datetime.datetime.fromtimestamp(data['time'][0])
-        self.ending_time = datetime.datetime.fromtimestamp(data['time'][-1])
-        self.time = data['time'] - data['time'][0]
-        {% for variable in table -%}
-        self.{{ variable["python_name"] }} = data['{{ variable["python_name"] }}']
-        {% endfor %}
-    """
+"""
 
     interface = utilities.get_interface(package_name + "/msg/" + msg_name)
 
@@ -91,30 +72,39 @@ class Seafoil{{ class_name }}(SeafoilData):
     # Rewrite fileds to take into acount tab and boolean
     table = []
 
-    def add_table_item(item_, filed_type=None, python_name=None, ros_name=None, is_tab=False, tab_count=0):
+    def add_table_item(item_, filed_type=None, python_name=None, ros_name=None, is_tab=False, tab_count=0,
+                       record_name=None, record_index=-1):
         python_name = item_ if python_name is None else python_name
         ros_name = item_ if ros_name is None else ros_name
+        # Name of the field in the structured array returned by the CDR decoder
+        record_name = ros_name if record_name is None else record_name
         filed_type = filed_type if filed_type is not None else fields[item_]
         table.append({"python_name":python_name,
                               "type":filed_type,
                               "ros_name":ros_name,
                               "is_tab":is_tab,
-                              "tab_count":tab_count})
+                              "tab_count":tab_count,
+                              "record_name":record_name,
+                              "record_index":record_index})
 
     for item in fields:
         if fields[item] == "boolean":
             add_table_item(item, "bool")
         elif \
                 fields[item] == "rcl_interfaces/ParameterValue" or fields[item] == "string" or fields[
-                    item] == "sequence<uint8>" or fields[item] == "builtin_interfaces/Time":
+                    item] == "sequence<uint8>":
             add_table_item(item, "object")
+        elif fields[item] == "builtin_interfaces/Time":
+            add_table_item(item, filed_type="int32", python_name=item + "_sec", ros_name=item + ".sec")
+            add_table_item(item, filed_type="uint32", python_name=item + "_nanosec", ros_name=item + ".nanosec")
         elif "[" in fields[item]:
             split_result = re.split(r'[\[\]]', fields[item])
             variable_type = split_result[0]
             variable_nb = int(split_result[1])
             if variable_nb < 10:
                 for i in range(variable_nb):
-                    add_table_item(item, filed_type=variable_type, python_name=item + str(i), ros_name=item + "[" + str(i) + "]")
+                    add_table_item(item, filed_type=variable_type, python_name=item + str(i), ros_name=item + "[" + str(i) + "]",
+                                   record_name=item, record_index=i)
             else:
                 if variable_type == "uint8" or variable_type == "float":
                     add_table_item(item, filed_type=variable_type, is_tab=True, tab_count=variable_nb)
@@ -135,8 +125,11 @@ class Seafoil{{ class_name }}(SeafoilData):
         if item["python_name"] == "file":
             item["python_name"] = "file_name"
 
+    # Version of the generated class (hash of the template and of the table)
+    generator_version = hashlib.sha1((template_msg + json.dumps(table, sort_keys=True)).encode('utf-8')).hexdigest()[:12]
+
     tm = Template(template_msg)
-    msg = tm.render(class_name=interface_name, table=table)
+    msg = tm.render(class_name=interface_name, table=table, generator_version=generator_version)
 
     file_name = "../seafoil_data/seafoil_" + interface_name_lower + ".py"
 
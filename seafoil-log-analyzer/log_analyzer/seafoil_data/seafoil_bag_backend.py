@@ -0,0 +1,26 @@
+#!/bin/python3
+
+import os
+import re
+
+from .seafoil_mcap_reader import SeafoilMcapBackend
+
+
+def get_mcap_files(bag_path):
+    # mcap files of the bag, in recording order (name_0.mcap, name_1.mcap, ..., name_10.mcap)
+    files = [file for file in os.listdir(bag_path) if file.endswith(".mcap")] if os.path.isdir(bag_path) else []
+    files.sort(key=lambda file: [int(s) if s.isdigit() else s for s in re.split(r'(\d+)', file)])
+    return [os.path.join(bag_path, file) for file in files]
+
+
+def get_bag_backend(bag_path):
+    # The mcap files are read directly, rosbag2_py is only used for other storages (or unreadable files)
+    mcap_files = get_mcap_files(bag_path)
+    if len(mcap_files) > 0:
+        try:
+            return SeafoilMcapBackend(mcap_files)
+        except Exception as e:
+            print("Oops!  mcap reader error, fallback to rosbag2 ", e)
+
+    from .seafoil_ros_backend import SeafoilRosBackend
+    return SeafoilRosBackend(bag_path)
@@ -0,0 +1,71 @@
+#!/bin/python3
+
+import os
+import shutil
+import subprocess
+import yaml
+
+from .seafoil_mcap_reader import read_mcap_footer
+
+
+def get_mcap_summary_start(file_path):
+    # Offset of the summary section written at the end of a complete mcap file (None if truncated)
+    footer = read_mcap_footer(file_path)
+    return None if footer is None else footer[0]
+
+
+class SeafoilBagIndex(object):
+    # Reindex a rosbag only when its files changed since the last reindex
+    def __init__(self, bag_path="", data_folder=None):
+        self.bag_path = bag_path
+        self.data_folder = data_folder
+        self.file_name = self.data_folder + "/bag_index.yaml"
+        self.fingerprint = None
+
+    def get_fingerprint(self):
+        fingerprint = {}
+        for file in sorted(os.listdir(self.bag_path)):
+            if not file.endswith(".mcap"):
+                continue
+            file_path = os.path.join(self.bag_path, file)
+            stat = os.stat(file_path)
+            fingerprint[file] = {"size": stat.st_size,
+                                 "mtime": stat.st_mtime_ns,
+                                 "summary_start": get_mcap_summary_start(file_path)}
+        return fingerprint
+
+    def load_fingerprint(self):
+        if not os.path.exists(self.file_name):
+            return None
+        with open(self.file_name, 'r') as file:
+            return yaml.load(file, Loader=yaml.FullLoader)
+
+    def save_fingerprint(self, fingerprint):
+        if not os.path.exists(self.data_folder):
+            os.makedirs(self.data_folder, exist_ok=True)
+        with open(self.file_name, 'w') as file:
+            yaml.dump(fingerprint, file)
+
+    def is_up_to_date(self, fingerprint=None):
+        if fingerprint is None:
+            fingerprint = self.get_fingerprint()
+        return os.path.exists(os.path.join(self.bag_path, "metadata.yaml")) and self.load_fingerprint() == fingerprint
+
+    def update(self):
+        fingerprint = self.get_fingerprint()
+        self.fingerprint = fingerprint
+        if self.is_up_to_date(fingerprint):
+            return False
+
+        # Without ROS, the mcap files are read directly (truncated files are scanned)
+        if shutil.which("ros2") is None:
+            return False
+
+        print("Reindex bag: ", self.bag_path)
+        result = subprocess.run(["ros2", "bag", "reindex", self.bag_path, "-s", "mcap"], check=False)
+        if result.returncode != 0:
+            # Reindexed again at the next opening
+            print("Oops!  reindex error ", self.bag_path, result.returncode)
+            return False
+        self.save_fingerprint(fingerprint)
+        return True
@@ -0,0 +1,91 @@
+#!/bin/python3
+
+import os
+import datetime
+import yaml
+
+from .seafoil_bag_backend import get_bag_backend
+
+
+class SeafoilBagMetadata(object):
+    # Metadata of a rosbag, read once and saved in the data folder
+    # Version of the saved metadata (2: messages written outside of chunks counted)
+    metadata_version = 2
+
+    def __init__(self, bag_path="", data_folder=None, fingerprint=None):
+        self.bag_path = bag_path
+        self.data_folder = data_folder
+        self.fingerprint = fingerprint
+        self.file_name = None if data_folder is None else self.data_folder + "/metadata.yaml"
+
+        self.topics = {}
+        self.starting_time = 0
+        self.ending_time = 0
+        self.bag_size = 0
+        self.is_loaded = False
+
+    def load(self):
+        if self.is_loaded:
+            return
+        if not self.load_from_file():
+            self.read_metadata()
+            self.save()
+        self.is_loaded = True
+
+    def load_from_file(self):
+        if self.file_name is None or not os.path.exists(self.file_name):
+            return False
+        with open(self.file_name, 'r') as file:
+            data = yaml.load(file, Loader=yaml.FullLoader)
+        # The bag changed since the metadata was saved
+        if data is None or data.get("fingerprint") != self.fingerprint \
+                or data.get("version") != self.metadata_version:
+            return False
+        self.topics = data["topics"]
+        self.starting_time = data["starting_time"]
+        self.ending_time = data["ending_time"]
+        self.bag_size = data["bag_size"]
+        return True
+
+    def read_metadata(self):
+        print("Read metadata ", self.bag_path)
+        metadata = get_bag_backend(self.bag_path).read_metadata()
+        self.topics = metadata["topics"]
+        self.starting_time = metadata["starting_time"]
+        self.ending_time = metadata["ending_time"]
+        self.bag_size = metadata["bag_size"]
+
+    def save(self):
+        if self.file_name is None:
+            return
+        if not os.path.exists(self.data_folder):
+            os.makedirs(self.data_folder, exist_ok=True)
+        with open(self.file_name, 'w') as file:
+            yaml.dump({"version": self.metadata_version,
+                       "fingerprint": self.fingerprint,
+                       "topics": self.topics,
+                       "starting_time": self.starting_time,
+                       "ending_time": self.ending_time,
+                       "bag_size": self.bag_size}, file)
+
+    def get_topics(self):
+        self.load()
+        return list(self.topics.keys())
+
+    def get_type_map(self):
+        self.load()
+        return {name: topic["type"] for name, topic in self.topics.items()}
+
+    def get_message_count(self, topic_name):
+        self.load()
+        if topic_name in self.topics:
+            return self.topics[topic_name]["message_count"]
+        return 0
+
+    def get_starting_time(self):
+        self.load()
+        return datetime.datetime.fromtimestamp(self.starting_time * 1e-9)
+
+    def get_ending_time(self):
+        self.load()
+        return datetime.datetime.fromtimestamp(self.ending_time * 1e-9)
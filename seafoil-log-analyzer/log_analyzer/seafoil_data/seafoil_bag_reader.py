@@ -0,0 +1,352 @@
+#!/bin/python3
+
+import datetime
+import multiprocessing
+import os
+import re
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from .seafoil_cdr_decoder import decode_cdr_messages, deserialize_cdr_message
+from .seafoil_column_builder import SeafoilColumnBuilder
+from .seafoil_bag_metadata import SeafoilBagMetadata
+from .seafoil_bag_backend import get_bag_backend
+
+
+def pack_records(records):
+    # Copy of decoded messages without the padding of the messages (the offsets depend on the header strings)
+    dtype = np.dtype([(name, records.dtype.fields[name][0]) for name in records.dtype.names])
+    packed = np.empty(len(records), dtype=dtype)
+    for name in dtype.names:
+        packed[name] = records[name]
+    return packed
+
+
+def decode_batch(data, type_name, get_fields):
+    # Structured array of a batch of fixed size messages (None if the messages have a variable size) and mask of the
+    # messages decoded. Messages with header strings of different sizes are decoded one by one
+    records = decode_cdr_messages(data, type_name, get_fields)
+    if records is not None:
+        return pack_records(records), np.ones(len(data), dtype='bool')
+    first = decode_cdr_messages(data[:1], type_name, get_fields)
+    if first is None:
+        return None, None
+
+    dtype = pack_records(first).dtype
+    packed = np.zeros(len(data), dtype=dtype)
+    is_decoded = np.zeros(len(data), dtype='bool')
+    for i, payload in enumerate(data):
+        record = decode_cdr_messages([payload], type_name, get_fields)
+        if record is not None:
+            packed[i] = pack_records(record)[0]
+            is_decoded[i] = True
+    # Messages of another size deserialized one by one
+    index = np.flatnonzero(~is_decoded)
+    if len(index) > 0:
+        records, is_deserialized = deserialize_records([data[i] for i in index], type_name, get_fields, dtype)
+        packed[index[is_deserialized]] = records
+        is_decoded[index[is_deserialized]] = True
+    return packed[is_decoded], is_decoded
+
+
+def get_record_value(msg, name):
+    # Field of a deserialized message from the name of its column ("header.stamp.sec", "points0.x" for arrays)
+    value = msg
+    for part in name.split('.'):
+        if hasattr(value, part):
+            value = getattr(value, part)
+        else:
+            array = re.fullmatch(r'(.+?)(\d+)', part)
+            value = getattr(value, array.group(1))[int(array.group(2))]
+    return value
+
+
+def deserialize_records(data, type_name, get_fields, dtype):
+    # Messages that cannot be decoded in bulk (payloads of another size) deserialized one by one into records, and
+    # mask of the messages decoded
+    records = np.zeros(len(data), dtype=dtype)
+    is_decoded = np.ones(len(data), dtype='bool')
+    for i, payload in enumerate(data):
+        try:
+            msg = deserialize_cdr_message(payload, type_name, get_fields)
+            records[i] = tuple(get_record_value(msg, name) for name in dtype.names)
+        except Exception as e:
+            print("Oops!  deserialization error ", type_name, e)
+            is_decoded[i] = False
+    return records[is_decoded], is_decoded
+
+
+class SeafoilTopicMessages(object):
+    # Messages of a topic: fixed size messages are decoded by batches into columns while the bag is read, only the
+    # messages of variable size are kept serialized (deserialized one by one by the topic)
+    batch_size = 4096
+
+    def __init__(self, topic_name="", type_name="", get_fields=None):
+        self.topic_name = topic_name
+        self.type_name = type_name
+        self.get_fields = get_fields
+
+        # Serialized messages (batch being read, or all the messages of variable size) and their reception time (ns)
+        self.data = []
+        self.data_time = []
+        self.nb_messages = 0
+        self.nb_bytes = 0
+
+        # Decoded messages and their reception time (ns), consolidated in arrays by finish
+        self.records = None
+        self.time = SeafoilColumnBuilder('int64')
+        self.is_fixed = None  # unknown until the first batch is decoded
+        self.is_finished = False
+
+    def __len__(self):
+        return self.nb_messages
+
+    def append(self, data, t):
+        self.data.append(data)
+        self.data_time.append(t)
+        self.nb_messages += 1
+        self.nb_bytes += len(data)
+        if self.is_fixed is not False and len(self.data) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        # Decode the batch of serialized messages into the columns
+        if len(self.data) == 0 or self.is_fixed is False:
+            return
+        records, is_decoded = decode_batch(self.data, self.type_name, self.get_fields)
+        if records is None:
+            if self.is_fixed is None:
+                self.is_fixed = False
+            else:
+                # Batch of messages of another size than the first ones
+                self.convert_data(self.records.dtype)
+            return
+        if self.records is None:
+            self.records = SeafoilColumnBuilder(records.dtype)
+        self.records.extend(records, copy=False)
+        self.is_fixed = True
+        self.time.extend(np.asarray(self.data_time, dtype='int64')[is_decoded], copy=False)
+        self.nb_messages -= int(np.sum(~is_decoded))
+        self.data = []
+        self.data_time = []
+
+    def convert_data(self, dtype):
+        # Serialized messages deserialized into the records of the messages decoded in bulk
+        records, is_decoded = deserialize_records(self.data, self.type_name, self.get_fields, dtype)
+        if self.records is None:
+            self.records = SeafoilColumnBuilder(dtype)
+        self.records.extend(records, copy=False)
+        self.time.extend(np.asarray(self.data_time, dtype='int64')[is_decoded], copy=False)
+        self.nb_messages -= int(np.sum(~is_decoded))
+        self.data = []
+        self.data_time = []
+        self.is_fixed = True
+
+    def merge(self, other):
+        # Messages of the next chunk (read and decoded by a worker). When the topic has both chunks decoded in bulk
+        # and chunks of serialized messages, the serialized messages are converted to records (same result as a
+        # single reader)
+        self.nb_messages += other.nb_messages
+        self.nb_bytes += other.nb_bytes
+        if other.is_fixed:
+            if self.is_fixed is False:
+                self.convert_data(other.records.dtype)
+            if self.records is None:
+                self.records = SeafoilColumnBuilder(other.records.dtype)
+            self.records.extend(other.records, copy=False)
+            self.time.extend(other.time, copy=False)
+            self.is_fixed = True
+        elif other.is_fixed is False:
+            self.data.extend(other.data)
+            self.data_time.extend(other.time)
+            if self.is_fixed:
+                self.convert_data(self.records.dtype)
+            else:
+                self.is_fixed = False
+
+    def finish(self):
+        # Last batch decoded and columns consolidated, returns the decoded messages (None if variable size)
+        if not self.is_finished:
+            self.flush()
+            if self.is_fixed:
+                self.records = self.records.finalize()
+                self.time = self.time.finalize()
+            else:
+                self.records = None
+                self.time = np.asarray(self.data_time, dtype='int64')
+            self.data_time = []
+            self.get_fields = None
+            self.is_finished = True
+        return self.records
+
+
+def get_date_ns(date):
+    # Datetime to integer nanoseconds (None if not bounded)
+    if date is None:
+        return None
+    return int(round(date.timestamp() * 1e6)) * 1000
+
+
+# Maximum number of processes reading a bag (the reading is limited by the disk beyond)
+max_nb_workers = 8
+
+
+def get_process_pool(nb_workers, initializer=None, initargs=()):
+    # Spawned processes: the workers do not inherit the state of the application (threads, Qt)
+    return ProcessPoolExecutor(max_workers=max(1, min(nb_workers, max_nb_workers, os.cpu_count() or 1)),
+                               mp_context=multiprocessing.get_context('spawn'),
+                               initializer=initializer, initargs=initargs)
+
+
+# Reader of the worker process (set once by init_worker)
+worker_reader = None
+
+
+def init_worker(bag_path, offset_date, end_date, metadata, backend):
+    global worker_reader
+    worker_reader = SeafoilBagReader(bag_path, offset_date, metadata=metadata, backend=backend, end_date=end_date)
+
+
+def read_chunk(chunk, topics):
+    # Worker of the process pool: read and decode the messages of a chunk
+    return worker_reader.read_chunk(chunk, topics)
+
+
+class SeafoilBagReader(object):
+    # Read the bag in a single pass and dispatch the serialized messages per topic
+    def __init__(self, bag_path="", offset_date=datetime.datetime(2019, 1, 1), progress_callback=None, nb_workers=1,
+                 metadata=None, backend=None, end_date=None):
+        self.bag_path = bag_path
+        self.offset_date = offset_date
+        self.end_date = end_date
+
+        # Time window of the messages kept (ns), messages after offset_date and until end_date
+        self.start_time = get_date_ns(offset_date)
+        self.end_time = get_date_ns(end_date)
+        self.messages = {}
+
+        # Metadata shared with the topics (read only once)
+        self.metadata = SeafoilBagMetadata(bag_path) if metadata is None else metadata
+
+        # Called with (topic_name, nb_messages, nb_bytes) while reading
+        self.progress_callback = progress_callback
+        self.progress_step = 10000
+        self.nb_workers = nb_workers
+        self.nb_messages_total = 0
+
+        # Storage access (mcap files read directly, or rosbag2_py), opened on first use
+        self.backend = backend
+
+    def get_backend(self):
+        if self.backend is None:
+            self.backend = get_bag_backend(self.bag_path)
+        return self.backend
+
+    def is_in_window(self, t):
+        return (self.start_time is None or t > self.start_time) and (self.end_time is None or t <= self.end_time)
+
+    def get_window_ratio(self):
+        # Part of the bag inside the time window (to estimate the number of messages to read)
+        self.metadata.load()
+        duration = self.metadata.ending_time - self.metadata.starting_time
+        if duration <= 0:
+            return 1.
+        start = self.metadata.starting_time if self.start_time is None else max(self.start_time, self.metadata.starting_time)
+        end = self.metadata.ending_time if self.end_time is None else min(self.end_time, self.metadata.ending_time)
+        return min(1., max(0., (end - start) / duration))
+
+    def get_message_count(self):
+        ratio = self.get_window_ratio()
+        return {topic: int(ratio * self.metadata.get_message_count(topic)) for topic in self.metadata.get_topics()}
+
+    def emit_progress(self, topic_messages):
+        if self.progress_callback is not None:
+            self.progress_callback(topic_messages.topic_name, len(topic_messages), topic_messages.nb_bytes)
+
+    def read(self, topics):
+        if len(topics) == 0:
+            return self.messages
+
+        # Chunks of the bag split between the workers (storages read sequentially are not split)
+        if self.nb_workers > 1:
+            chunks = self.get_backend().get_chunks(topics, self.start_time, self.end_time)
+            if len(chunks) > 1:
+                return self.read_parallel(topics, chunks)
+
+        print("Read bag ", self.bag_path, topics, flush=True)
+        self.init_messages(topics)
+
+        ## Dispatch the messages of all requested topics at once
+        nb_read = 0
+        for (topic, data, t) in self.get_backend().read_messages(topics, self.start_time, self.end_time):
+            try:
+                if self.is_in_window(t):
+                    self.messages[topic].append(data, t)
+
+                nb_read += 1
+                if nb_read % self.progress_step == 0:
+                    self.emit_progress(self.messages[topic])
+            except Exception as e:
+                print("Oops!  read_next error ", e)
+                pass
+
+        for topic_name in topics:
+            self.emit_progress(self.messages[topic_name])
+
+        return self.messages
+
+    def init_messages(self, topics):
+        if self.progress_callback is not None:
+            message_count = self.get_message_count()
+            self.nb_messages_total = sum(message_count.get(topic, 0) for topic in topics)
+
+        ## Get a map of all topics
+        type_map = self.get_backend().get_type_map()
+
+        for topic_name in topics:
+            self.messages[topic_name] = SeafoilTopicMessages(topic_name, type_map.get(topic_name, ""),
+                                                             self.get_backend().get_fields)
+
+    def read_parallel(self, topics, chunks):
+        # Each worker reads and decodes only its chunks, the chunks are merged in recording order
+        self.init_messages(topics)
+
+        print("Read bag ", self.bag_path, topics, len(chunks), "chunks with", self.nb_workers, "workers", flush=True)
+        with get_process_pool(self.nb_workers, init_worker, (self.bag_path, self.offset_date, self.end_date,
+                                                             self.metadata, self.get_backend())) as executor:
+            futures = [executor.submit(read_chunk, chunk, topics) for chunk in chunks]
+            # Progress reported per chunk
+            for future in futures:
+                try:
+                    messages = future.result()
+                except Exception as e:
+                    print("Oops!  worker error ", e)
+                    continue
+                for topic_name, topic_messages in messages.items():
+                    self.messages[topic_name].merge(topic_messages)
+                    self.emit_progress(self.messages[topic_name])
+
+        return self.messages
+
+    def read_chunk(self, chunk, topics):
+        type_map = self.get_backend().get_type_map()
+        messages = {topic_name: SeafoilTopicMessages(topic_name, type_map.get(topic_name, ""),
+                                                     self.get_backend().get_fields) for topic_name in topics}
+        for (topic, data, t) in self.get_backend().read_chunk(chunk, topics):
+            if self.is_in_window(t):
+                messages[topic].append(data, t)
+        for topic_messages in messages.values():
+            topic_messages.finish()
+        return messages
+
+    def decode(self, topic_messages):
+        return topic_messages.finish()
+
+    def deserialize(self, data, type_name):
+        return self.get_backend().deserialize(data, type_name)
+
+    def pop_messages(self, topic_name):
+        # Release the raw messages once handed to the topic
+        if topic_name not in self.messages:
+            self.read([topic_name])
+        return self.messages.pop(topic_name)
@@ -0,0 +1,75 @@
+#!/bin/python3
+
+import os
+import hashlib
+import yaml
+
+# Version of the format of the data folder (1: npz files, 2: one array per column, now in the log store)
+cache_schema_version = 2
+
+
+def get_source_hash(fingerprint):
+    # Content address of the source of the data (fingerprint of the bag files, or of the gpx file)
+    if fingerprint is None:
+        return None
+    return hashlib.sha1(yaml.dump(fingerprint, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def get_file_fingerprint(file_path):
+    stat = os.stat(file_path)
+    return {os.path.basename(file_path): {"size": stat.st_size, "mtime": stat.st_mtime_ns}}
+
+
+class SeafoilCacheManifest(object):
+    # Record of how every artifact of the data folder was computed (data is recomputed when it changes)
+    def __init__(self, data_folder=None, fingerprint=None):
+        self.data_folder = data_folder
+        self.file_name = self.data_folder + "/manifest.yaml"
+        self.source = get_source_hash(fingerprint)
+        self.entries = {}
+        self.is_modified = False  # entries updated since the last save
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.file_name):
+            return
+        with open(self.file_name, 'r') as file:
+            data = yaml.load(file, Loader=yaml.FullLoader)
+        if data is not None:
+            self.entries = data.get("entries", {})
+
+    def save(self):
+        # Entries updated since the last save written at once
+        if not self.is_modified:
+            return
+        if not os.path.exists(self.data_folder):
+            os.makedirs(self.data_folder, exist_ok=True)
+        with open(self.file_name, 'w') as file:
+            yaml.dump({"schema_version": cache_schema_version, "entries": self.entries}, file)
+        self.is_modified = False
+
+    def make_entry(self, generator_version=None, parameters=None):
+        return {"source": self.source,
+                "schema_version": cache_schema_version,
+                "generator_version": generator_version,
+                "parameters": {} if parameters is None else parameters}
+
+    def is_valid(self, name, generator_version=None, parameters=None):
+        # Artifacts without entry (saved before the manifest existed, or entry not saved) are stale
+        return self.entries.get(name) == self.make_entry(generator_version, parameters)
+
+    def is_up_to_date(self, name, generator_version=None, parameters=None):
+        # Saved with the same version and parameters (whatever the source, for a manifest opened without it)
+        if name not in self.entries:
+            return False
+        return dict(self.entries[name], source=self.source) == self.make_entry(generator_version, parameters)
+
+    def update(self, name, generator_version=None, parameters=None):
+        # Written by save (once the log is loaded)
+        self.entries[name] = self.make_entry(generator_version, parameters)
+        self.is_modified = True
+
+    def remove(self, name):
+        if name in self.entries:
+            del self.entries[name]
+            self.is_modified = True
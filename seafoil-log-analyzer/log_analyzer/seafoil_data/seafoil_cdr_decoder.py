@@ -0,0 +1,234 @@
+#!/bin/python3
+
+import re
+import types
+import numpy as np
+
+# Message definitions of an installed ROS distribution (optional, mcap schemas are used otherwise)
+try:
+    from rosidl_runtime_py.utilities import get_message
+except ImportError:
+    get_message = None
+
+# Size of the CDR encapsulation header preceding the payload
+cdr_header_size = 4
+
+# ROS primitive types and their CDR (numpy) representation
+primitive_types = {
+    'boolean': 'u1',
+    'bool': 'u1',
+    'octet': 'u1',
+    'byte': 'u1',
+    'char': 'u1',
+    'int8': 'i1',
+    'uint8': 'u1',
+    'int16': 'i2',
+    'uint16': 'u2',
+    'int32': 'i4',
+    'uint32': 'u4',
+    'int64': 'i8',
+    'uint64': 'u8',
+    'float': 'f4',
+    'float32': 'f4',
+    'double': 'f8',
+    'float64': 'f8',
+}
+
+# Layouts already computed, indexed by (type_name, payload size)
+layout_cache = {}
+
+
+def get_ros_fields(type_name):
+    # Accept both "pkg/Type" and "pkg/msg/Type"
+    if get_message is None:
+        raise ModuleNotFoundError("rosidl_runtime_py is not available")
+    if type_name.count('/') == 1:
+        type_name = type_name.replace('/', '/msg/')
+    return get_message(type_name).get_fields_and_field_types()
+
+
+class SeafoilCdrLayout(object):
+    # Offsets of every primitive field of a fixed size message
+    def __init__(self, type_name, payload, get_fields=get_ros_fields):
+        self.type_name = type_name
+        self.get_fields = get_fields
+        self.payload = payload
+        self.endianness = '<' if payload[1] == 1 else '>'
+
+        self.names = []
+        self.formats = []
+        self.offsets = []
+        self.string_offsets = []  # offset of the length of strings (must be constant in a batch)
+        self.string_lengths = []
+        self.is_fixed = True
+        self.offset = cdr_header_size
+
+        self.add_message(type_name, "")
+        self.size = self.offset
+
+    def align(self, size):
+        # CDR alignment is relative to the end of the encapsulation header
+        size = min(size, 8)
+        self.offset += (-(self.offset - cdr_header_size)) % size
+
+    def add_field(self, name, ros_type, count=1):
+        fmt = primitive_types[ros_type]
+        size = int(fmt[1:])
+        self.align(size)
+        self.names.append(name)
+        self.formats.append((self.endianness + fmt, (count,)) if count > 1 else self.endianness + fmt)
+        self.offsets.append(self.offset)
+        self.offset += size * count
+
+    def add_string(self, parent):
+        # Strings are only allowed inside the header (frame_id), and must have a constant size
+        if not parent.startswith("header"):
+            self.is_fixed = False
+            return
+        self.align(4)
+        if self.offset + 4 > len(self.payload):
+            self.is_fixed = False
+            return
+        length = int(np.frombuffer(self.payload, dtype=self.endianness + 'u4', count=1, offset=self.offset)[0])
+        self.string_offsets.append(self.offset)
+        self.string_lengths.append(length)
+        self.offset += 4 + length
+
+    def add_message(self, type_name, prefix):
+        for name, ros_type in self.get_fields(type_name).items():
+            if not self.is_fixed:
+                return
+            path = prefix + name
+            array = re.fullmatch(r'(.+)\[(\d+)\]', ros_type)
+            if array is not None:
+                ros_type, count = array.group(1), int(array.group(2))
+            else:
+                count = 1
+
+            if ros_type in primitive_types:
+                self.add_field(path, ros_type, count)
+            elif ros_type.startswith('string') or ros_type.startswith('wstring'):
+                if count > 1:
+                    self.is_fixed = False
+                else:
+                    self.add_string(prefix)
+            elif ros_type.startswith('sequence') or ros_type.endswith(']'):
+                self.is_fixed = False
+            else:
+                for i in range(count):
+                    self.add_message(ros_type, path + (str(i) if count > 1 else "") + ".")
+
+    def get_dtype(self):
+        return np.dtype({'names': self.names, 'formats': self.formats, 'offsets': self.offsets,
+                         'itemsize': len(self.payload)})
+
+    def is_valid(self, payload):
+        # Same header strings than the payload used to compute the offsets
+        for offset, length in zip(self.string_offsets, self.string_lengths):
+            if int(np.frombuffer(payload, dtype=self.endianness + 'u4', count=1, offset=offset)[0]) != length:
+                return False
+        return True
+
+
+def get_layout(type_name, payload, get_fields=get_ros_fields):
+    # The only variable part accepted is the header frame_id, so the layout is cached by payload size
+    key = (type_name, len(payload))
+    if key not in layout_cache or not layout_cache[key].is_valid(payload):
+        layout_cache[key] = SeafoilCdrLayout(type_name, payload, get_fields)
+    return layout_cache[key]
+
+
+def decode_cdr_messages(data, type_name, get_fields=get_ros_fields):
+    """ Decode a batch of serialized messages into a structured array (None if the layout is not fixed) """
+    if len(data) == 0 or len(type_name) == 0:
+        return None
+
+    try:
+        layout = get_layout(type_name, data[0], get_fields)
+    except (KeyError, ValueError, AttributeError, ModuleNotFoundError) as e:
+        print("Oops!  unknown layout for ", type_name, e)
+        return None
+
+    # CDR payloads are padded to 4 bytes
+    payload_size = len(data[0])
+    if not layout.is_fixed or payload_size < layout.size or payload_size - layout.size >= 4:
+        return None
+
+    buffer = b''.join(data)
+    if len(buffer) != payload_size * len(data):
+        return None
+
+    # Verify that the header strings have the same size for all messages
+    for offset, expected_length in zip(layout.string_offsets, layout.string_lengths):
+        length = np.ndarray(shape=(len(data),), dtype=layout.endianness + 'u4', buffer=buffer,
+                            offset=offset, strides=(payload_size,))
+        if np.any(length != expected_length):
+            return None
+
+    return np.frombuffer(buffer, dtype=layout.get_dtype())
+
+
+class SeafoilCdrDeserializer(object):
+    # Generic deserializer of a single message (variable size messages)
+    def __init__(self, payload, get_fields=get_ros_fields):
+        self.payload = payload
+        self.get_fields = get_fields
+        self.endianness = '<' if payload[1] == 1 else '>'
+        self.offset = cdr_header_size
+
+    def align(self, size):
+        size = min(size, 8)
+        self.offset += (-(self.offset - cdr_header_size)) % size
+
+    def read_primitive(self, ros_type, count=None):
+        fmt = primitive_types[ros_type]
+        size = int(fmt[1:])
+        self.align(size)
+        value = np.frombuffer(self.payload, dtype=self.endianness + fmt, count=1 if count is None else count,
+                              offset=self.offset)
+        self.offset += size * len(value)
+        if count is not None:
+            return value
+        value = value[0].item()
+        return bool(value) if ros_type in ('boolean', 'bool') else value
+
+    def read_string(self):
+        self.align(4)
+        length = int(np.frombuffer(self.payload, dtype=self.endianness + 'u4', count=1, offset=self.offset)[0])
+        self.offset += 4
+        # The length includes the null terminator
+        value = bytes(self.payload[self.offset:self.offset + max(length - 1, 0)]).decode('utf-8', errors='replace')
+        self.offset += length
+        return value
+
+    def read_value(self, ros_type, count=None):
+        if ros_type in primitive_types:
+            return self.read_primitive(ros_type, count)
+        if count is not None:
+            return [self.read_value(ros_type) for _ in range(count)]
+        if ros_type.startswith('string') or ros_type.startswith('wstring'):
+            return self.read_string()
+        return self.read_message(ros_type)
+
+    def read_field(self, ros_type):
+        sequence = re.fullmatch(r'sequence<([^,>]+)(, *\d+)?>', ros_type)
+        if sequence is not None:
+            self.align(4)
+            count = int(np.frombuffer(self.payload, dtype=self.endianness + 'u4', count=1, offset=self.offset)[0])
+            self.offset += 4
+            return self.read_value(sequence.group(1), count)
+        array = re.fullmatch(r'(.+)\[(\d+)\]', ros_type)
+        if array is not None:
+            return self.read_value(array.group(1), int(array.group(2)))
+        return self.read_value(ros_type)
+
+    def read_message(self, type_name):
+        msg = types.SimpleNamespace()
+        for name, ros_type in self.get_fields(type_name).items():
+            setattr(msg, name, self.read_field(ros_type))
+        return msg
+
+
+def deserialize_cdr_message(data, type_name, get_fields=get_ros_fields):
+    """ Deserialize a message into nested objects with the attributes of the ROS message """
+    return SeafoilCdrDeserializer(data, get_fields).read_message(type_name)
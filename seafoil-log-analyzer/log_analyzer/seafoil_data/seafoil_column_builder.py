@@ -0,0 +1,91 @@
+#!/bin/python3
+
+import numpy as np
+
+
+class SeafoilColumnBuilder(object):
+    # Column built by appending values in fixed size chunks, consolidated once in a single array
+    def __init__(self, dtype='float', shape=(), chunk_size=16384):
+        self.dtype = np.dtype(dtype)
+        self.shape = tuple(shape)
+        self.chunk_size = chunk_size
+
+        self.chunks = []  # full chunks (or arrays appended at once)
+        self.current = None  # chunk being filled
+        self.current_size = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def new_chunk(self):
+        self.current = np.empty((self.chunk_size,) + self.shape, dtype=self.dtype)
+        self.current_size = 0
+
+    def flush(self):
+        # Move the chunk being filled to the list of chunks (without its unused part)
+        if self.current is not None and self.current_size > 0:
+            if self.current_size == len(self.current):
+                self.chunks.append(self.current)
+            else:
+                self.chunks.append(self.current[:self.current_size].copy())
+        self.current = None
+        self.current_size = 0
+
+    def append(self, value):
+        if self.current is None:
+            self.new_chunk()
+        self.current[self.current_size] = value
+        self.current_size += 1
+        self.size += 1
+        if self.current_size == len(self.current):
+            self.flush()
+
+    def extend(self, values, copy=True):
+        # Values are copied by default (the column does not keep a reference to the buffer of the messages)
+        values = np.array(values, dtype=self.dtype) if copy else np.asarray(values, dtype=self.dtype)
+        if len(values) == 0:
+            return
+        self.flush()
+        self.chunks.append(values.reshape((len(values),) + self.shape))
+        self.size += len(values)
+
+    def truncate(self, size):
+        # Remove the values appended after size (partially processed message)
+        if size >= self.size:
+            return
+        self.flush()
+        k = 0
+        for i, chunk in enumerate(self.chunks):
+            if k + len(chunk) >= size:
+                self.chunks = self.chunks[:i] + ([chunk[:size - k].copy()] if size > k else [])
+                break
+            k += len(chunk)
+        self.size = size
+
+    def last(self):
+        if self.current is not None and self.current_size > 0:
+            return self.current[self.current_size - 1]
+        return self.chunks[-1][-1]
+
+    def finalize(self):
+        # Chunks are released while being copied, the peak memory stays close to the size of the column
+        self.flush()
+        if len(self.chunks) == 1:
+            column = self.chunks.pop()
+        else:
+            column = np.empty((self.size,) + self.shape, dtype=self.dtype)
+            k = 0
+            while len(self.chunks) > 0:
+                chunk = self.chunks.pop(0)
+                column[k:k + len(chunk)] = chunk
+                k += len(chunk)
+        self.size = 0
+        return column
+
+
+def finalize_column(column):
+    # Columns loaded from file are already arrays
+    if isinstance(column, SeafoilColumnBuilder):
+        return column.finalize()
+    return column
@@ -0,0 +1,50 @@
+#!/bin/python3
+
+import numpy as np
+
+from .seafoil_string_column import SeafoilStringColumn, is_string_column, encode_strings
+
+# Optional compression of the columns (for archived logs)
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+
+def compress_bytes(data, compression):
+    if compression == "zstd" and zstandard is not None:
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    elif compression == "lz4" and lz4 is not None:
+        return lz4.frame.compress(data, block_size=lz4.frame.BLOCKSIZE_MAX1MB)
+    raise ValueError("Unsupported column compression: " + str(compression))
+
+
+def decompress_bytes(data, compression):
+    if compression == "zstd" and zstandard is not None:
+        return zstandard.ZstdDecompressor().decompress(data)
+    elif compression == "lz4" and lz4 is not None:
+        return lz4.frame.decompress(data)
+    raise ValueError("Unsupported column compression: " + str(compression))
+
+
+def get_column_arrays(name, column):
+    # Strings are saved as arrays (blob, offsets and codes), without pickle
+    if is_string_column(column):
+        for part, array in encode_strings(column).get_arrays().items():
+            yield name + "." + part, np.asarray(array)
+    else:
+        yield name, np.asarray(column)
+
+
+def group_string_columns(columns):
+    # Columns of strings (saved as blob, offsets and codes)
+    for name in [name for name in columns if name.endswith(".blob")]:
+        name = name[:-len(".blob")]
+        columns[name] = SeafoilStringColumn(columns.pop(name + ".blob"), columns.pop(name + ".offsets"),
+                                            columns.pop(name + ".codes", None))
+    return columns
+
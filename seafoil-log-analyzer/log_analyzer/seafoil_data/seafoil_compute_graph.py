@@ -0,0 +1,83 @@
+#!/bin/python3
+
+import hashlib
+import yaml
+
+
+class SeafoilComputeGraph(object):
+    # Signals derived from the topics of a log (or from other signals), computed once on first access and saved in
+    # the log store with a hash of their parameters and of the ones of their inputs: when a parameter changes, only
+    # the signals that depend on it are computed again
+    def __init__(self, topic_classes, log_data=None):
+        self.topic_classes = topic_classes
+        self.log_data = log_data
+        self.nodes = {}
+        self.values = {}
+
+    def add_node(self, name, function, inputs=(), parameters=None, version=1):
+        # function(*inputs, **parameters) returns a dict of arrays, inputs are topic names or names of signals
+        self.nodes[name] = {"function": function,
+                            "inputs": list(inputs),
+                            "parameters": {} if parameters is None else parameters,
+                            "version": version}
+
+    def get_parameters(self, name):
+        return self.nodes[name]["parameters"]
+
+    def set_parameters(self, name, **parameters):
+        self.nodes[name]["parameters"] = dict(self.nodes[name]["parameters"], **parameters)
+        self.reset(name)
+
+    def reset(self, name):
+        # Signal and the signals computed from it computed again on next access
+        self.values.pop(name, None)
+        for node_name, node in self.nodes.items():
+            if name in node["inputs"]:
+                self.reset(node_name)
+
+    def get_key(self, name):
+        # Hash of the version and parameters of the signal and of its inputs (topics: version of their generator)
+        if name not in self.nodes:
+            return self.topic_classes[name].generator_version
+        node = self.nodes[name]
+        description = {"version": node["version"],
+                       "parameters": node["parameters"],
+                       "inputs": {input_name: self.get_key(input_name) for input_name in node["inputs"]}}
+        return hashlib.sha1(yaml.dump(description, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+    @staticmethod
+    def get_group(name):
+        # Group of the signal in the log store (and entry of the manifest)
+        return "signal:" + name
+
+    def is_up_to_date(self, manifest, names=None):
+        # Signals saved with the current parameters (without opening the log)
+        return all(manifest.is_up_to_date(self.get_group(name), self.get_key(name))
+                   for name in (self.nodes if names is None else names))
+
+    def get(self, name):
+        if name not in self.nodes:
+            return self.log_data.get_topic(name)
+        if name not in self.values:
+            self.values[name] = self.load(name)
+            self.log_data.save_manifest()
+        return self.values[name]
+
+    def load(self, name):
+        # Signals of a partial load (time window) are computed from the window and not saved
+        store = self.log_data.store
+        manifest = self.log_data.manifest
+        group = self.get_group(name)
+        key = self.get_key(name)
+        is_windowed = self.log_data.is_windowed()
+        if not is_windowed and store.has_group(group) and (manifest is None or manifest.is_valid(group, key)):
+            return store.load_group(group)
+
+        node = self.nodes[name]
+        value = node["function"](*[self.get(input_name) for input_name in node["inputs"]], **node["parameters"])
+        if is_windowed:
+            return value
+        store.save_group(group, value)
+        if manifest is not None:
+            manifest.update(group, key)
+        return value
@@ -1,20 +1,38 @@
 #!/bin/python3
 
 import sqlite3
-from rclpy.serialization import deserialize_message
-import rosbag2_py
 import numpy as np
 import datetime
 import os
-from rosidl_runtime_py.utilities import get_message
+from .seafoil_bag_reader import SeafoilBagReader
+from .seafoil_bag_metadata import SeafoilBagMetadata
+from .seafoil_column_builder import SeafoilColumnBuilder, finalize_column
+from .seafoil_log_store import get_log_store
+from .seafoil_string_column import SeafoilStringColumn
+
+# Default offset date (no time window)
+default_offset_date = datetime.datetime(2019, 1, 1)
 
 
 class SeafoilData(object):
-    def __init__(self, bag_path="", topic_name="", offset_date=datetime.datetime(2019, 1, 1), data_folder=None):
+    # Compression of the saved columns (None: memory mapped, "lz4" or "zstd" for archived logs)
+    cache_compression = None
+    # Version of the generated class (the saved data of another version is recomputed)
+    generator_version = None
+    # Columns of the generated class (structured dtype) and their field in the messages decoded in bulk
+    dtype = None
+    record_fields = []
+
+    def __init__(self, bag_path="", topic_name="", offset_date=default_offset_date, data_folder=None, bag_reader=None, metadata=None,
+                 end_date=None, manifest=None):
         self.bag_path = bag_path
         self.data_folder = data_folder
         self.topic_name = topic_name
         self.offset_date = offset_date
+        self.end_date = end_date
+        self.bag_reader = bag_reader
+        self.metadata = metadata
+        self.manifest = manifest
 
         self.starting_time = datetime.datetime(2019, 1, 1, 0, 0)
         self.ending_time = 0
@@ -23,74 +41,179 @@ class SeafoilData(object):
         ## Topic directory for save
         # split topic name and keep only part before last /
 
-        self.topic_name_dir = self.data_folder
-        if len(self.topic_name.split('/')) > 1:
-            self.topic_name_dir += self.topic_name.rsplit('/', 1)[0]
-        self.topic_name_file = self.topic_name.rsplit('/', 1)[-1] + ".npz"
+        self.topic_name_dir, self.topic_name_file = self.get_topic_file(self.data_folder, self.topic_name)
         self.topic_full_dir = self.topic_name_dir + "/" + self.topic_name_file
+        # Columns saved in the log store (npz files of previous versions still read)
+        self.store = get_log_store(self.data_folder) if self.data_folder is not None else None
+
+        # Data saved from another bag, generator or cache version is recomputed
+        if self.is_topic_saved(self.data_folder, self.topic_name) and not self.is_data_file_valid():
+            print("Outdated data", self.topic_name)
+            self.remove_data_file()
 
         # Test if data is saved in a file
-        if not os.path.exists(self.topic_full_dir):
-            ## Determine sotrage and converter options
-            self.serialization_format = 'cdr'
-            self.storage_options = rosbag2_py.StorageOptions(uri=self.bag_path)  # , storage_id='sqlite3'
-            self.converter_options = rosbag2_py.ConverterOptions(
-                input_serialization_format=self.serialization_format,
-                output_serialization_format=self.serialization_format)
-
-            ## Count number of messages
-            # test if bag_path is not a gpx
-            if not bag_path.endswith(".gpx"):
-                self.nb_elements = self.count_nb_message()
-                self.starting_time = self.get_starting_time()
-
-            self.is_loaded_from_file = False
-            self.time = np.empty([self.nb_elements])
-            self.k = 0
+        if not self.is_topic_saved(self.data_folder, self.topic_name):
+            self.init_data()
 
         else:
-            data = np.load(self.topic_full_dir, allow_pickle=True)
+            data = self.load_data_file(['time'])
             self.time = data['time']
             self.k = len(self.time)
             self.nb_elements = self.k
             self.is_loaded_from_file = True
 
+    def init_data(self):
+        ## Count number of messages
+        # test if bag_path is not a gpx
+        if not self.bag_path.endswith(".gpx"):
+            # Metadata shared by all topics of the bag (read only once)
+            if self.metadata is None:
+                self.metadata = SeafoilBagMetadata(self.bag_path)
+            self.nb_elements = self.count_nb_message()
+            self.starting_time = self.get_starting_time()
+
+        self.is_loaded_from_file = False
+        self.time = SeafoilColumnBuilder('float')
+        self.k = 0
+
+    @staticmethod
+    def get_topic_file(data_folder, topic_name):
+        topic_name_dir = data_folder
+        if len(topic_name.split('/')) > 1:
+            topic_name_dir += topic_name.rsplit('/', 1)[0]
+        topic_name_file = topic_name.rsplit('/', 1)[-1] + ".npz"
+        return topic_name_dir, topic_name_file
+
+    @staticmethod
+    def is_topic_saved(data_folder, topic_name):
+        if data_folder is None or topic_name == "":
+            return False
+        topic_name_dir, topic_name_file = SeafoilData.get_topic_file(data_folder, topic_name)
+        return get_log_store(data_folder).has_group(topic_name) \
+            or os.path.exists(topic_name_dir + "/" + topic_name_file)
+
+    @staticmethod
+    def is_npz_saved(data_folder, topic_name):
+        # npz file of a version without manifest (valid, moved to the log store once read)
+        topic_name_dir, topic_name_file = SeafoilData.get_topic_file(data_folder, topic_name)
+        return not get_log_store(data_folder).has_group(topic_name) \
+            and os.path.exists(topic_name_dir + "/" + topic_name_file)
+
+    def is_saved_in_store(self):
+        return self.store is not None and self.store.has_group(self.topic_name)
+
+    def load_data_file(self, names=None):
+        # Columns of the saved topic (memory mapped), or npz file of previous versions
+        if self.is_saved_in_store():
+            return self.store.load_group(self.topic_name, names)
+        return np.load(self.topic_full_dir, allow_pickle=True)
+
+    def save_data_file(self, **columns):
+        if self.k > 0 and self.store is not None and not self.is_saved_in_store():
+            self.store.save_group(self.topic_name, columns, self.cache_compression)
+            if self.manifest is not None:
+                self.manifest.update(self.topic_name, self.generator_version)
+
+    def is_data_file_valid(self):
+        return self.manifest is None or self.is_npz_saved(self.data_folder, self.topic_name) \
+            or self.manifest.is_valid(self.topic_name, self.generator_version)
+
+    def remove_data_file(self):
+        if self.store is not None:
+            self.store.remove_group(self.topic_name)
+        if os.path.exists(self.topic_full_dir):
+            os.remove(self.topic_full_dir)
+        if self.manifest is not None:
+            self.manifest.remove(self.topic_name)
+
     def is_empty(self):
         if (self.k == 0):
             return True
         else:
             return False
 
+    def is_windowed(self):
+        # Partial load (only data of a complete load is saved)
+        return (self.offset_date is not None and self.offset_date > default_offset_date) or self.end_date is not None
+
+    def select_time_window(self):
+        # Keep the data (loaded from file) inside the time window
+        if not self.is_windowed() or len(self.time) == 0:
+            return
+        t = self.time + self.starting_time.timestamp()
+        start = 0 if self.offset_date is None else np.searchsorted(t, self.offset_date.timestamp(), side='right')
+        end = len(t) if self.end_date is None else np.searchsorted(t, self.end_date.timestamp(), side='right')
+        n = len(t)
+        for name, value in list(vars(self).items()):
+            if (isinstance(value, np.ndarray) and value.ndim > 0 or isinstance(value, SeafoilStringColumn)) \
+                    and len(value) == n:
+                setattr(self, name, value[start:end])
+        if len(self.time) > 0:
+            self.ending_time = self.starting_time + datetime.timedelta(seconds=self.time[-1])
+
     def add_time(self, t):
-        self.time[self.k] = t * 1e-9  - self.starting_time.timestamp()
+        self.time.append(t * 1e-9  - self.starting_time.timestamp())
         self.k = self.k + 1
 
+    def add_time_array(self, t):
+        self.time.extend(np.asarray(t, dtype='int64') * 1e-9 - self.starting_time.timestamp())
+        self.k = self.k + len(t)
+
+    def truncate_columns(self):
+        # Remove the values of a message not completely processed
+        for value in vars(self).values():
+            if isinstance(value, SeafoilColumnBuilder):
+                value.truncate(self.k)
+
     def count_nb_message(self):
-        metadata = rosbag2_py.Info().read_metadata(self.storage_options.uri, self.storage_options.storage_id)
-        match = [item for item in metadata.topics_with_message_count if item.topic_metadata.name == self.topic_name]
-        if (len(match) > 0):
-            return match[0].message_count
-        else:
-            return 0
+        return self.metadata.get_message_count(self.topic_name)
 
     def get_starting_time(self):
-        st = rosbag2_py.Info().read_metadata(self.storage_options.uri, self.storage_options.storage_id).starting_time
-        # test if st is a datetime
-
-        dt = datetime.datetime.fromtimestamp(st.nanoseconds*1e-9)
-        return dt
+        return self.metadata.get_starting_time()
 
     def process_message(self, msg):
         print("process_message not implemented")
 
+    def process_message_array(self, records):
+        if self.dtype is None:
+            print("process_message_array not implemented")
+            return
+        array = np.empty(len(records), dtype=self.dtype)
+        for name, record_name, record_index in self.record_fields:
+            array[name] = records[record_name] if record_index < 0 else records[record_name][:, record_index]
+        self.records.extend(array, copy=False)
+
+    def set_columns(self, records):
+        # Columns are views of the records (no copy)
+        for name in self.dtype.names:
+            setattr(self, name, records[name])
+
     def resize_data_array(self):
-        self.time = np.resize(self.time, self.k)
+        self.time = finalize_column(self.time)
+        if self.dtype is not None and isinstance(self.records, SeafoilColumnBuilder):
+            self.records = self.records.finalize()
+            self.set_columns(self.records)
 
     def load_message_from_file(self):
-        print("load_message_from_file not implemented")
+        if self.dtype is None:
+            print("load_message_from_file not implemented")
+            return
+        data = self.load_data_file()
+        self.starting_time = datetime.datetime.fromtimestamp(data['time'][0])
+        self.ending_time = datetime.datetime.fromtimestamp(data['time'][-1])
+        self.time = data['time'] - data['time'][0]
+        for name in self.dtype.names:
+            setattr(self, name, data[name])
+        # Columns saved separately (memory mapped)
+        self.records = None
 
     def save_data(self):
-        print("save_data not implemented")
+        if self.dtype is None:
+            print("save_data not implemented")
+            return
+        # Save data (log store)
+        self.save_data_file(time=self.time + self.starting_time.timestamp(),
+                            **{name: getattr(self, name) for name in self.dtype.names})
 
     def load_message(self):
         if self.nb_elements == 0:
@@ -99,42 +222,55 @@ class SeafoilData(object):
         # test if data directory exists (data has been already saved)
         if self.is_loaded_from_file:
             print("Load (saved)", self.topic_name)
-            self.load_message_from_file()
+            columns = {name: value for name, value in vars(self).items() if isinstance(value, SeafoilColumnBuilder)}
+            try:
+                self.load_message_from_file()
+            except KeyError as e:
+                # Data saved with other columns by a previous version: read again from the bag
+                print("Oops!  outdated data ", self.topic_name, e)
+                self.remove_data_file()
+                self.__dict__.update(columns)
+                self.init_data()
+                if self.nb_elements == 0:
+                    return
+
+        if self.is_loaded_from_file:
+            # Move the data of previous versions to the log store
+            if not self.is_saved_in_store() and len(self.time) > 0:
+                self.k = len(self.time)
+                self.save_data()
+                if self.is_saved_in_store():
+                    os.remove(self.topic_full_dir)
+            self.select_time_window()
             self.k = len(self.time)
         else:
             print("Load ", self.topic_name, flush=True)
-            ## Open the file
-            reader = rosbag2_py.SequentialReader()
-            reader.open(self.storage_options, self.converter_options)
+            ## Get the messages dispatched by the single pass reader (or read this topic alone)
+            if self.bag_reader is None:
+                self.bag_reader = SeafoilBagReader(self.bag_path, self.offset_date, metadata=self.metadata,
+                                                   end_date=self.end_date)
+            messages = self.bag_reader.pop_messages(self.topic_name)
+            if len(messages) == 0:
+                return
 
-            ## Get a map of all topics
-            topic_types = reader.get_all_topics_and_types()
-            type_map = {topic_types[i].name: topic_types[i].type for i in range(len(topic_types))}
+            ## Fixed size messages are decoded at once, without deserializing each message
+            records = self.bag_reader.decode(messages)
+            if records is not None:
+                self.process_message_array(records)
+                self.add_time_array(messages.time)
+                self.ending_time = self.starting_time + datetime.timedelta(seconds=float(self.time.last()))
+                return
 
-            ## Filter to topic name
-            filter_topic = rosbag2_py.StorageFilter(topics=[self.topic_name])
-            reader.set_filter(filter_topic)
-
-            ## Get the messages
-            while reader.has_next():
+            for data, t in zip(messages.data, messages.time):
                 try:
-                    (topic, data, t) = reader.read_next()
-                    date_msg = datetime.datetime.fromtimestamp(t / 1e9)
-
-                    try:
-                        if (date_msg > self.offset_date):
-                            msg_type = get_message(type_map[topic])
-
-                            msg = deserialize_message(data, msg_type)
-                            self.process_message(msg)
-                            self.add_time(t)
+                    msg = self.bag_reader.deserialize(data, messages.type_name)
+                    self.process_message(msg)
+                    self.add_time(t)
 
-                    except Exception as e:
-                        print("Oops!  deserialization error ", e)
-                        print(topic, data, t, msg_type)
-                        pass
                 except Exception as e:
-                    print("Oops!  read_next error ", e)
-                    pass
+                    print("Oops!  deserialization error ", e)
+                    print(self.topic_name, data, t, messages.type_name)
+                    self.truncate_columns()
 
-            self.ending_time = self.starting_time + datetime.timedelta(seconds=self.time[-1])
\ No newline at end of file
+            if self.k > 0:
+                self.ending_time = self.starting_time + datetime.timedelta(seconds=float(self.time.last()))
@@ -4,49 +4,34 @@ import sys
 import numpy as np
 import datetime
 from .seafoil_data import SeafoilData
+from .seafoil_column_builder import SeafoilColumnBuilder
 
 sys.path.append('..')
 
 
 class SeafoilDistance(SeafoilData):
+    generator_version = "90de923e7418"
+
+    # Columns of the topic (one record per message)
+    dtype = np.dtype([
+        ('distance', 'float'),
+    ])
+
+    # Field (and index) of each column in the messages decoded in bulk
+    record_fields = [
+        ('distance', 'distance', -1),
+    ]
+
     def __init__(self, topic_name=None, seafoil_bag=None):
-        SeafoilData.__init__(self, seafoil_bag.file_path, topic_name, seafoil_bag.offset_date, seafoil_bag.data_folder)
-        
-        self.distance = np.empty([self.nb_elements], dtype='float')
+        SeafoilData.__init__(self, seafoil_bag.file_path, topic_name, seafoil_bag.offset_date, seafoil_bag.data_folder, seafoil_bag.bag_reader, seafoil_bag.metadata, seafoil_bag.end_date, seafoil_bag.manifest)
+        self.records = SeafoilColumnBuilder(self.dtype)
 
         seafoil_bag.emit_signal_process_topic(self.topic_name)
         self.load_message()
         self.resize_data_array()
-        super().resize_data_array()
-        if self.k > 0 and not self.is_loaded_from_file:
+        if self.k > 0 and not self.is_loaded_from_file and not self.is_windowed():
             self.save_data()
 
     def process_message(self, msg):
-        self.distance[self.k] =msg.distance
-        
-        return
-
-    def resize_data_array(self):
-        self.distance = np.resize(self.distance,self.k)
-        
-        return
-        
-    def save_data(self):
-        import os
-        # Test if save directory exists
-        if not os.path.exists(self.topic_name_dir) and self.k > 0:
-            os.makedirs(self.topic_name_dir)
-            # Save data (compressed)
-        if not os.path.exists(self.topic_full_dir):
-            np.savez_compressed(self.topic_full_dir,
-                                time=self.time + self.starting_time.timestamp(),
-                                distance=self.distance,)
-
-    def load_message_from_file(self):
-        data = np.load(self.topic_full_dir, allow_pickle=True)
-        self.starting_time = datetime.datetime.fromtimestamp(data['time'][0])
-        self.ending_time = datetime.datetime.fromtimestamp(data['time'][-1])
-        self.time = data['time'] - data['time'][0]
-        self.distance = data['distance']
-        
-    
\ No newline at end of file
+        self.records.append((msg.distance,))
+        return
\ No newline at end of file
@@ -0,0 +1,25 @@
+#!/bin/python3
+
+import numpy as np
+
+# Radius of the Earth (m), same as gpxpy
+earth_radius = 6378137.0
+
+
+def get_distance(latitude_1, longitude_1, latitude_2, longitude_2):
+    # Haversine distance (m) between the points 1 and 2 (degrees), for arrays of points
+    latitude_1, longitude_1, latitude_2, longitude_2 = [np.radians(np.asarray(value, dtype='double')) for value in
+                                                        (latitude_1, longitude_1, latitude_2, longitude_2)]
+    a = np.sin((latitude_2 - latitude_1) / 2) ** 2 \
+        + np.cos(latitude_1) * np.cos(latitude_2) * np.sin((longitude_2 - longitude_1) / 2) ** 2
+    return 2 * earth_radius * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def get_bearing(latitude_1, longitude_1, latitude_2, longitude_2):
+    # Initial bearing (degrees from the north, clockwise) from the points 1 to the points 2
+    latitude_1, longitude_1, latitude_2, longitude_2 = [np.radians(np.asarray(value, dtype='double')) for value in
+                                                        (latitude_1, longitude_1, latitude_2, longitude_2)]
+    delta_longitude = longitude_2 - longitude_1
+    y = np.sin(delta_longitude) * np.cos(latitude_2)
+    x = np.cos(latitude_1) * np.sin(latitude_2) - np.sin(latitude_1) * np.cos(latitude_2) * np.cos(delta_longitude)
+    return np.degrees(np.arctan2(y, x)) % 360.
@@ -4,8 +4,12 @@ import sys
 import numpy as np
 import datetime
 from .seafoil_data import SeafoilData
+from .seafoil_column_builder import SeafoilColumnBuilder, finalize_column
+from .seafoil_geodesy import get_distance, get_bearing
+from xml.parsers import expat
 import gpxpy
 import gpxpy.gpx
+import gpxpy.gpxfield
 
 def correction_of_malformed_gpx(gpx_file_content):
     # remplace balise of the form *:* by *_* in the gpx file (only with letters around)
@@ -13,7 +17,115 @@ def correction_of_malformed_gpx(gpx_file_content):
 
     return gpx_file_content
 
+
+def parse_gpx_time(text):
+    # Time of a point (UTC when the time zone is not given), None if it can not be read
+    try:
+        date = datetime.datetime.fromisoformat(text.strip())
+    except ValueError:
+        try:
+            date = gpxpy.gpxfield.parse_time(text.strip())
+        except gpxpy.gpx.GPXException:
+            return None
+    if date is None:
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=datetime.timezone.utc)
+    return date.timestamp()
+
+
+class SeafoilGpxReader(object):
+    # Streaming reader of the points of the tracks (without the tree of the whole file)
+    # Namespaces are not processed: the tags with undeclared prefixes are read without correction
+    def __init__(self):
+        self.time_gnss = SeafoilColumnBuilder('double')
+        self.latitude = SeafoilColumnBuilder('double')
+        self.longitude = SeafoilColumnBuilder('double')
+
+        self.point = None  # latitude and longitude of the point being read
+        self.point_time = None
+        self.text = []
+
+        self.parser = expat.ParserCreate()
+        self.parser.buffer_text = True
+        self.parser.StartElementHandler = self.start_element
+        self.parser.EndElementHandler = self.end_element
+
+    def read(self, file_name):
+        # Points without time are ignored, the points before an error are kept (truncated file)
+        with open(file_name, 'rb') as file:
+            try:
+                self.parser.ParseFile(file)
+            except expat.ExpatError as e:
+                print("Oops!  malformed gpx file ", file_name, e)
+        return self.time_gnss.finalize(), self.latitude.finalize(), self.longitude.finalize()
+
+    def start_element(self, name, attributes):
+        name = name.rsplit(':', 1)[-1]
+        if name == 'trkpt':
+            self.point = (float(attributes['lat']), float(attributes['lon']))
+            self.point_time = None
+        elif name == 'time' and self.point is not None:
+            self.text = []
+            self.parser.CharacterDataHandler = self.text.append
+
+    def end_element(self, name):
+        name = name.rsplit(':', 1)[-1]
+        if name == 'time' and self.point is not None:
+            self.parser.CharacterDataHandler = None
+            self.point_time = parse_gpx_time("".join(self.text))
+        elif name == 'trkpt':
+            if self.point_time is not None:
+                self.time_gnss.append(self.point_time)
+                self.latitude.append(self.point[0])
+                self.longitude.append(self.point[1])
+            self.point = None
+
+
+def get_gpx_times(time_gnss):
+    # Times of the points (UTC), with microseconds only when they are not null (as gpxpy)
+    time_us = np.round(np.asarray(time_gnss, dtype='double') * 1e6).astype('int64')
+    date = time_us.astype('datetime64[us]')
+    return np.where(time_us % 1000000 == 0, np.datetime_as_string(date, unit='s'),
+                    np.datetime_as_string(date, unit='us'))
+
+
+def write_gpx_track(file_name, time_gnss, latitude, longitude, is_point, creator="SeaFoil", name="",
+                    chunk_size=10000):
+    # Gpx file (version 1.1) of a track written by chunks of points, with a segment for each run of points kept
+    is_point = np.asarray(is_point, dtype='bool')
+    # Index of the first point of each segment, and of the point after its end
+    edges = np.diff(np.concatenate(([0], is_point.astype('int8'), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+
+    with open(file_name, "w") as file:
+        file.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                   '<gpx xmlns="http://www.topografix.com/GPX/1/1" '
+                   'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+                   'xsi:schemaLocation="http://www.topografix.com/GPX/1/1 http://www.topografix.com/GPX/1/1/gpx.xsd" '
+                   'version="1.1" creator="' + creator + '">\n'
+                   '  <trk>\n'
+                   '    <name>' + name + '</name>\n')
+        for start, end in zip(starts, ends):
+            file.write('    <trkseg>\n')
+            for k in range(start, end, chunk_size):
+                k_end = min(k + chunk_size, end)
+                file.write("".join('      <trkpt lat="%s" lon="%s">\n'
+                                   '        <time>%sZ</time>\n'
+                                   '      </trkpt>\n' % point for point in
+                                   zip(np.asarray(latitude[k:k_end], dtype='double').tolist(),
+                                       np.asarray(longitude[k:k_end], dtype='double').tolist(),
+                                       get_gpx_times(time_gnss[k:k_end]))))
+            file.write('    </trkseg>\n')
+        file.write('  </trk>\n'
+                   '</gpx>')
+
+
 class SeafoilGpx(SeafoilData):
+    # Version of the points read from the gpx file (speed, track and distance computed from the positions)
+    generator_version = "gpx-1"
+
     def __init__(self, gpx_file_name="", data_folder=None):
         SeafoilData.__init__(self, gpx_file_name, data_folder=data_folder)
 
@@ -25,16 +137,16 @@ class SeafoilGpx(SeafoilData):
         self.nb_elements = 0
         self.ending_time = 0
 
-        self.time = np.empty([self.nb_elements])
-        self.latitude = np.empty([self.nb_elements], dtype='double')
-        self.longitude = np.empty([self.nb_elements], dtype='double')
-        self.speed = np.empty([self.nb_elements], dtype='double')
-        self.track = np.empty([self.nb_elements], dtype='double')
-        self.distance = np.empty([self.nb_elements], dtype='double')
-        self.mode = np.empty([self.nb_elements], dtype='int16')
-        self.status = np.empty([self.nb_elements], dtype='int16')
-        self.time_gnss = np.empty([self.nb_elements], dtype='double')
-        self.satellites_visible = np.empty([self.nb_elements], dtype='int32')
+        self.time = SeafoilColumnBuilder('double')
+        self.latitude = SeafoilColumnBuilder('double')
+        self.longitude = SeafoilColumnBuilder('double')
+        self.speed = SeafoilColumnBuilder('double')
+        self.track = SeafoilColumnBuilder('double')
+        self.distance = SeafoilColumnBuilder('double')
+        self.mode = SeafoilColumnBuilder('int16')
+        self.status = SeafoilColumnBuilder('int16')
+        self.time_gnss = SeafoilColumnBuilder('double')
+        self.satellites_visible = SeafoilColumnBuilder('int32')
 
         if self.is_loaded_from_file:
             print("Load (saved)", self.topic_name)
@@ -45,82 +157,64 @@ class SeafoilGpx(SeafoilData):
 
 
     def resize_data_array(self):
-        self.time = np.resize(self.time,self.nb_elements)
-        self.latitude = np.resize(self.latitude, self.nb_elements)
-        self.longitude = np.resize(self.longitude, self.nb_elements)
-        self.speed = np.resize(self.speed, self.nb_elements)
-        self.track = np.resize(self.track, self.nb_elements)
-        self.distance = np.resize(self.distance, self.nb_elements)
-        self.mode = np.resize(self.mode, self.nb_elements)
-        self.status = np.resize(self.status, self.nb_elements)
-        self.time_gnss = np.resize(self.time_gnss, self.nb_elements)
-        self.satellites_visible = np.resize(self.satellites_visible, self.nb_elements)
+        self.time = finalize_column(self.time)
+        self.latitude = finalize_column(self.latitude)
+        self.longitude = finalize_column(self.longitude)
+        self.speed = finalize_column(self.speed)
+        self.track = finalize_column(self.track)
+        self.distance = finalize_column(self.distance)
+        self.mode = finalize_column(self.mode)
+        self.status = finalize_column(self.status)
+        self.time_gnss = finalize_column(self.time_gnss)
+        self.satellites_visible = finalize_column(self.satellites_visible)
 
     def load_message(self):
-
-        # open gpx file
-        gpx_file = open(self.bag_path, 'r')
-        gpx = gpxpy.parse(correction_of_malformed_gpx(gpx_file.read()))
-
-        # make the sum of the number of points in each segment
-        self.nb_elements = 0
-        for track in gpx.tracks:
-            for segment in track.segments:
-                self.nb_elements += len(segment.points)
-        #self.start_date = gpx.tracks[0].segments[0].points[0].time
-        self.starting_time = gpx.tracks[0].segments[0].points[0].time
-        self.ending_time = gpx.tracks[-1].segments[-1].points[-1].time
-
-        self.resize_data_array()
-
-        # Loop over all points
-        self.k = 0
-        previous_point = None
-        for i, track in enumerate(gpx.tracks):
-            for j, segment in enumerate(track.segments):
-                for k, point in enumerate(segment.points):
-                    self.time[self.k] = (point.time - self.starting_time).total_seconds()
-                    self.time_gnss[self.k] = point.time.timestamp()
-                    self.latitude[self.k] = point.latitude
-                    self.longitude[self.k] = point.longitude
-                    self.mode[self.k] = 3
-                    self.status[self.k] = 0
-                    self.satellites_visible[self.k] = 0
-
-                    if previous_point is None:
-                        self.speed[self.k] = 0
-                        self.track[self.k] = 0
-                        self.distance[self.k] = 0
-                    else:
-                        # compute speed/track with previous point
-                        self.speed[self.k] = point.speed_between(gpx.tracks[i].segments[j].points[k-1])
-                        self.track[self.k] = gpx.tracks[i].segments[j].points[k-1].course_between(point)
-                        # compute distance from previous point
-                        self.distance[self.k] = self.distance[self.k-1] + previous_point.distance_2d(point)
-                    self.k += 1
-                    previous_point = point
+        # Points read by a streaming parser, speed, track and distance computed for all the points at once
+        time_gnss, latitude, longitude = SeafoilGpxReader().read(self.bag_path)
+        self.k = len(time_gnss)
+        self.nb_elements = self.k
+        if self.k == 0:
+            print("Oops!  no point in gpx file ", self.bag_path)
+            self.resize_data_array()
+            return
+
+        self.starting_time = datetime.datetime.fromtimestamp(time_gnss[0], datetime.timezone.utc)
+        self.ending_time = datetime.datetime.fromtimestamp(time_gnss[-1], datetime.timezone.utc)
+        self.time = time_gnss - time_gnss[0]
+        self.time_gnss = time_gnss
+        self.latitude = latitude
+        self.longitude = longitude
+
+        # Speed and track with the previous point (0 for the first point)
+        step = get_distance(latitude[:-1], longitude[:-1], latitude[1:], longitude[1:])
+        dt = np.diff(time_gnss)
+        self.speed = np.zeros(self.k)
+        np.divide(step, dt, out=self.speed[1:], where=dt > 0)
+        self.track = np.zeros(self.k)
+        self.track[1:] = get_bearing(latitude[:-1], longitude[:-1], latitude[1:], longitude[1:])
+        self.distance = np.zeros(self.k)
+        np.cumsum(step, out=self.distance[1:])
+
+        self.mode = np.full(self.k, 3, dtype='int16')
+        self.status = np.zeros(self.k, dtype='int16')
+        self.satellites_visible = np.zeros(self.k, dtype='int32')
 
     def save_data(self):
-        import os
-        if not os.path.exists(self.topic_name_dir) and self.k > 0:
-            os.makedirs(self.topic_name_dir)
-        # Save data (compressed)
-        if not os.path.exists(self.topic_full_dir):
-            np.savez_compressed(self.topic_full_dir,
-                                time=self.time+self.starting_time.timestamp(),
-                                latitude=self.latitude,
-                                longitude=self.longitude,
-                                speed=self.speed,
-                                track=self.track,
-                                distance=self.distance,
-                                mode=self.mode,
-                                status=self.status,
-                                time_gnss=self.time_gnss,
-                                satellites_visible=self.satellites_visible,
-                                )
+        # Save data (log store)
+        self.save_data_file(time=self.time+self.starting_time.timestamp(),
+                            latitude=self.latitude,
+                            longitude=self.longitude,
+                            speed=self.speed,
+                            track=self.track,
+                            distance=self.distance,
+                            mode=self.mode,
+                            status=self.status,
+                            time_gnss=self.time_gnss,
+                            satellites_visible=self.satellites_visible,
+                            )
 
     def load_message_from_file(self):
-        data = np.load(self.topic_full_dir, allow_pickle=True)
+        data = self.load_data_file()
         self.starting_time = datetime.datetime.utcfromtimestamp(data["time"][0])
         self.time = data["time"] - data["time"][0]
         self.latitude = data["latitude"]
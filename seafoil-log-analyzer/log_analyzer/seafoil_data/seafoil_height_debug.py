@@ -4,64 +4,43 @@ import sys
 import numpy as np
 import datetime
 from .seafoil_data import SeafoilData
+from .seafoil_column_builder import SeafoilColumnBuilder
 
 sys.path.append('..')
 
 
 class SeafoilHeightDebug(SeafoilData):
+    generator_version = "7713eb0c205b"
+
+    # Columns of the topic (one record per message)
+    dtype = np.dtype([
+        ('profile', 'float', (128,)),
+        ('interval_center', 'uint8'),
+        ('interval_diam', 'uint8'),
+        ('height_unfiltered', 'float'),
+    ])
+
+    # Field (and index) of each column in the messages decoded in bulk
+    record_fields = [
+        ('profile', 'profile', -1),
+        ('interval_center', 'interval_center', -1),
+        ('interval_diam', 'interval_diam', -1),
+        ('height_unfiltered', 'height_unfiltered', -1),
+    ]
+
     def __init__(self, topic_name=None, seafoil_bag=None):
-        SeafoilData.__init__(self, seafoil_bag.file_path, topic_name, seafoil_bag.offset_date, seafoil_bag.data_folder)
-        
-        self.profile = np.empty([self.nb_elements, 128], dtype='float')
-        self.interval_center = np.empty([self.nb_elements], dtype='uint8')
-        self.interval_diam = np.empty([self.nb_elements], dtype='uint8')
-        self.height_unfiltered = np.empty([self.nb_elements], dtype='float')
+        SeafoilData.__init__(self, seafoil_bag.file_path, topic_name, seafoil_bag.offset_date, seafoil_bag.data_folder, seafoil_bag.bag_reader, seafoil_bag.metadata, seafoil_bag.end_date, seafoil_bag.manifest)
+        self.records = SeafoilColumnBuilder(self.dtype)
 
         seafoil_bag.emit_signal_process_topic(self.topic_name)
         self.load_message()
         self.resize_data_array()
-        super().resize_data_array()
-        if self.k > 0 and not self.is_loaded_from_file:
+        if self.k > 0 and not self.is_loaded_from_file and not self.is_windowed():
             self.save_data()
 
     def process_message(self, msg):
-        self.profile[self.k, :] =np.array(msg.profile, dtype='float')
-        self.interval_center[self.k] =msg.interval_center
-        self.interval_diam[self.k] =msg.interval_diam
-        self.height_unfiltered[self.k] =msg.height_unfiltered
-        
-        return
-
-    def resize_data_array(self):
-        self.profile = np.resize(self.profile,[self.k, 128])
-        self.interval_center = np.resize(self.interval_center,self.k)
-        self.interval_diam = np.resize(self.interval_diam,self.k)
-        self.height_unfiltered = np.resize(self.height_unfiltered,self.k)
-        
-        return
-        
-    def save_data(self):
-        import os
-        # Test if save directory exists
-        if not os.path.exists(self.topic_name_dir) and self.k > 0:
-            os.makedirs(self.topic_name_dir)
-            # Save data (compressed)
-        if not os.path.exists(self.topic_full_dir):
-            np.savez_compressed(self.topic_full_dir,
-                                time=self.time + self.starting_time.timestamp(),
-                                profile=self.profile,
-                                interval_center=self.interval_center,
-                                interval_diam=self.interval_diam,
-                                height_unfiltered=self.height_unfiltered,)
-
-    def load_message_from_file(self):
-        data = np.load(self.topic_full_dir, allow_pickle=True)
-        self.starting_time = datetime.datetime.fromtimestamp(data['time'][0])
-        self.ending_time = datetime.datetime.fromtimestamp(data['time'][-1])
-        self.time = data['time'] - data['time'][0]
-        self.profile = data['profile']
-        self.interval_center = data['interval_center']
-        self.interval_diam = data['interval_diam']
-        self.height_unfiltered = data['height_unfiltered']
-        
-    
\ No newline at end of file
+        self.records.append((np.array(msg.profile, dtype='float'),
+                             msg.interval_center,
+                             msg.interval_diam,
+                             msg.height_unfiltered,))
+        return
\ No newline at end of file
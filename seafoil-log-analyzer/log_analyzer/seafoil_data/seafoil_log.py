@@ -4,79 +4,55 @@ import sys
 import numpy as np
 import datetime
 from .seafoil_data import SeafoilData
+from .seafoil_column_builder import SeafoilColumnBuilder
 
 sys.path.append('..')
 
 
 class SeafoilLog(SeafoilData):
+    generator_version = "949b702ae932"
+
+    # Columns of the topic (one record per message)
+    dtype = np.dtype([
+        ('stamp_sec', 'int32'),
+        ('stamp_nanosec', 'uint32'),
+        ('level', 'uint8'),
+        ('name', 'object'),
+        ('msg', 'object'),
+        ('file_name', 'object'),
+        ('function', 'object'),
+        ('line', 'uint32'),
+    ])
+
+    # Field (and index) of each column in the messages decoded in bulk
+    record_fields = [
+        ('stamp_sec', 'stamp.sec', -1),
+        ('stamp_nanosec', 'stamp.nanosec', -1),
+        ('level', 'level', -1),
+        ('name', 'name', -1),
+        ('msg', 'msg', -1),
+        ('file_name', 'file', -1),
+        ('function', 'function', -1),
+        ('line', 'line', -1),
+    ]
+
     def __init__(self, topic_name=None, seafoil_bag=None):
-        SeafoilData.__init__(self, seafoil_bag.file_path, topic_name, seafoil_bag.offset_date, seafoil_bag.data_folder)
-        
-        self.stamp = np.empty([self.nb_elements], dtype='object')
-        self.level = np.empty([self.nb_elements], dtype='uint8')
-        self.name = np.empty([self.nb_elements], dtype='object')
-        self.msg = np.empty([self.nb_elements], dtype='object')
-        self.file_name = np.empty([self.nb_elements], dtype='object')
-        self.function = np.empty([self.nb_elements], dtype='object')
-        self.line = np.empty([self.nb_elements], dtype='uint32')
+        SeafoilData.__init__(self, seafoil_bag.file_path, topic_name, seafoil_bag.offset_date, seafoil_bag.data_folder, seafoil_bag.bag_reader, seafoil_bag.metadata, seafoil_bag.end_date, seafoil_bag.manifest)
+        self.records = SeafoilColumnBuilder(self.dtype)
 
         seafoil_bag.emit_signal_process_topic(self.topic_name)
         self.load_message()
         self.resize_data_array()
-        super().resize_data_array()
-        if self.k > 0 and not self.is_loaded_from_file:
+        if self.k > 0 and not self.is_loaded_from_file and not self.is_windowed():
             self.save_data()
 
     def process_message(self, msg):
-        self.stamp[self.k] =msg.stamp
-        self.level[self.k] =msg.level
-        self.name[self.k] =msg.name
-        self.msg[self.k] =msg.msg
-        self.file_name[self.k] =msg.file
-        self.function[self.k] =msg.function
-        self.line[self.k] =msg.line
-        
-        return
-
-    def resize_data_array(self):
-        self.stamp = np.resize(self.stamp,self.k)
-        self.level = np.resize(self.level,self.k)
-        self.name = np.resize(self.name,self.k)
-        self.msg = np.resize(self.msg,self.k)
-        self.file_name = np.resize(self.file_name,self.k)
-        self.function = np.resize(self.function,self.k)
-        self.line = np.resize(self.line,self.k)
-        
-        return
-        
-    def save_data(self):
-        import os
-        # Test if save directory exists
-        if not os.path.exists(self.topic_name_dir) and self.k > 0:
-            os.makedirs(self.topic_name_dir)
-            # Save data (compressed)
-        if not os.path.exists(self.topic_full_dir):
-            np.savez_compressed(self.topic_full_dir,
-                                time=self.time + self.starting_time.timestamp(),
-                                stamp=self.stamp,
-                                level=self.level,
-                                name=self.name,
-                                msg=self.msg,
-                                file_name=self.file_name,
-                                function=self.function,
-                                line=self.line,)
-
-    def load_message_from_file(self):
-        data = np.load(self.topic_full_dir, allow_pickle=True)
-        self.starting_time = datetime.datetime.fromtimestamp(data['time'][0])
-        self.ending_time = datetime.datetime.fromtimestamp(data['time'][-1])
-        self.time = data['time'] - data['time'][0]
-        self.stamp = data['stamp']
-        self.level = data['level']
-        self.name = data['name']
-        self.msg = data['msg']
-        self.file_name = data['file_name']
-        self.function = data['function']
-        self.line = data['line']
-        
-    
\ No newline at end of file
+        self.records.append((msg.stamp.sec,
+                             msg.stamp.nanosec,
+                             msg.level,
+                             msg.name,
+                             msg.msg,
+                             msg.file,
+                             msg.function,
+                             msg.line,))
+        return
\ No newline at end of file
@@ -0,0 +1,188 @@
+#!/bin/python3
+
+import io
+import os
+import json
+import struct
+import numpy as np
+
+from .seafoil_column_cache import get_column_arrays, group_string_columns, compress_bytes, decompress_bytes
+
+# Single file with all the columns of a log (data/log.store):
+# magic, arrays (npy format, aligned), directory of the columns (json), footer (offset of the directory, magic)
+store_magic = b"SEAFSTR1"
+store_footer = struct.Struct("<Q8s")
+store_alignment = 64
+
+# Stores opened (by file name), the directory is shared by all the topics of a log
+log_stores = {}
+
+
+def get_log_store(data_folder):
+    file_name = os.path.normpath(data_folder) + "/log.store"
+    if file_name not in log_stores:
+        log_stores[file_name] = SeafoilLogStore(file_name)
+    return log_stores[file_name]
+
+
+class SeafoilLogStore(object):
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.directory = {}  # columns of each group (topic or derived data): offset, size and compression
+        self.end_offset = None  # end of the arrays (start of the directory)
+        self.stat = None
+        self.load()
+
+    def load(self):
+        # Directory read again only if the file changed since the last read
+        if not os.path.exists(self.file_name):
+            self.directory = {}
+            self.end_offset = None
+            self.stat = None
+            return
+        stat = os.stat(self.file_name)
+        if self.stat == (stat.st_size, stat.st_mtime_ns):
+            return
+
+        try:
+            with open(self.file_name, 'rb') as file:
+                file.seek(-store_footer.size, os.SEEK_END)
+                end_offset, magic = store_footer.unpack(file.read(store_footer.size))
+                if magic != store_magic:
+                    raise ValueError("invalid footer")
+                file.seek(end_offset)
+                self.directory = json.loads(file.read(stat.st_size - store_footer.size - end_offset))
+                self.end_offset = end_offset
+        except (OSError, ValueError) as e:
+            # Interrupted write: the data is computed again
+            print("Oops!  invalid log store ", self.file_name, e)
+            self.directory = {}
+            self.end_offset = None
+        self.stat = (stat.st_size, stat.st_mtime_ns)
+
+    def has_group(self, group):
+        self.load()
+        return group in self.directory
+
+    def get_groups(self):
+        self.load()
+        return list(self.directory.keys())
+
+    def write_directory(self, file):
+        file.seek(self.end_offset)
+        file.write(json.dumps(self.directory).encode('utf-8'))
+        file.write(store_footer.pack(self.end_offset, store_magic))
+        file.truncate()
+
+    def save_group(self, group, columns, compression=None):
+        # Arrays appended after the last ones (the arrays of a replaced group are not rewritten)
+        self.load()
+        if self.end_offset is None:
+            os.makedirs(os.path.dirname(self.file_name), exist_ok=True)
+            self.directory = {}
+            self.end_offset = len(store_magic)
+            with open(self.file_name, 'wb') as file:
+                file.write(store_magic)
+
+        entries = {}
+        with open(self.file_name, 'r+b') as file:
+            offset = self.end_offset
+            for name, column in columns.items():
+                for array_name, array in get_column_arrays(name, column):
+                    # Arrays aligned for memory mapping
+                    offset += -offset % store_alignment
+                    file.seek(offset)
+                    if compression is None:
+                        np.lib.format.write_array(file, array, allow_pickle=False)
+                        size = file.tell() - offset
+                    else:
+                        buffer = io.BytesIO()
+                        np.lib.format.write_array(buffer, array, allow_pickle=False)
+                        size = file.write(compress_bytes(buffer.getvalue(), compression))
+                    entries[array_name] = {"offset": offset, "size": size, "compression": compression}
+                    offset += size
+
+            self.directory[group] = entries
+            self.end_offset = offset
+            self.write_directory(file)
+        self.update_stat()
+
+        if self.get_unused_size() > max(self.get_used_size(), 1e6):
+            self.compact()
+
+    def load_group(self, group, names=None):
+        self.load()
+        columns = {}
+        with open(self.file_name, 'rb') as file:
+            for name, entry in self.directory[group].items():
+                if names is None or name.split('.')[0] in names:
+                    columns[name] = self.read_array(file, entry)
+        return group_string_columns(columns)
+
+    def read_array(self, file, entry):
+        file.seek(entry["offset"])
+        if entry["compression"] is not None:
+            data = decompress_bytes(file.read(entry["size"]), entry["compression"])
+            return np.lib.format.read_array(io.BytesIO(data), allow_pickle=False)
+
+        # Memory mapped (read only, read from disk on access), python objects are refused (never saved)
+        version = np.lib.format.read_magic(file)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(file)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(file)
+        if dtype.hasobject or np.prod(shape) == 0:
+            file.seek(entry["offset"])
+            return np.lib.format.read_array(file, allow_pickle=False)
+        return np.memmap(self.file_name, dtype=dtype, mode='r', offset=file.tell(), shape=shape,
+                         order='F' if fortran_order else 'C')
+
+    def remove_group(self, group):
+        self.load()
+        if group not in self.directory:
+            return
+        del self.directory[group]
+        with open(self.file_name, 'r+b') as file:
+            self.write_directory(file)
+        self.update_stat()
+
+    def update_stat(self):
+        stat = os.stat(self.file_name)
+        self.stat = (stat.st_size, stat.st_mtime_ns)
+
+    def get_used_size(self):
+        return sum(entry["size"] for entries in self.directory.values() for entry in entries.values())
+
+    def get_unused_size(self):
+        # Arrays of the removed or replaced groups
+        return self.end_offset - len(store_magic) - self.get_used_size()
+
+    def compact(self):
+        # Copy of the used arrays in a new file (the arrays already mapped stay valid)
+        tmp_file_name = self.file_name + ".tmp"
+        directory = {}
+        with open(self.file_name, 'rb') as file, open(tmp_file_name, 'wb') as tmp_file:
+            tmp_file.write(store_magic)
+            offset = len(store_magic)
+            for group, entries in self.directory.items():
+                directory[group] = {}
+                for name, entry in entries.items():
+                    offset += -offset % store_alignment
+                    file.seek(entry["offset"])
+                    tmp_file.seek(offset)
+                    tmp_file.write(file.read(entry["size"]))
+                    directory[group][name] = dict(entry, offset=offset)
+                    offset += entry["size"]
+            self.directory = directory
+            self.end_offset = offset
+            self.write_directory(tmp_file)
+        try:
+            os.replace(tmp_file_name, self.file_name)
+        except OSError as e:
+            # File still mapped (Windows): compacted at the next save
+            print("Oops!  log store not compacted ", e)
+            os.remove(tmp_file_name)
+            self.stat = None
+            self.load()
+            return
+        self.update_stat()
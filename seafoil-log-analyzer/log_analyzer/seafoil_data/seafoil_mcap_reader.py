@@ -0,0 +1,411 @@
+#!/bin/python3
+
+import os
+import re
+import struct
+
+from .seafoil_cdr_decoder import deserialize_cdr_message
+
+# Optional decompression libraries (chunks of rosbag2 mcap files are zstd or lz4 compressed)
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+mcap_magic = b'\x89MCAP0\r\n'
+# Footer record: opcode (1), length (8), summary_start (8), summary_offset_start (8), summary_crc (4)
+mcap_footer_size = 1 + 8 + 8 + 8 + 4
+# Size of the groups of messages written outside of chunks (read as a chunk)
+mcap_records_size = 1 << 20
+
+# Record opcodes
+op_footer = 0x02
+op_schema = 0x03
+op_channel = 0x04
+op_message = 0x05
+op_chunk = 0x06
+op_chunk_index = 0x08
+op_statistics = 0x0B
+
+# ros2msg types and their rosidl name
+ros2msg_types = {
+    'float64': 'double',
+    'float32': 'float',
+    'bool': 'boolean',
+    'byte': 'octet',
+    'char': 'uint8',
+}
+ros2msg_primitives = ['boolean', 'octet', 'int8', 'uint8', 'int16', 'uint16', 'int32', 'uint32',
+                      'int64', 'uint64', 'float', 'double']
+
+
+def read_mcap_footer(file_path):
+    # Return (summary_start, footer offset) of a complete mcap file (None if truncated)
+    try:
+        with open(file_path, 'rb') as file:
+            file.seek(0, os.SEEK_END)
+            size = file.tell()
+            if size < mcap_footer_size + 2 * len(mcap_magic):
+                return None
+            footer_offset = size - mcap_footer_size - len(mcap_magic)
+            file.seek(footer_offset)
+            footer = file.read(mcap_footer_size + len(mcap_magic))
+    except OSError:
+        return None
+
+    if footer[-len(mcap_magic):] != mcap_magic or footer[0] != op_footer:
+        return None
+    return struct.unpack_from('<Q', footer, 9)[0], footer_offset
+
+
+def normalize_type_name(type_name):
+    # "pkg/msg/Type" -> "pkg/Type"
+    return type_name.replace('/msg/', '/')
+
+
+def convert_ros2msg_type(ros_type, package):
+    array = re.fullmatch(r'(.+?)\[(<=)?(\d*)\]', ros_type)
+    base = ros_type if array is None else array.group(1)
+
+    if base in ros2msg_types:
+        base = ros2msg_types[base]
+    elif base not in ros2msg_primitives and not base.startswith('string') and not base.startswith('wstring'):
+        base = normalize_type_name(base) if '/' in base else package + '/' + base
+
+    if array is None:
+        return base
+    elif array.group(3) == '':
+        return 'sequence<' + base + '>'
+    elif array.group(2) is not None:
+        return 'sequence<' + base + ', ' + array.group(3) + '>'
+    else:
+        return base + '[' + array.group(3) + ']'
+
+
+def parse_ros2msg(schema_name, text):
+    # Convert a ros2msg schema (with its dependencies) to {type_name: {field: rosidl type}}
+    definitions = {}
+    current = normalize_type_name(schema_name)
+    definitions[current] = {}
+    for line in text.splitlines():
+        line = line.split('#', 1)[0].strip()
+        if len(line) == 0 or line.startswith('==='):
+            continue
+        if line.startswith('MSG:'):
+            current = normalize_type_name(line[4:].strip())
+            definitions[current] = {}
+            continue
+        # Skip constants
+        if '=' in line.replace('<=', ''):
+            continue
+        parts = line.split()
+        if len(parts) < 2:
+            continue
+        definitions[current][parts[1]] = convert_ros2msg_type(parts[0], current.split('/')[0])
+    return definitions
+
+
+class SeafoilMcapBuffer(object):
+    # Little endian cursor over an mcap record
+    def __init__(self, data, offset=0):
+        self.data = data
+        self.offset = offset
+
+    def unpack(self, fmt):
+        value = struct.unpack_from(fmt, self.data, self.offset)[0]
+        self.offset += struct.calcsize(fmt)
+        return value
+
+    def string(self):
+        n = self.unpack('<I')
+        value = bytes(self.data[self.offset:self.offset + n]).decode('utf-8')
+        self.offset += n
+        return value
+
+    def bytes(self, prefix='<I'):
+        n = self.unpack(prefix)
+        value = self.data[self.offset:self.offset + n]
+        self.offset += n
+        return value
+
+    def map(self, key_fmt, value_fmt):
+        n = self.unpack('<I')
+        end = self.offset + n
+        value = {}
+        while self.offset < end:
+            key = self.unpack(key_fmt)
+            value[key] = self.unpack(value_fmt)
+        return value
+
+
+def iterate_records(data, offset=0):
+    # Yield (opcode, content) of the records in data, stop at a truncated record
+    size = len(data)
+    while offset + 9 <= size:
+        opcode = data[offset]
+        length = struct.unpack_from('<Q', data, offset + 1)[0]
+        start = offset + 9
+        if start + length > size:
+            return
+        yield opcode, data[start:start + length]
+        offset = start + length
+
+
+class SeafoilMcapFile(object):
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.schemas = {}  # id: (name, encoding, data)
+        self.channels = {}  # id: (topic, schema_id)
+        # dict with start/end time, offset, length, compression, channels (and is_chunk: False for the groups of
+        # messages written outside of chunks)
+        self.chunk_indexes = []
+        self.message_count = {}  # channel_id: count
+        self.message_start_time = None
+        self.message_end_time = None
+
+        footer = read_mcap_footer(self.file_path)
+        if footer is not None and footer[0] > 0:
+            self.read_summary(*footer)
+        # Without summary (or without the chunk indexes and statistics) the file is scanned
+        if len(self.chunk_indexes) == 0 or self.message_start_time is None:
+            self.chunk_indexes = []
+            self.scan()
+
+        for chunk_index in self.chunk_indexes:
+            self.get_decompressor(chunk_index['compression'])
+
+    def get_decompressor(self, compression):
+        if compression == '':
+            return lambda data, size: data
+        elif compression == 'zstd' and zstandard is not None:
+            return lambda data, size: zstandard.ZstdDecompressor().decompress(data, max_output_size=size)
+        elif compression == 'lz4' and lz4 is not None:
+            return lambda data, size: lz4.frame.decompress(data)
+        raise ValueError("Unsupported mcap compression: " + compression)
+
+    def add_record(self, opcode, content):
+        buffer = SeafoilMcapBuffer(content)
+        if opcode == op_schema:
+            schema_id = buffer.unpack('<H')
+            name = buffer.string()
+            encoding = buffer.string()
+            self.schemas[schema_id] = (name, encoding, bytes(buffer.bytes()))
+        elif opcode == op_channel:
+            channel_id = buffer.unpack('<H')
+            schema_id = buffer.unpack('<H')
+            topic = buffer.string()
+            self.channels[channel_id] = (topic, schema_id)
+
+    def read_summary(self, summary_start, footer_offset):
+        with open(self.file_path, 'rb') as file:
+            file.seek(summary_start)
+            summary = file.read(footer_offset - summary_start)
+
+        for opcode, content in iterate_records(summary):
+            if opcode == op_chunk_index:
+                buffer = SeafoilMcapBuffer(content)
+                chunk_index = {'message_start_time': buffer.unpack('<Q'),
+                               'message_end_time': buffer.unpack('<Q'),
+                               'offset': buffer.unpack('<Q'),
+                               'length': buffer.unpack('<Q'),
+                               'is_chunk': True}
+                # Channels of the chunk, from its message index (unknown if not written)
+                chunk_index['channels'] = set(buffer.map('<H', '<Q').keys()) or None
+                buffer.unpack('<Q')  # message index length
+                chunk_index['compression'] = buffer.string()
+                self.chunk_indexes.append(chunk_index)
+            elif opcode == op_statistics:
+                buffer = SeafoilMcapBuffer(content)
+                buffer.unpack('<Q')  # message count
+                buffer.unpack('<H')  # schema count
+                for _ in range(4):
+                    buffer.unpack('<I')  # channel, attachment, metadata and chunk counts
+                self.message_start_time = buffer.unpack('<Q')
+                self.message_end_time = buffer.unpack('<Q')
+                self.message_count = buffer.map('<H', '<Q')
+            else:
+                self.add_record(opcode, content)
+
+    def scan(self):
+        # File without summary (recording interrupted) or without chunks: index the chunks (and the messages written
+        # outside of chunks) and count the messages with a linear pass
+        print("Scan mcap file ", self.file_path)
+        self.message_count = {}
+        records = None  # group of consecutive messages outside of chunks
+        with open(self.file_path, 'rb') as file:
+            offset = len(mcap_magic)
+            file.seek(offset)
+            while True:
+                header = file.read(9)
+                if len(header) < 9:
+                    break
+                opcode, length = struct.unpack('<BQ', header)
+                content = file.read(length)
+                if len(content) < length:
+                    break
+
+                if opcode == op_chunk:
+                    records = None
+                    buffer = SeafoilMcapBuffer(content)
+                    chunk_index = {'message_start_time': buffer.unpack('<Q'),
+                                   'message_end_time': buffer.unpack('<Q'),
+                                   'offset': offset,
+                                   'length': 9 + length,
+                                   'is_chunk': True}
+                    buffer.unpack('<Q')  # uncompressed size
+                    buffer.unpack('<I')  # crc
+                    chunk_index['compression'] = buffer.string()
+                    chunk_index['channels'] = set()
+                    for inner_opcode, inner_content in self.iterate_chunk(content):
+                        if inner_opcode == op_message:
+                            channel_id = struct.unpack_from('<H', inner_content, 0)[0]
+                            chunk_index['channels'].add(channel_id)
+                            self.message_count[channel_id] = self.message_count.get(channel_id, 0) + 1
+                        else:
+                            self.add_record(inner_opcode, inner_content)
+                    self.chunk_indexes.append(chunk_index)
+                    self.add_message_time(chunk_index)
+                elif opcode == op_message:
+                    channel_id, log_time = struct.unpack_from('<H4xQ', content, 0)
+                    if records is None or records['length'] >= mcap_records_size:
+                        records = {'message_start_time': log_time,
+                                   'message_end_time': log_time,
+                                   'offset': offset,
+                                   'length': 0,
+                                   'is_chunk': False,
+                                   'compression': '',
+                                   'channels': set()}
+                        self.chunk_indexes.append(records)
+                    records['length'] += 9 + length
+                    records['message_start_time'] = min(records['message_start_time'], log_time)
+                    records['message_end_time'] = max(records['message_end_time'], log_time)
+                    records['channels'].add(channel_id)
+                    self.message_count[channel_id] = self.message_count.get(channel_id, 0) + 1
+                    self.add_message_time(records)
+                else:
+                    records = None
+                    self.add_record(opcode, content)
+                offset += 9 + length
+
+    def add_message_time(self, chunk_index):
+        if self.message_start_time is None:
+            self.message_start_time = chunk_index['message_start_time']
+            self.message_end_time = chunk_index['message_end_time']
+        else:
+            self.message_start_time = min(self.message_start_time, chunk_index['message_start_time'])
+            self.message_end_time = max(self.message_end_time, chunk_index['message_end_time'])
+
+    def iterate_chunk(self, content):
+        buffer = SeafoilMcapBuffer(content)
+        buffer.unpack('<Q')  # message start time
+        buffer.unpack('<Q')  # message end time
+        uncompressed_size = buffer.unpack('<Q')
+        buffer.unpack('<I')  # crc
+        compression = buffer.string()
+        records = buffer.bytes('<Q')
+        records = self.get_decompressor(compression)(bytes(records), uncompressed_size)
+        return iterate_records(memoryview(records))
+
+    def get_channel_ids(self, topics):
+        return {channel_id for channel_id, (topic, _) in self.channels.items() if topic in topics}
+
+    def is_chunk_in_window(self, chunk_index, start_time, end_time):
+        # start_time and end_time in ns (None if not bounded)
+        if start_time is not None and chunk_index['message_end_time'] < start_time:
+            return False
+        if end_time is not None and chunk_index['message_start_time'] > end_time:
+            return False
+        return True
+
+    def get_chunk_indexes(self, channel_ids, start_time=None, end_time=None):
+        # Chunks with messages of the channels, not entirely outside the time window, in file order
+        return [chunk_index for chunk_index in sorted(self.chunk_indexes, key=lambda chunk_index: chunk_index['offset'])
+                if (chunk_index['channels'] is None or chunk_index['channels'] & channel_ids)
+                and self.is_chunk_in_window(chunk_index, start_time, end_time)]
+
+    def read_chunk(self, file, chunk_index, channel_ids):
+        # Yield (topic, data, log_time) of the messages of the channels in a chunk (or group of messages)
+        if chunk_index['is_chunk']:
+            file.seek(chunk_index['offset'] + 9)
+            records = self.iterate_chunk(file.read(chunk_index['length'] - 9))
+        else:
+            file.seek(chunk_index['offset'])
+            records = iterate_records(memoryview(file.read(chunk_index['length'])))
+        for opcode, record in records:
+            if opcode != op_message:
+                continue
+            channel_id, log_time = struct.unpack_from('<H4xQ', record, 0)
+            if channel_id in channel_ids:
+                yield self.channels[channel_id][0], bytes(record[22:]), log_time
+
+    def read_messages(self, topics, start_time=None, end_time=None):
+        # Yield (topic, data, log_time) of the messages of the requested topics,
+        # chunks entirely outside the time window are not read
+        channel_ids = self.get_channel_ids(topics)
+        with open(self.file_path, 'rb') as file:
+            for chunk_index in self.get_chunk_indexes(channel_ids, start_time, end_time):
+                for message in self.read_chunk(file, chunk_index, channel_ids):
+                    yield message
+
+
+class SeafoilMcapBackend(object):
+    # Pure python reader of the mcap files of a rosbag (no ROS installation required)
+    def __init__(self, mcap_files):
+        self.files = [SeafoilMcapFile(file_path) for file_path in mcap_files]
+
+        # Message definitions from the schemas embedded in the files
+        self.definitions = {}
+        self.type_map = {}
+        for mcap_file in self.files:
+            for topic, schema_id in mcap_file.channels.values():
+                name, encoding, data = mcap_file.schemas[schema_id]
+                self.type_map[topic] = name
+                if encoding == 'ros2msg' and normalize_type_name(name) not in self.definitions:
+                    self.definitions.update(parse_ros2msg(name, data.decode('utf-8')))
+
+    def get_type_map(self):
+        return self.type_map
+
+    def get_fields(self, type_name):
+        return self.definitions[normalize_type_name(type_name)]
+
+    def read_messages(self, topics, start_time=None, end_time=None):
+        for mcap_file in self.files:
+            for message in mcap_file.read_messages(topics, start_time, end_time):
+                yield message
+
+    def get_chunks(self, topics, start_time=None, end_time=None):
+        # Chunks to read (index of the file, chunk index), in recording order: each chunk can be read alone
+        return [(file_index, chunk_index) for file_index, mcap_file in enumerate(self.files)
+                for chunk_index in mcap_file.get_chunk_indexes(mcap_file.get_channel_ids(topics), start_time, end_time)]
+
+    def read_chunk(self, chunk, topics):
+        file_index, chunk_index = chunk
+        mcap_file = self.files[file_index]
+        with open(mcap_file.file_path, 'rb') as file:
+            for message in mcap_file.read_chunk(file, chunk_index, mcap_file.get_channel_ids(topics)):
+                yield message
+
+    def deserialize(self, data, type_name):
+        return deserialize_cdr_message(data, type_name, self.get_fields)
+
+    def read_metadata(self):
+        topics = {topic: {"type": type_name, "message_count": 0} for topic, type_name in self.type_map.items()}
+        starting_time, ending_time = None, None
+        for mcap_file in self.files:
+            for channel_id, count in mcap_file.message_count.items():
+                topics[mcap_file.channels[channel_id][0]]["message_count"] += count
+            if mcap_file.message_start_time is not None:
+                starting_time = mcap_file.message_start_time if starting_time is None \
+                    else min(starting_time, mcap_file.message_start_time)
+                ending_time = mcap_file.message_end_time if ending_time is None \
+                    else max(ending_time, mcap_file.message_end_time)
+
+        return {"topics": topics,
+                "starting_time": 0 if starting_time is None else starting_time,
+                "ending_time": 0 if ending_time is None else ending_time,
+                "bag_size": sum(os.path.getsize(mcap_file.file_path) for mcap_file in self.files)}
@@ -0,0 +1,68 @@
+#!/bin/python3
+
+import rosbag2_py
+from rclpy.serialization import deserialize_message
+from rosidl_runtime_py.utilities import get_message
+
+from .seafoil_cdr_decoder import get_ros_fields
+
+
+class SeafoilRosBackend(object):
+    # Reader of a rosbag through rosbag2_py (requires a ROS installation)
+    def __init__(self, bag_path=""):
+        self.bag_path = bag_path
+        self.message_types = {}
+
+        ## Determine storage and converter options
+        self.serialization_format = 'cdr'
+        self.storage_options = rosbag2_py.StorageOptions(uri=self.bag_path)
+        self.converter_options = rosbag2_py.ConverterOptions(
+            input_serialization_format=self.serialization_format,
+            output_serialization_format=self.serialization_format)
+
+    def open(self):
+        reader = rosbag2_py.SequentialReader()
+        reader.open(self.storage_options, self.converter_options)
+        return reader
+
+    def get_type_map(self):
+        topic_types = self.open().get_all_topics_and_types()
+        return {topic_types[i].name: topic_types[i].type for i in range(len(topic_types))}
+
+    def get_fields(self, type_name):
+        return get_ros_fields(type_name)
+
+    def read_messages(self, topics, start_time=None, end_time=None):
+        reader = self.open()
+        reader.set_filter(rosbag2_py.StorageFilter(topics=list(topics)))
+        # Messages are read in time order: seek to the start of the window and stop after its end
+        if start_time is not None:
+            reader.seek(start_time)
+        while reader.has_next():
+            try:
+                message = reader.read_next()
+            except Exception as e:
+                print("Oops!  read_next error ", e)
+                continue
+            if end_time is not None and message[2] > end_time:
+                break
+            yield message
+
+    def get_chunks(self, topics, start_time=None, end_time=None):
+        # The storage is read sequentially (not split between workers)
+        return []
+
+    def deserialize(self, data, type_name):
+        if type_name not in self.message_types:
+            self.message_types[type_name] = get_message(type_name)
+        return deserialize_message(data, self.message_types[type_name])
+
+    def read_metadata(self):
+        metadata = rosbag2_py.Info().read_metadata(self.bag_path, "")
+        starting_time = metadata.starting_time.nanoseconds
+        return {"topics": {item.topic_metadata.name: {"type": item.topic_metadata.type,
+                                                      "message_count": item.message_count}
+                           for item in metadata.topics_with_message_count},
+                "starting_time": starting_time,
+                "ending_time": starting_time + metadata.duration.nanoseconds,
+                "bag_size": metadata.bag_size}
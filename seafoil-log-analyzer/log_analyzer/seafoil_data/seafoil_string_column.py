@@ -0,0 +1,67 @@
+#!/bin/python3
+
+import numpy as np
+
+
+class SeafoilStringColumn(object):
+    # Strings stored in a single UTF-8 blob with offsets, optionally through a table of unique strings (codes)
+    def __init__(self, blob, offsets, codes=None):
+        self.blob = blob
+        self.offsets = offsets
+        self.codes = codes
+
+    def __len__(self):
+        return len(self.offsets) - 1 if self.codes is None else len(self.codes)
+
+    def get_string(self, j):
+        return bytes(self.blob[self.offsets[j]:self.offsets[j + 1]]).decode('utf-8')
+
+    def __getitem__(self, i):
+        if isinstance(i, (int, np.integer)):
+            if i < 0:
+                i += len(self)
+            if not 0 <= i < len(self):
+                raise IndexError("string column index out of range")
+            return self.get_string(i if self.codes is None else self.codes[i])
+        # Slices and masks share the strings
+        codes = np.arange(len(self), dtype='int32') if self.codes is None else self.codes
+        return SeafoilStringColumn(self.blob, self.offsets, codes[i])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __array__(self, dtype=None, copy=None):
+        return np.array(list(self), dtype=object)
+
+    def get_arrays(self):
+        arrays = {"blob": self.blob, "offsets": self.offsets}
+        if self.codes is not None:
+            arrays["codes"] = self.codes
+        return arrays
+
+
+def is_string_column(column):
+    if isinstance(column, SeafoilStringColumn):
+        return True
+    column = np.asarray(column)
+    return column.dtype.hasobject and column.ndim == 1 and all(isinstance(value, str) for value in column)
+
+
+def encode_strings(values):
+    if isinstance(values, SeafoilStringColumn):
+        return values
+
+    # Table of unique strings (names, files and functions repeat for every message)
+    table = {}
+    codes = np.fromiter((table.setdefault(value, len(table)) for value in values), dtype='int32', count=len(values))
+    strings = list(table.keys())
+    if len(strings) > len(values) // 2:
+        # Mostly unique strings (messages): stored in order, without table
+        strings, codes = list(values), None
+
+    encoded = [string.encode('utf-8') for string in strings]
+    blob = np.frombuffer(b''.join(encoded), dtype='uint8')
+    offsets = np.zeros(len(encoded) + 1, dtype='int64')
+    np.cumsum([len(string) for string in encoded], out=offsets[1:])
+    return SeafoilStringColumn(blob, offsets, codes)
@@ -4,84 +4,55 @@ import sys
 import numpy as np
 import datetime
 from .seafoil_data import SeafoilData
+from .seafoil_column_builder import SeafoilColumnBuilder
 
 sys.path.append('..')
 
 
 class SeafoilWind(SeafoilData):
+    generator_version = "a4a675f31619"
+
+    # Columns of the topic (one record per message)
+    dtype = np.dtype([
+        ('velocity', 'float'),
+        ('direction', 'uint16'),
+        ('battery', 'uint8'),
+        ('temperature', 'uint8'),
+        ('roll', 'int8'),
+        ('pitch', 'int8'),
+        ('heading', 'uint16'),
+        ('direction_north', 'int16'),
+    ])
+
+    # Field (and index) of each column in the messages decoded in bulk
+    record_fields = [
+        ('velocity', 'velocity', -1),
+        ('direction', 'direction', -1),
+        ('battery', 'battery', -1),
+        ('temperature', 'temperature', -1),
+        ('roll', 'roll', -1),
+        ('pitch', 'pitch', -1),
+        ('heading', 'heading', -1),
+        ('direction_north', 'direction_north', -1),
+    ]
+
     def __init__(self, topic_name=None, seafoil_bag=None):
-        SeafoilData.__init__(self, seafoil_bag.file_path, topic_name, seafoil_bag.offset_date, seafoil_bag.data_folder)
-        
-        self.velocity = np.empty([self.nb_elements], dtype='float')
-        self.direction = np.empty([self.nb_elements], dtype='uint16')
-        self.battery = np.empty([self.nb_elements], dtype='uint8')
-        self.temperature = np.empty([self.nb_elements], dtype='uint8')
-        self.roll = np.empty([self.nb_elements], dtype='int8')
-        self.pitch = np.empty([self.nb_elements], dtype='int8')
-        self.heading = np.empty([self.nb_elements], dtype='uint16')
-        self.direction_north = np.empty([self.nb_elements], dtype='int16')
+        SeafoilData.__init__(self, seafoil_bag.file_path, topic_name, seafoil_bag.offset_date, seafoil_bag.data_folder, seafoil_bag.bag_reader, seafoil_bag.metadata, seafoil_bag.end_date, seafoil_bag.manifest)
+        self.records = SeafoilColumnBuilder(self.dtype)
 
         seafoil_bag.emit_signal_process_topic(self.topic_name)
         self.load_message()
         self.resize_data_array()
-        super().resize_data_array()
-        if self.k > 0 and not self.is_loaded_from_file:
+        if self.k > 0 and not self.is_loaded_from_file and not self.is_windowed():
             self.save_data()
 
     def process_message(self, msg):
-        self.velocity[self.k] =msg.velocity
-        self.direction[self.k] =msg.direction
-        self.battery[self.k] =msg.battery
-        self.temperature[self.k] =msg.temperature
-        self.roll[self.k] =msg.roll
-        self.pitch[self.k] =msg.pitch
-        self.heading[self.k] =msg.heading
-        self.direction_north[self.k] =msg.direction_north
-        
-        return
-
-    def resize_data_array(self):
-        self.velocity = np.resize(self.velocity,self.k)
-        self.direction = np.resize(self.direction,self.k)
-        self.battery = np.resize(self.battery,self.k)
-        self.temperature = np.resize(self.temperature,self.k)
-        self.roll = np.resize(self.roll,self.k)
-        self.pitch = np.resize(self.pitch,self.k)
-        self.heading = np.resize(self.heading,self.k)
-        self.direction_north = np.resize(self.direction_north,self.k)
-        
-        return
-        
-    def save_data(self):
-        import os
-        # Test if save directory exists
-        if not os.path.exists(self.topic_name_dir) and self.k > 0:
-            os.makedirs(self.topic_name_dir)
-            # Save data (compressed)
-        if not os.path.exists(self.topic_full_dir):
-            np.savez_compressed(self.topic_full_dir,
-                                time=self.time + self.starting_time.timestamp(),
-                                velocity=self.velocity,
-                                direction=self.direction,
-                                battery=self.battery,
-                                temperature=self.temperature,
-                                roll=self.roll,
-                                pitch=self.pitch,
-                                heading=self.heading,
-                                direction_north=self.direction_north,)
-
-    def load_message_from_file(self):
-        data = np.load(self.topic_full_dir, allow_pickle=True)
-        self.starting_time = datetime.datetime.fromtimestamp(data['time'][0])
-        self.ending_time = datetime.datetime.fromtimestamp(data['time'][-1])
-        self.time = data['time'] - data['time'][0]
-        self.velocity = data['velocity']
-        self.direction = data['direction']
-        self.battery = data['battery']
-        self.temperature = data['temperature']
-        self.roll = data['roll']
-        self.pitch = data['pitch']
-        self.heading = data['heading']
-        self.direction_north = data['direction_north']
-        
-    
\ No newline at end of file
+        self.records.append((msg.velocity,
+                             msg.direction,
+                             msg.battery,
+                             msg.temperature,
+                             msg.roll,
+                             msg.pitch,
+                             msg.heading,
+                             msg.direction_north,))
+        return
\ No newline at end of file
@@ -54,7 +54,8 @@ class Worker(QObject):
             for path in filepath[1:]:
                 QApplication.processEvents()
                 sfb = SeafoilBag(path, offset_date)
-                sfb.load_data()
+                # Logs compared only need the topics of the statistics (others loaded on first access)
+                sfb.load_data(topics=SeafoilBag.statistics_topics)
                 self.list_sfb_comp.append(sfb)
 
         tab = QtWidgets.QTabWidget()
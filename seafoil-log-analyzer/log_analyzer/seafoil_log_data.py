@@ -0,0 +1,376 @@
+#!/bin/python3
+import os
+
+from .seafoil_data.seafoil_gps_fix import SeafoilGpsFix
+from .seafoil_data.seafoil_profile import SeafoilProfile
+from .seafoil_data.seafoil_log import SeafoilLog
+from .seafoil_data.seafoil_height import SeafoilHeight
+from .seafoil_data.seafoil_height_debug import SeafoilHeightDebug
+from .seafoil_data.seafoil_raw_data import SeafoilRawData
+from .seafoil_data.seafoil_r_p_y import SeafoilRPY
+from .seafoil_data.seafoil_debug_fusion import SeafoilDebugFusion
+from .seafoil_data.seafoil_distance import SeafoilDistance
+from .seafoil_data.seafoil_battery import SeafoilBattery
+from .seafoil_data.seafoil_distance_gate import SeafoilDistanceGate
+from .seafoil_data.seafoil_manoeuvre import SeafoilManoeuvre
+from .seafoil_data.seafoil_wind import SeafoilWind
+from .seafoil_data.seafoil_wind_debug import SeafoilWindDebug
+from .seafoil_data.seafoil_gpx import SeafoilGpx
+from .seafoil_data.seafoil_data import SeafoilData, default_offset_date
+from .seafoil_data.seafoil_bag_reader import SeafoilBagReader
+from .seafoil_data.seafoil_bag_index import SeafoilBagIndex
+from .seafoil_data.seafoil_bag_metadata import SeafoilBagMetadata
+from .seafoil_data.seafoil_cache_manifest import SeafoilCacheManifest, get_file_fingerprint
+from .seafoil_data.seafoil_log_store import get_log_store
+from .tools.seafoil_statistics import SeafoilStatistics
+
+# import rosbag2_py
+import weakref
+
+import datetime
+import numpy as np
+
+import yaml
+
+
+def topic_property(topic_name):
+	# Topic of the bag, loaded on first access
+	return property(lambda self: self.get_topic(topic_name),
+					lambda self, value: self.set_topic(topic_name, value))
+
+
+def open_log(bag_path, offset_date=datetime.datetime(2019, 1, 1, 0, 0), end_date=None, topics=None, nb_workers=1,
+			 progress_callback=None):
+	# Open a log (rosbag folder or gpx file) and load its topics (all by default) and statistics
+	log_data = SeafoilLogData(bag_path, offset_date, nb_workers, end_date, progress_callback=progress_callback)
+	log_data.load_data(topics)
+	return log_data
+
+
+class SeafoilLogData(object):
+	# Data of a log, without user interface (progress reported to optional callbacks)
+	# Topics of the rosbag and their class
+	topic_classes = {"/driver/fix": SeafoilGpsFix,
+					 "/driver/profile": SeafoilProfile,
+					 "/driver/raw_data": SeafoilRawData,
+					 "/driver/calibrated_data": SeafoilRawData,
+					 "/driver/rpy": SeafoilRPY,
+					 "/driver/debug_fusion": SeafoilDebugFusion,
+					 "/driver/battery": SeafoilBattery,
+					 "/driver/wind": SeafoilWind,
+					 "/driver/wind_debug": SeafoilWindDebug,
+					 "/observer/height": SeafoilHeight,
+					 "/observer/height_debug": SeafoilHeightDebug,
+					 "/observer/distance": SeafoilDistance,
+					 "/observer/manoeuvre": SeafoilManoeuvre,
+					 "/observer/distance_gate": SeafoilDistanceGate,
+					 "/rosout": SeafoilLog}
+
+	# Topics of a gpx file (the points are both the fix and the distance)
+	gpx_topic_classes = dict(topic_classes, **{"/driver/fix": SeafoilGpx, "/observer/distance": SeafoilGpx})
+
+	# Topics used by the statistics (enough for log processing and comparison)
+	statistics_topics = ["/driver/fix", "/observer/distance", "/observer/height", "/driver/rpy"]
+
+	# Driver
+	gps_fix = topic_property("/driver/fix")
+	profile = topic_property("/driver/profile")
+	raw_data = topic_property("/driver/raw_data")
+	calibrated_data = topic_property("/driver/calibrated_data")
+	rpy = topic_property("/driver/rpy")
+	debug_fusion = topic_property("/driver/debug_fusion")
+	battery = topic_property("/driver/battery")
+	wind = topic_property("/driver/wind")
+	wind_debug = topic_property("/driver/wind_debug")
+
+	# Observer
+	height = topic_property("/observer/height")
+	height_debug = topic_property("/observer/height_debug")
+	distance = topic_property("/observer/distance")
+	manoeuvre = topic_property("/observer/manoeuvre")
+	distance_gate = topic_property("/observer/distance_gate")
+
+	# Info
+	rosout = topic_property("/rosout")
+
+	def __init__(self, bag_path=None,
+				 	   offset_date=datetime.datetime(2019, 1, 1, 0, 0),
+					   nb_workers=1,
+					   end_date=None,
+					   progress_callback=None,
+					   read_callback=None):
+		self.init_log(bag_path, offset_date, nb_workers, end_date, progress_callback, read_callback)
+		if self.file_path is None:
+			return
+
+		# Create data folder if it does not exist
+		if not os.path.exists(self.data_folder):
+			os.makedirs(self.data_folder, exist_ok=True)
+		# Reindex the bag only if its files changed since the last opening
+		self.open_data_folder(reindex=True)
+
+	def init_log(self, bag_path, offset_date, nb_workers, end_date, progress_callback=None, read_callback=None):
+		# Paths and attributes of the log (without reading or writing the data folder)
+		# Progress of the loading (percentage, text) and of the reading of each topic (topic name, messages, bytes)
+		self.progress_callback = progress_callback
+		self.read_callback = read_callback
+
+		# Time window of the data loaded (after offset_date and until end_date)
+		self.offset_date = offset_date
+		self.end_date = end_date
+
+		# Topics loaded (by topic name)
+		self.topics = {}
+		self.file_path = None
+		self.seafoil_id = None
+		self.statistics = None
+		self.bag_reader = None
+		self.bag_index = None
+		self.metadata = None
+		self.manifest = None
+		self.is_loading = False  # manifest saved once at the end of load_data
+		self.store = None
+		self.nb_workers = nb_workers
+		self.topics_progress = {}
+		self.configuration_finalizer = None
+
+		# Topics of the rosbag loaded by load_data (by default)
+		self.bag_topics = list(self.topic_classes.keys())
+
+		if bag_path is None:
+			print("No bag path")
+			return
+		else:
+			print("Opening bag path: ", bag_path)
+		self.is_gpx = False
+
+		if bag_path.endswith('.gpx'):
+			self.is_gpx = True
+
+		self.file_path = bag_path
+		self.nb_topics_processed = 0
+
+		if self.is_gpx:
+			self.file_name = os.path.basename(bag_path)
+			self.nb_topics = 1
+		else:
+			# name of the last directory
+			self.file_name = os.path.basename(os.path.normpath(bag_path))
+			self.nb_topics = len(self.bag_topics)
+		self.data_folder = os.path.dirname(bag_path) + "/data/"
+		self.configuration_file_name = self.data_folder + "/configuration.yaml"
+		self.configuration = {}
+
+	def open_data_folder(self, reindex=True):
+		# Single file with the data of the topics and the statistics
+		self.store = get_log_store(self.data_folder)
+
+		if not self.is_gpx and os.path.isdir(self.file_path):
+			self.bag_index = SeafoilBagIndex(self.file_path, self.data_folder)
+			if reindex:
+				self.bag_index.update()
+			else:
+				self.bag_index.fingerprint = self.bag_index.get_fingerprint()
+			# Metadata read on first use, and saved in the data folder for the next openings
+			self.metadata = SeafoilBagMetadata(self.file_path, self.data_folder, self.bag_index.fingerprint)
+			self.manifest = SeafoilCacheManifest(self.data_folder, self.bag_index.fingerprint)
+		elif self.is_gpx and os.path.exists(self.file_path):
+			self.manifest = SeafoilCacheManifest(self.data_folder, get_file_fingerprint(self.file_path))
+
+	def load_data(self, topics=None):
+		############## Load data ##############
+		# Topics not preloaded here are loaded on first access
+		self.is_loading = True
+		self.preload(topics)
+
+		# Get seafoil name
+		self.seafoil_id = ""
+
+		if not self.load_configurations():
+			# Save a default configuration file
+			self.configuration = {
+				"analysis": {
+					"wind_heading": 0,
+				}
+			}
+			self.save_configuration()
+
+		# Configuration saved when the object is deleted (only once loaded, copies of the log do not save it)
+		if self.configuration_finalizer is None:
+			self.configuration_finalizer = weakref.finalize(self, self.save_configuration)
+
+		# Statistics
+		self.statistics = SeafoilStatistics(self)
+		self.is_loading = False
+		self.save_manifest()
+
+		print("Data loaded")
+
+	def preload(self, topics=None):
+		# Load the topics at once (all the topics of the bag by default)
+		if topics is None:
+			topics = self.bag_topics
+		topics = [topic for topic in topics if self.topics.get(topic) is None]
+		self.nb_topics_processed = 0
+		self.nb_topics = max(1, len(topics))
+
+		# Read the topics not saved yet in a single pass over the bag
+		if not self.is_gpx:
+			self.topics_progress = {}
+			self.bag_reader = SeafoilBagReader(self.file_path, self.offset_date,
+											   progress_callback=self.emit_signal_read_topic,
+											   nb_workers=self.nb_workers,
+											   metadata=self.metadata,
+											   end_date=self.end_date)
+			self.bag_reader.read([topic for topic in topics if not self.is_topic_saved(topic)])
+
+		for topic in topics:
+			self.get_topic(topic)
+
+		# Release remaining raw messages
+		self.bag_reader = None
+
+	@staticmethod
+	def get_topic_classes(is_gpx):
+		return SeafoilLogData.gpx_topic_classes if is_gpx else SeafoilLogData.topic_classes
+
+	def is_windowed(self):
+		# Partial load (only data of a complete load is saved)
+		return (self.offset_date is not None and self.offset_date > default_offset_date) or self.end_date is not None
+
+	def is_topic_saved(self, topic_name):
+		# Saved and up to date (computed from the same bag, generator and cache version)
+		if not SeafoilData.is_topic_saved(self.data_folder, topic_name):
+			return False
+		return self.manifest is None or SeafoilData.is_npz_saved(self.data_folder, topic_name) \
+			or self.manifest.is_valid(topic_name, self.topic_classes[topic_name].generator_version)
+
+	def get_topic(self, topic_name):
+		if self.topics.get(topic_name) is None and self.file_path is not None:
+			self.topics[topic_name] = self.load_topic(topic_name)
+			self.save_manifest()
+		return self.topics.get(topic_name)
+
+	def set_topic(self, topic_name, value):
+		self.topics[topic_name] = value
+
+	def load_topic(self, topic_name):
+		# Load a topic from the data folder (or the bag)
+		if self.is_gpx and topic_name == "/driver/fix":
+			return SeafoilGpx(self.file_path, self.data_folder)
+		if self.is_gpx and topic_name == "/observer/distance":
+			return self.gps_fix
+
+		topic = self.topic_classes[topic_name](topic_name, self)
+		if topic_name == "/driver/rpy":
+			topic.yaw = (topic.yaw + 180) % 360
+		return topic
+
+	def save_manifest(self):
+		# Entries of the data saved since the last save written at once
+		if self.manifest is not None and not self.is_loading:
+			self.manifest.save()
+
+	def save_configuration(self):
+		# Create data folder if it does not exist
+		if not os.path.exists(self.data_folder):
+			os.makedirs(self.data_folder, exist_ok=True)
+		with open(self.configuration_file_name, 'w') as file:
+			yaml.dump(self.configuration, file)
+
+	def load_configurations(self):
+		# Test if file exists
+		if os.path.exists(self.configuration_file_name):
+			with open(self.configuration_file_name, 'r') as file:
+				self.configuration = yaml.load(file, Loader=yaml.FullLoader)
+
+				# Test if key "analysis" exists
+				if "analysis" not in self.configuration:
+					# Create the key "analysis"
+					self.configuration["analysis"] = {"wind_heading": 0.0}
+			return True
+		else:
+			return False
+
+	def get_statistics(self):
+		stat = {"v500": self.statistics.max_v500,
+				"v1850": self.statistics.max_v1852,
+                "vmax": self.statistics.max_speed,
+				"vjibe": self.statistics.max_vjibe,
+				"vhour": self.statistics.max_speed_duration[3600],
+				"v2s": self.statistics.max_speed_duration[2],
+				"v10s": self.statistics.max_speed_duration[10],
+				"v5x10s": self.statistics.max_v5x10s,
+				"alpha500": self.statistics.max_alpha500,
+                "starting_time": self.gps_fix.starting_time.timestamp(),
+				"ending_time": self.gps_fix.ending_time.timestamp(),
+                "is_processed": True,
+				"duration": self.gps_fix.ending_time - self.gps_fix.starting_time,}
+		print(stat)
+		return stat
+
+	def get_starting_time(self):
+		return self.gps_fix.starting_time
+
+	def get_ending_time(self):
+		return self.gps_fix.ending_time
+
+	def get_starting_time_timestamp(self):
+		return self.gps_fix.starting_time.timestamp()
+
+	def get_ending_time_timestamp(self):
+		return self.gps_fix.ending_time.timestamp()
+
+	def emit_progress(self, pourcentage, text):
+		if self.progress_callback is not None:
+			self.progress_callback(pourcentage, text)
+
+	def __getstate__(self):
+		# Pickled as a handle (path and time window): the topics are loaded again from the data folder
+		return {"bag_path": self.file_path, "offset_date": self.offset_date, "nb_workers": self.nb_workers,
+				"end_date": self.end_date, "is_loaded": self.statistics is not None}
+
+	def __setstate__(self, state):
+		# Opened again without side effect (no reindex, configuration not saved), statistics read from the store
+		self.init_log(state["bag_path"], state["offset_date"], state["nb_workers"], state["end_date"])
+		if self.file_path is None:
+			return
+		self.open_data_folder(reindex=False)
+		if state["is_loaded"]:
+			self.seafoil_id = ""
+			self.load_configurations()
+			self.statistics = SeafoilStatistics(self)
+
+	def emit_signal_process_topic(self, topic_name):
+		self.nb_topics_processed += 1
+		pourcentage = int(100 * self.nb_topics_processed / self.nb_topics)
+		self.emit_progress(min(pourcentage, 100), "Loading " + topic_name)
+
+	def emit_signal_read_topic(self, topic_name, nb_messages, nb_bytes):
+		self.topics_progress[topic_name] = nb_messages
+		if self.read_callback is not None:
+			self.read_callback(topic_name, nb_messages, nb_bytes)
+
+		nb_messages_read = sum(self.topics_progress.values())
+		pourcentage = int(100 * nb_messages_read / max(1, self.bag_reader.nb_messages_total))
+		self.emit_progress(min(pourcentage, 100), "Reading " + topic_name + " ("
+								   + str(nb_messages) + " messages, " + str(round(nb_bytes / 1e6, 1)) + " MB)")
+
+	# def get_number_of_topics_in_bag(self):
+	# 	# Initialize rosbag2 Reader
+	# 	serialization_format = 'cdr'
+	# 	storage_options = rosbag2_py.StorageOptions(uri=self.file_path)  # , storage_id='sqlite3'
+	# 	converter_options = rosbag2_py.ConverterOptions(
+	# 		input_serialization_format=serialization_format,
+	# 		output_serialization_format=serialization_format)
+	#
+	# 	reader = rosbag2_py.SequentialReader()
+	# 	reader.open(storage_options, converter_options)
+	#
+	# 	# Get the list of topics and types in the bag
+	# 	topics_info = reader.get_all_topics_and_types()
+	#
+	# 	# Get the number of unique topics
+	# 	number_of_topics = len(topics_info)
+	#
+	# 	return number_of_topics
\ No newline at end of file
@@ -0,0 +1,85 @@
+import numpy as np
+
+from ..seafoil_data.seafoil_geodesy import earth_radius, get_distance
+
+
+def get_local_frame(latitude, longitude):
+    # East and north (m) of the points in a local frame (equirectangular projection around the mean position)
+    latitude = np.radians(np.asarray(latitude, dtype='double'))
+    longitude = np.radians(np.asarray(longitude, dtype='double'))
+    if len(latitude) == 0:
+        return np.zeros(0), np.zeros(0)
+    east = earth_radius * (longitude - np.mean(longitude)) * np.cos(np.mean(latitude))
+    north = earth_radius * (latitude - np.mean(latitude))
+    return east, north
+
+
+def get_close_pairs(x_1, y_1, x_2, y_2, radius):
+    # Pairs of points (index in 1, index in 2) closer than radius: points 1 sorted by cell of a grid (cells of the
+    # radius size), points 2 compared to the points 1 of the 9 cells around them
+    if len(x_1) == 0 or len(x_2) == 0:
+        return np.zeros(0, dtype='int64'), np.zeros(0, dtype='int64')
+    cell_x_1, cell_y_1 = np.floor(x_1 / radius).astype('int64'), np.floor(y_1 / radius).astype('int64')
+    cell_x_2, cell_y_2 = np.floor(x_2 / radius).astype('int64'), np.floor(y_2 / radius).astype('int64')
+    cell_x_min = min(cell_x_1.min(), cell_x_2.min()) - 1
+    cell_y_min = min(cell_y_1.min(), cell_y_2.min()) - 1
+    key_1 = ((cell_x_1 - cell_x_min) << 32) + (cell_y_1 - cell_y_min)
+    order = np.argsort(key_1, kind='stable')
+    key_1 = key_1[order]
+
+    index_1 = []
+    index_2 = []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            key_2 = ((cell_x_2 + dx - cell_x_min) << 32) + (cell_y_2 + dy - cell_y_min)
+            left = np.searchsorted(key_1, key_2, side='left')
+            count = np.searchsorted(key_1, key_2, side='right') - left
+            # Each point 2 repeated for the points 1 of the cell
+            index_2.append(np.repeat(np.arange(len(x_2)), count))
+            index_1.append(order[np.repeat(left - np.cumsum(count) + count, count) + np.arange(np.sum(count))])
+    index_1 = np.concatenate(index_1)
+    index_2 = np.concatenate(index_2)
+    is_close = np.hypot(x_1[index_1] - x_2[index_2], y_1[index_1] - y_2[index_2]) <= radius
+    return index_1[is_close], index_2[is_close]
+
+
+def get_alphas(time, latitude, longitude, jibe_start, jibe_end, gate=50., length_max=500.):
+    # Event table of the alphas (one element per jibe): fastest run through the jibe, shorter than length_max (m),
+    # ending less than gate (m) from its start (alpha 500: out and back through a gate of 50 m)
+    time = np.asarray(time, dtype='double')
+    latitude = np.asarray(latitude, dtype='double')
+    longitude = np.asarray(longitude, dtype='double')
+    east, north = get_local_frame(latitude, longitude)
+    path = np.zeros(len(time))
+    if len(time) > 1:
+        np.cumsum(get_distance(latitude[:-1], longitude[:-1], latitude[1:], longitude[1:]), out=path[1:])
+
+    alphas = {"start": [], "end": [], "speed": [], "distance": [], "gate_distance": []}
+    for start, end in zip(jibe_start, jibe_end):
+        # Starts before the jibe and ends after the jibe, less than length_max away along the track
+        first = np.searchsorted(path, path[end] - length_max, side='left')
+        last = np.searchsorted(path, path[start] + length_max, side='right')
+        index_start, index_end = get_close_pairs(east[first:start + 1], north[first:start + 1],
+                                                 east[end:last], north[end:last], gate)
+        index_start += first
+        index_end += end
+
+        distance = path[index_end] - path[index_start]
+        dt = time[index_end] - time[index_start]
+        is_alpha = (distance <= length_max) & (dt > 0)
+        if not np.any(is_alpha):
+            continue
+        index_start, index_end, distance, dt = index_start[is_alpha], index_end[is_alpha], distance[is_alpha], dt[is_alpha]
+        best = np.argmax(distance / dt)
+        alphas["start"].append(index_start[best])
+        alphas["end"].append(index_end[best])
+        alphas["speed"].append(distance[best] / dt[best])
+        alphas["distance"].append(distance[best])
+        alphas["gate_distance"].append(np.hypot(east[index_end[best]] - east[index_start[best]],
+                                                north[index_end[best]] - north[index_start[best]]))
+
+    alphas = {name: np.array(value, dtype='int64' if name in ["start", "end"] else 'double')
+              for name, value in alphas.items()}
+    alphas["starting_time"] = time[alphas["start"]]
+    alphas["ending_time"] = time[alphas["end"]]
+    return alphas
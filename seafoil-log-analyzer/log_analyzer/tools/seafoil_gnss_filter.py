@@ -0,0 +1,58 @@
+import numpy as np
+
+ms_to_knot = 1.94384
+
+
+def get_acceleration_mask(time, speed, max_acc_kt, timestep_filter):
+    # Speed resampled with at a minimum of one point every timestep_filter (linear interpolation), samples rejected
+    # around an acceleration higher than max_acc_kt (kt/s), mask of the resampled speed held until the next point
+    time_resampled = np.arange(time[0], time[-1], timestep_filter)
+    speed_resampled = np.interp(time_resampled, time, speed)
+    acceleration = np.append(np.diff(speed_resampled) / np.diff(time_resampled), 0)
+    mask_resampled = np.logical_not(np.convolve(acceleration > (max_acc_kt / ms_to_knot), np.ones(5), mode='same'))
+
+    # Mask on the original time (rejected outside the resampled time)
+    index = np.searchsorted(time_resampled, time, side='right') - 1
+    is_inside = (index >= 0) & (time <= time_resampled[-1]) if len(time_resampled) > 0 else np.zeros(len(time), bool)
+    mask = np.zeros(len(time), dtype='bool')
+    mask[is_inside] = mask_resampled[index[is_inside]]
+    return mask, {"time_resampled": time_resampled, "speed_resampled": speed_resampled,
+                  "acceleration": acceleration, "mask_resampled": mask_resampled}
+
+
+def get_quality_mask(data_gnss, err_speed_max=None, hdop_max=None, satellites_min=None, mode_min=None):
+    # Samples rejected by the quality fields of the receiver (rule disabled with None, unknown values accepted:
+    # fields not saved in the log, nan errors, no satellites count)
+    mask = np.ones(len(data_gnss.time), dtype='bool')
+    err_speed = getattr(data_gnss, "err_speed", None)
+    if err_speed_max is not None and err_speed is not None:
+        mask &= ~(np.asarray(err_speed) > err_speed_max)
+    hdop = getattr(data_gnss, "hdop", None)
+    if hdop_max is not None and hdop is not None:
+        mask &= ~(np.asarray(hdop) > hdop_max)
+    satellites_visible = getattr(data_gnss, "satellites_visible", None)
+    if satellites_min is not None and satellites_visible is not None:
+        satellites_visible = np.asarray(satellites_visible)
+        mask &= ~((satellites_visible > 0) & (satellites_visible < satellites_min))
+    mode = getattr(data_gnss, "mode", None)
+    if mode_min is not None and mode is not None:
+        mask &= np.asarray(mode) >= mode_min
+    return mask
+
+
+def filter_gnss(data_gnss, max_acc_kt, timestep_filter, err_speed_max=None, hdop_max=None, satellites_min=None,
+                mode_min=None):
+    # Validity mask of the samples (acceleration and quality rules) and speed cleaned (null when not valid)
+    time = np.asarray(data_gnss.time, dtype='double')
+    speed = np.asarray(data_gnss.speed, dtype='double')
+    mask_acceleration, data = get_acceleration_mask(time, speed, max_acc_kt, timestep_filter)
+    mask_quality = get_quality_mask(data_gnss, err_speed_max, hdop_max, satellites_min, mode_min)
+
+    mask = mask_acceleration & mask_quality
+    speed = np.where(mask, speed, 0.)
+    speed[np.isnan(speed)] = 0.
+    data.update({"mask": mask.astype('double'),
+                 "mask_acceleration": mask_acceleration,
+                 "mask_quality": mask_quality,
+                 "speed": speed})
+    return data
@@ -0,0 +1,80 @@
+import numpy as np
+
+from .seafoil_speed import get_speed_for_durations
+
+# Types of manoeuvre of the event table
+manoeuvre_jibe = 0
+manoeuvre_tack = 1
+
+
+def get_turn_segments(time, heading, turn_rate_min, rate_window, gap_max):
+    # Segments (first and last index) where the heading (unwrapped, degrees) turns faster than turn_rate_min (deg/s)
+    turn_rate = (np.interp(time + rate_window / 2, time, heading)
+                 - np.interp(time - rate_window / 2, time, heading)) / rate_window
+    edges = np.diff(np.concatenate(([0], (np.abs(turn_rate) > turn_rate_min).astype('int8'), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1) - 1
+    if len(starts) == 0:
+        return starts, ends
+
+    # Segments separated by less than gap_max merged (a turn slowed down in the middle)
+    is_separated = time[starts[1:]] - time[ends[:-1]] > gap_max
+    return starts[np.concatenate(([True], is_separated))], ends[np.concatenate((is_separated, [True]))]
+
+
+def get_downwind_direction(mid_heading):
+    # Axis of the wind from the middle heading of the turns (jibes turn downwind, tacks upwind):
+    # mean of the doubled angles, then the side with most turns (jibes are the most common manoeuvre)
+    angle = np.radians(mid_heading)
+    axis = 0.5 * np.arctan2(np.mean(np.sin(2 * angle)), np.mean(np.cos(2 * angle)))
+    if np.sum(np.cos(angle - axis) < 0) > len(angle) / 2:
+        axis += np.pi
+    return np.degrees(axis) % 360.
+
+
+def get_manoeuvres(time, track, speed, turn_rate_min=10., rate_window=1., gap_max=1., heading_change_min=90.,
+                   duration_max=20., speed_window=2., entry_speed_min=4., wind_heading=None):
+    # Event table of the jibes and tacks (one element per manoeuvre) from the gnss track (degrees) and speed (m/s):
+    # turns of more than heading_change_min degrees, shorter than duration_max, entered faster than entry_speed_min
+    # wind_heading: direction the wind comes from (degrees), estimated from the turns if None
+    time = np.asarray(time, dtype='double')
+    speed = np.nan_to_num(np.asarray(speed, dtype='double'))
+    heading = np.degrees(np.unwrap(np.radians(np.nan_to_num(np.asarray(track, dtype='double')))))
+    start = np.zeros(0, dtype='int64')
+    end = np.zeros(0, dtype='int64')
+    if len(time) > 1:
+        start, end = get_turn_segments(time, heading, turn_rate_min, rate_window, gap_max)
+        is_turn = (np.abs(heading[end] - heading[start]) >= heading_change_min) \
+                  & (time[end] - time[start] <= duration_max)
+        start, end = start[is_turn], end[is_turn]
+
+    # Mean speed before the start and after the end of the turns
+    speed_mean = np.nan_to_num(get_speed_for_durations(time, speed, [speed_window])[speed_window])
+    entry_speed = speed_mean[start]
+    exit_speed = speed_mean[np.minimum(np.searchsorted(time, time[end] + speed_window), len(time) - 1)]
+    # Minimum speed in the turns (the turns are separated: one reduction from each start to the end of the turn)
+    minimum_speed = np.zeros(len(start))
+    if len(start) > 0:
+        minimum_speed = np.minimum.reduceat(np.append(speed, 0.), np.ravel(np.column_stack((start, end + 1))))[::2]
+
+    is_entered = entry_speed >= entry_speed_min
+    start, end = start[is_entered], end[is_entered]
+
+    # Jibes turn through downwind, tacks through upwind
+    heading_change = heading[end] - heading[start]
+    mid_heading = (heading[start] + heading_change / 2) % 360.
+    manoeuvre_type = np.full(len(start), manoeuvre_jibe, dtype='uint8')
+    if len(start) > 0:
+        downwind = get_downwind_direction(mid_heading) if wind_heading is None else (wind_heading + 180.) % 360.
+        manoeuvre_type[np.cos(np.radians(mid_heading - downwind)) < 0] = manoeuvre_tack
+
+    return {"start": start,
+            "end": end,
+            "starting_time": time[start],
+            "ending_time": time[end],
+            "type": manoeuvre_type,
+            "heading_change": heading_change,
+            "mid_heading": mid_heading,
+            "entry_speed": entry_speed[is_entered],
+            "minimum_speed": minimum_speed[is_entered],
+            "exit_speed": exit_speed[is_entered]}
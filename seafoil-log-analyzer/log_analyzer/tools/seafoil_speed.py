@@ -0,0 +1,66 @@
+import numpy as np
+
+
+def get_speed_for_distances(time, distance, distances):
+    # Speed over each distance (m) ending at each sample, from the cumulative distance (non decreasing)
+    # The window starts at the first sample less than the distance away: for each distance, returns the speed
+    # and the index of the start of the window (the window is empty, and the speed null, before the first distance)
+    time = np.asarray(time, dtype='double')
+    distance = np.asarray(distance, dtype='double')
+    index = np.arange(len(distance))
+    speed_distances = {}
+    for d in distances:
+        if len(distance) == 0:
+            speed_distances[d] = (np.zeros(0), np.zeros(0, dtype='int64'))
+            continue
+        start = np.searchsorted(distance, distance - d, side='left')
+        # Rounding of distance - d: same test (d1 - d0 <= d) as the distance covered
+        start[(start < index) & (distance - distance[np.minimum(start, index)] > d)] += 1
+        is_before = (start > 0) & (distance - distance[np.maximum(start - 1, 0)] <= d)
+        start[is_before] -= 1
+
+        # No window before the first distance, nor with a single step longer than the distance
+        is_window = (distance - distance[0] >= d) & (start < index)
+        start[~is_window] = index[~is_window]
+        dt = time - time[start]
+        speed = np.zeros(len(distance))
+        np.divide(distance - distance[start], dt, out=speed, where=is_window & (dt > 0))
+        speed_distances[d] = (speed, start)
+    return speed_distances
+
+
+def get_speed_for_durations(time, speed, durations, max_time_step=1.0):
+    # Mean speed over each duration (s) ending at each sample, from the integral of the speed (prefix sum)
+    # The speed is held until the next sample, a gap longer than max_time_step (or backwards) counts as null speed
+    # For each duration, returns the mean speed (nan before the first duration)
+    time = np.asarray(time, dtype='double')
+    speed = np.nan_to_num(np.asarray(speed, dtype='double'))
+    dt = np.diff(time)
+    integral = np.zeros(len(time))
+    np.cumsum(speed[:-1] * np.where((dt > 0) & (dt <= max_time_step), dt, 0.), out=integral[1:])
+
+    # Integral at the start of the windows (interpolated inside a step)
+    speed_durations = {}
+    for duration in durations:
+        speed_duration = np.full(len(time), np.nan)
+        if len(time) > 0:
+            is_window = time - duration >= time[0]
+            speed_duration[is_window] = (integral[is_window]
+                                         - np.interp(time[is_window] - duration, time, integral)) / duration
+        speed_durations[duration] = speed_duration
+    return speed_durations
+
+
+def get_best_windows(time, speed_duration, duration, nb_windows):
+    # Best windows that do not overlap (greedy, as the rankings of speed sailing): list of (end index, mean speed)
+    speed_duration = np.where(np.isnan(speed_duration), -np.inf, speed_duration)
+    windows = []
+    for k in range(nb_windows):
+        if len(speed_duration) == 0 or np.isinf(speed_duration.max()):
+            break
+        end = int(np.argmax(speed_duration))
+        windows.append((end, speed_duration[end]))
+        # Windows ending less than a duration before or after the selected window removed
+        speed_duration[np.searchsorted(time, time[end] - duration, side='right'):
+                       np.searchsorted(time, time[end] + duration, side='left')] = -np.inf
+    return windows
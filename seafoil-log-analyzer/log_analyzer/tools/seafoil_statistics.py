@@ -1,14 +1,85 @@
-import copy
-import datetime
-
-import gpxpy
 import numpy as np
 import os
 
 from scipy.interpolate import interpolate
 
+from ..seafoil_data.seafoil_gpx import write_gpx_track
+from ..seafoil_data.seafoil_compute_graph import SeafoilComputeGraph
+from .seafoil_speed import get_speed_for_distances, get_speed_for_durations, get_best_windows
+from .seafoil_manoeuvres import get_manoeuvres, manoeuvre_jibe
+from .seafoil_alpha import get_alphas
+from .seafoil_gnss_filter import filter_gnss, ms_to_knot
+
+
+def compute_speed_distance(data_distance, distances):
+    # Speed over all the distances at once (the cumulative distance is searched for the start of the windows)
+    data = {}
+    for distance, (speed, starting_index) in get_speed_for_distances(data_distance.time, data_distance.distance,
+                                                                     distances).items():
+        data['speed_v' + str(distance)] = speed
+        data['start_v' + str(distance)] = starting_index
+    return data
+
+
+def compute_attitude_filter(data_distance, data_height, data_rpy, filter_width):
+    # Interpolate roll, pitch and height to match the distance data
+    data = {}
+    if not data_height.is_empty():
+        height_filter = np.convolve(data_height.height, np.ones(filter_width) / filter_width, mode='same')
+        f_height = interpolate.interp1d(data_height.time, height_filter, bounds_error=False, kind="zero")
+        data["height"] = f_height(data_distance.time)
+
+    if not data_rpy.is_empty():
+        # convolve roll and pitch with a 2s filter
+        roll_filter = np.convolve(data_rpy.roll, np.ones(filter_width) / filter_width, mode='same')
+        pitch_filter = np.convolve(data_rpy.pitch, np.ones(filter_width) / filter_width, mode='same')
+
+        f_roll = interpolate.interp1d(data_rpy.time, roll_filter, bounds_error=False, kind="zero")
+        data["roll"] = f_roll(data_distance.time)
+
+        f_pitch = interpolate.interp1d(data_rpy.time, pitch_filter, bounds_error=False, kind="zero")
+        data["pitch"] = f_pitch(data_distance.time)
+    return data
+
+
+def compute_speed_duration(data_gnss, gnss_filter, durations):
+    return {"speed_" + str(duration): speed for duration, speed in
+            get_speed_for_durations(data_gnss.time, gnss_filter["speed"], durations).items()}
+
+
+def compute_manoeuvres(data_gnss, **parameters):
+    return get_manoeuvres(data_gnss.time, data_gnss.track, data_gnss.speed, **parameters)
+
+
+def compute_alphas(data_gnss, manoeuvres, gate, length_max):
+    # Alphas searched around the jibes (grid of the positions)
+    is_jibe = manoeuvres["type"] == manoeuvre_jibe
+    return get_alphas(data_gnss.time, data_gnss.latitude, data_gnss.longitude, manoeuvres["start"][is_jibe],
+                      manoeuvres["end"][is_jibe], gate=gate, length_max=length_max)
+
+
+def compute_diff_yaw(data_gnss, window_size):
+    # Cumulative sum of the difference between two consecutive values of the track with modulo 360
+    diff = np.diff(data_gnss.track)
+    yaw = np.zeros(len(data_gnss.track))
+    np.cumsum(np.minimum(diff % 360, 360 - diff % 360) * np.sign(diff), out=yaw[1:])
+
+    yaw = np.convolve(yaw, np.ones(window_size) / window_size, mode='same')
+    data_time = np.convolve(data_gnss.time, np.ones(3) / 3, mode='same')
+    time_diff = np.diff(data_time)
+    yaw_diff = np.diff(yaw) / time_diff
+    return {"yaw": yaw, "yaw_diff": yaw_diff}
+
 
 class SeafoilStatistics:
+    # Version of the computation of the saved statistics (the saved data of another version is recomputed)
+    statistics_version = 1
+    # Durations (s) of the mean speed, and number of the best windows of 10 s (ranking 5x10s)
+    speed_durations = [2, 10, 3600]
+    nb_best_windows = 5
+    # Signals computed with the statistics (the others are computed by the analysis on first access)
+    statistics_signals = ["gnss_filter", "speed_distance", "attitude_filter", "speed_duration", "manoeuvres", "alphas"]
+
     def __init__(self, seafoil_bag):
 
         self.sfb = seafoil_bag
@@ -16,204 +87,182 @@ class SeafoilStatistics:
         self.speed = None
         self.speed_v500 = None
         self.speed_v1852 = None
+        self.speed_distance = {}  # speed over each distance, at the end of the window
+        self.starting_index_distance = {}  # index of the start of the window
         self.max_v500 = None
         self.max_v1852 = None
         self.max_speed = None
         self.time_of_max_speed = None
+        self.speed_duration = {}  # mean speed over each duration, at the end of the window
+        self.max_speed_duration = {}
+        self.best_windows_10s = []  # (end index, mean speed) of the best windows of 10 s
+        self.max_v5x10s = None
+        self.manoeuvres = None  # event table of the jibes and tacks (one array per column)
+        self.max_vjibe = None
+        self.alphas = None  # event table of the alphas (fastest alpha through each jibe)
+        self.max_alpha500 = None
         self.roll_2s = None
         self.pitch_2s = None
         self.height_2s = None
-        self.ms_to_knot = 1.94384
-        self.max_acc_kt = 4.0
-        self.timestep_filter = 1.0
+        self.ms_to_knot = ms_to_knot
         self.mask_acceleration = None
 
+        # Derived signals (saved in the log store, npz file and groups of previous versions removed)
         self.file_save = self.sfb.data_folder + "statistics.npz"
+        self.graph = self.get_graph(self.sfb.get_topic_classes(self.sfb.is_gpx), self.sfb, self.sfb.configuration)
+        self.max_acc_kt = self.graph.get_parameters("gnss_filter")["max_acc_kt"]
+        self.timestep_filter = self.graph.get_parameters("gnss_filter")["timestep_filter"]
+        self.speed_distances = self.graph.get_parameters("speed_distance")["distances"]
 
         self.open_statistics()
 
+    @staticmethod
+    def get_wind_heading(configuration):
+        # Wind heading of the configuration of the log (None if not set: 0 is the default of the configuration)
+        if configuration is None:
+            return None
+        wind_heading = configuration.get("analysis", {}).get("wind_heading")
+        return float(wind_heading) if wind_heading else None
+
+    @staticmethod
+    def get_graph(topic_classes, log_data=None, configuration=None):
+        # Signals of the statistics, with their inputs (topics or signals) and parameters
+        graph = SeafoilComputeGraph(topic_classes, log_data)
+        # Rules of the validity of the gnss samples: acceleration (kt/s, resampled every s), and optional rules on the
+        # speed error (m/s), horizontal dilution of precision, satellites and fix mode (None: rule disabled)
+        graph.add_node("gnss_filter", filter_gnss, ["/driver/fix"],
+                       {"max_acc_kt": 4.0, "timestep_filter": 1.0, "err_speed_max": None, "hdop_max": None,
+                        "satellites_min": None, "mode_min": None})
+        graph.add_node("speed_distance", compute_speed_distance, ["/observer/distance"],
+                       {"distances": [100, 250, 500, 1000, 1852]})
+        graph.add_node("attitude_filter", compute_attitude_filter,
+                       ["/observer/distance", "/observer/height", "/driver/rpy"], {"filter_width": 2})
+        graph.add_node("speed_duration", compute_speed_duration, ["/driver/fix", "gnss_filter"],
+                       {"durations": SeafoilStatistics.speed_durations})
+        # Thresholds of the segmentation of the manoeuvres (deg/s, s, deg, m/s), jibes and tacks separated with the
+        # wind heading of the configuration (deg, estimated from the turns when not set)
+        graph.add_node("manoeuvres", compute_manoeuvres, ["/driver/fix"],
+                       {"turn_rate_min": 10., "rate_window": 1., "gap_max": 1., "heading_change_min": 90.,
+                        "duration_max": 20., "speed_window": 2., "entry_speed_min": 4.,
+                        "wind_heading": SeafoilStatistics.get_wind_heading(configuration)})
+        # Gate and maximum length of the alphas (m)
+        graph.add_node("alphas", compute_alphas, ["/driver/fix", "manoeuvres"], {"gate": 50., "length_max": 500.})
+        graph.add_node("yaw_diff", compute_diff_yaw, ["/driver/fix"], {"window_size": 25 * 3})
+        return graph
+
+    def is_cache_valid(self, name, parameters):
+        return self.sfb.manifest is None or self.sfb.manifest.is_valid(name, self.statistics_version, parameters)
+
+    def update_cache(self, name, parameters):
+        if self.sfb.manifest is not None:
+            self.sfb.manifest.update(name, self.statistics_version, parameters)
+
+    def remove_previous_statistics(self):
+        # Statistics saved at once by previous versions
+        for group in ["statistics", "manoeuvres", "alphas", "signal:speed_filter"]:
+            self.sfb.store.remove_group(group)
+            if self.sfb.manifest is not None:
+                self.sfb.manifest.remove(group)
+        if os.path.exists(self.file_save):
+            os.remove(self.file_save)
+
     def open_statistics(self):
-        try:
-            print("Open statistics file: ", self.file_save)
-            data = np.load(self.file_save)
-            self.speed_v500 = data['speed_v500']
-            self.speed_v1852 = data['speed_v1852']
-            self.time = data['time']
-            if 'height_2s' in data.files:
-                self.height_2s = data['height_2s']
-            if 'roll_2s' in data.files:
-                self.roll_2s = data['roll_2s']
-            if 'pitch_2s' in data.files:
-                self.pitch_2s = data['pitch_2s']
-            data.close()
-            print("Statistics file loaded")
-        except:
-            print("No statistics file found, creating a new one")
-            self.speed_v500 = self.compute_speed_for_distance(self.sfb.distance, 500)
-            self.speed_v1852 = self.compute_speed_for_distance(self.sfb.distance, 1852)
-            self.time = self.sfb.distance.time
-
-            # Interpolate roll, pitch and height to match the gps fix data
-            # interpolate data_height to data_gnss.time_gnss
-            if not self.sfb.height.is_empty():
-                height_filter = np.convolve(self.sfb.height.height, np.ones(2) / 2, mode='same')
-
-                f_height = interpolate.interp1d(self.sfb.height.time, height_filter, bounds_error=False, kind="zero")
-                self.height_2s = f_height(self.time)
-
-            if not self.sfb.rpy.is_empty():
-                # convolve roll and pitch with a 2s filter
-                roll_filter = np.convolve(self.sfb.rpy.roll, np.ones(2) / 2, mode='same')
-                pitch_filter = np.convolve(self.sfb.rpy.pitch, np.ones(2) / 2, mode='same')
-
-                f_roll = interpolate.interp1d(self.sfb.rpy.time, roll_filter, bounds_error=False, kind="zero")
-                self.roll_2s = f_roll(self.time)
-
-                f_pitch = interpolate.interp1d(self.sfb.rpy.time, pitch_filter, bounds_error=False, kind="zero")
-                self.pitch_2s = f_pitch(self.time)
-
-            self.save_statistics()
+        self.remove_previous_statistics()
+
+        data = self.graph.get("speed_distance")
+        for distance in self.speed_distances:
+            self.speed_distance[distance] = data['speed_v' + str(distance)]
+            self.starting_index_distance[distance] = data['start_v' + str(distance)]
+        self.time = self.sfb.distance.time
+        self.speed_v500 = self.speed_distance[500]
+        self.speed_v1852 = self.speed_distance[1852]
+
+        data = self.graph.get("attitude_filter")
+        self.height_2s = data.get("height")
+        self.roll_2s = data.get("roll")
+        self.pitch_2s = data.get("pitch")
 
         # Compute the max speed
         self.max_v500 = np.max(self.speed_v500)
         self.max_v1852 = np.max(self.speed_v1852)
 
-        # Filter speed with at a minimum of one point every seconds
-        data = self.sfb.gps_fix
-        time_interp = np.arange(data.time[0], data.time[-1], self.timestep_filter)
-        # interpolate with mean
-        f_speed = interpolate.interp1d(data.time, data.speed, bounds_error=False, kind="linear")
-        speed = f_speed(time_interp)
-
-
-        # Filter the speed by max acceleration allowed
-        acceleration = np.diff(speed) / np.diff(time_interp)
-        acceleration = np.append(acceleration, 0)
-        # Create a mask where absolute acceleration is less than 3 knots/s^2
-        mask = acceleration > (self.max_acc_kt / self.ms_to_knot)
-        # Apply a convolution to all True values
-        mask = np.convolve(mask, np.ones(5), mode='same')
-        # opposite mask
-        mask = np.logical_not(mask)
-
-        # interpolate mask on the original time
-        f_mask = interpolate.interp1d(time_interp, mask, bounds_error=False, kind="zero")
-        mask_interp = f_mask(data.time)
-        mask_interp[np.isnan(mask_interp)] = 0.
-        self.mask_acceleration = mask_interp
-        result_speed = mask_interp*data.speed
-        result_speed[np.isnan(result_speed)] = 0.
-        self.speed = result_speed
-        self.max_speed = max(result_speed)
-        self.time_of_max_speed = data.time[np.argmax(result_speed)]
-
-    def save_statistics(self):
-        # If folder does not exist, create it
-        if not os.path.exists(os.path.dirname(self.file_save)):
-            os.makedirs(os.path.dirname(self.file_save))
-
-        if self.height_2s is not None and self.roll_2s is not None and self.pitch_2s is not None:
-            np.savez(self.file_save, speed_v500=self.speed_v500,
-                                 speed_v1852=self.speed_v1852,
-                                 time=self.time,
-                                 height_2s=self.height_2s,
-                                 roll_2s=self.roll_2s,
-                                 pitch_2s=self.pitch_2s
-                    )
-        else:
-            np.savez(self.file_save, speed_v500=self.speed_v500,
-                                 speed_v1852=self.speed_v1852,
-                                 time=self.time
-                    )
-        # Only if the file is not a gpx file
-        if not self.sfb.is_gpx:
-            self.save_gpx()
+        # Speed of the valid gnss samples (max acceleration allowed and quality)
+        data = self.graph.get("gnss_filter")
+        self.mask_acceleration = data["mask"]
+        self.speed = data["speed"]
+        self.max_speed = max(self.speed)
+        self.time_of_max_speed = self.sfb.gps_fix.time[np.argmax(self.speed)]
 
-    def compute_speed_for_distance(self, data_distance, distance):
-        speed_distance = None
-        if not data_distance.is_empty():
-            # Compute the speed for 500 m
-            speed_distance = np.zeros(len(data_distance.distance))
-            d0_idx_last = 0
-            for d1_idx in range(1, len(data_distance.distance)):
-                d1 = data_distance.distance[d1_idx]
-                d0 = data_distance.distance[d0_idx_last]
-                if (d1 - d0) >= distance:
-                    for d0_idx in range(d0_idx_last, d1_idx):
-                        d0 = data_distance.distance[d0_idx]
-                        if d1 - d0 <= distance:
-                            dt = data_distance.time[d1_idx] - data_distance.time[d0_idx]
-                            if dt > 0:
-                                speed_distance[d1_idx] = (d1 - d0) / dt
-                            else:
-                                speed_distance[d1_idx] = 0
-                            d0_idx_last = max(0, d0_idx - 1)
-                            break
-        return speed_distance
+        self.open_speed_durations()
+        self.open_manoeuvres()
 
+        # Only if the file is not a gpx file (and of the complete log)
+        if not self.sfb.is_gpx and not self.sfb.is_windowed():
+            self.save_gpx()
 
     def get_starting_index_for_distance_from_last_point(self, data_distance, distance, ending_idx):
-        starting_idx = 0
-        d1 = data_distance.distance[ending_idx]
-        for d0_idx in range(ending_idx, 0, -1):
-            d0 = data_distance.distance[d0_idx]
-            if d1 - d0 >= distance:
-                return d0_idx
-        return starting_idx
+        if distance not in self.starting_index_distance:
+            speed, starting_index = get_speed_for_distances(data_distance.time, data_distance.distance, [distance])[distance]
+            return starting_index[ending_idx]
+        return self.starting_index_distance[distance][ending_idx]
+
+    @staticmethod
+    def get_fix_mask(mode, kernel_size_before, kernel_size_after):
+        # Samples without fix (mode < 3) extended kernel_size_before samples before and kernel_size_after after:
+        # a sample is kept if there is no sample without fix in [i - kernel_size_after, i + kernel_size_before]
+        mode = np.asarray(mode)
+        nb_no_fix = np.zeros(len(mode) + 1, dtype='int64')
+        np.cumsum(mode < 3, out=nb_no_fix[1:])
+        index = np.arange(len(mode))
+        start = np.maximum(index - kernel_size_after, 0)
+        end = np.minimum(index + kernel_size_before + 1, len(mode))
+        return nb_no_fix[end] - nb_no_fix[start] == 0
 
     def save_gpx(self):
         filepath = self.sfb.data_folder + self.sfb.file_name + ".gpx"
         print("Save gpx file: ", filepath)
 
+        # Opening of the fix mode (samples): 10s after and 2s before a sample without fix
+        parameters = {"kernel_size_after": 25 * 10, "kernel_size_before": 25 * 2}
+        if not self.sfb.is_gpx and os.path.exists(filepath) and not self.is_cache_valid("gpx", parameters):
+            print("Outdated gpx file")
+            os.remove(filepath)
+
         if self.sfb.is_gpx or os.path.exists(filepath):
             return
 
         data_gnss = self.sfb.gps_fix
 
-        gpx = gpxpy.gpx.GPX()
-        gpx.creator = "SeaFoil"
-        is_fix_mode = False
-
-        gpx_track = gpxpy.gpx.GPXTrack()
-        gpx_track.name = "Windfoil session"
-        gpx_segments = []
-
         # Apply an opening to data_gnss.mode[i] by enlarging of 25 sample when mode is less than 3
-        kernel_size_after = 25 * 10  # 10s after
-        kernel_size_before = 25 * 2  # 2s before
-        mode = data_gnss.mode
-        mode_filtered = mode.copy()
-
-        for i, mode_val in enumerate(mode):
-            if mode_val < 3:
-                start_index = max(0, i - kernel_size_before)
-                end_index = min(len(mode), i + kernel_size_after + 1)
-                mode_filtered[start_index:end_index] = 0
-
-        for i in range(len(data_gnss.latitude)):
-            if mode_filtered[i] >= 3:  # Fix mode
-                if not is_fix_mode:
-                    gpx_segments.append(gpxpy.gpx.GPXTrackSegment())
-                    is_fix_mode = True
-
-                pt = gpxpy.gpx.GPXTrackPoint(latitude=data_gnss.latitude[i],
-                                             longitude=data_gnss.longitude[i],
-                                             time=datetime.datetime.fromtimestamp(
-                                                 data_gnss.time_gnss[i], datetime.timezone.utc),
-                                             speed=data_gnss.speed[i],
-                                             )
-                pt.course = data_gnss.track[i]
-                gpx_segments[-1].points.append(pt)
-            else:
-                is_fix_mode = False
-
-        for seg in gpx_segments:
-            gpx_track.segments.append(seg)
-        gpx.tracks.append(gpx_track)
-
-        file = open(filepath, "w")
-        file.write(gpx.to_xml(version='1.1'))
-        file.close()
+        is_fix = self.get_fix_mask(data_gnss.mode, parameters["kernel_size_before"], parameters["kernel_size_after"])
+
+        # Points written by segments of fix, without building the gpx tree
+        write_gpx_track(filepath, data_gnss.time_gnss, data_gnss.latitude, data_gnss.longitude, is_fix,
+                        creator="SeaFoil", name="Windfoil session")
+        self.update_cache("gpx", parameters)
+
+    def open_speed_durations(self):
+        # Best mean speeds (None if the log is shorter than the duration)
+        data = self.graph.get("speed_duration")
+        for duration in self.speed_durations:
+            speed_duration = data["speed_" + str(duration)]
+            self.speed_duration[duration] = speed_duration
+            is_window = ~np.isnan(speed_duration)
+            self.max_speed_duration[duration] = float(np.max(speed_duration[is_window])) if np.any(is_window) else None
+
+        self.best_windows_10s = get_best_windows(self.sfb.gps_fix.time, self.speed_duration[10], 10,
+                                                 self.nb_best_windows)
+        if len(self.best_windows_10s) == self.nb_best_windows:
+            self.max_v5x10s = float(np.mean([speed for end, speed in self.best_windows_10s]))
+
+    def open_manoeuvres(self):
+        # Best jibe: highest minimum speed through a jibe
+        self.manoeuvres = self.graph.get("manoeuvres")
+        minimum_speed = self.manoeuvres["minimum_speed"][self.manoeuvres["type"] == manoeuvre_jibe]
+        self.max_vjibe = float(np.max(minimum_speed)) if len(minimum_speed) > 0 else None
+
+        self.alphas = self.graph.get("alphas")
+        self.max_alpha500 = float(np.max(self.alphas["speed"])) if len(self.alphas["speed"]) > 0 else None
 
     def get_max_speed_kt(self):
-        return self.ms_to_knot * self.max_speed, self.time_of_max_speed
\ No newline at end of file
+        return self.ms_to_knot * self.max_speed, self.time_of_max_speed
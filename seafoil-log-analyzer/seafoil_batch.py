@@ -0,0 +1,156 @@
+import argparse
+import datetime
+import multiprocessing
+import os
+import sys
+import time
+
+import yaml
+
+from db.seafoil_db import SeafoilDB
+from log_analyzer.seafoil_log_data import SeafoilLogData, open_log
+from log_analyzer.seafoil_data.seafoil_cache_manifest import SeafoilCacheManifest
+from log_analyzer.tools.seafoil_statistics import SeafoilStatistics
+
+# Headless processing of the logs of the library (statistics saved in the database), without Qt
+# example: python3 seafoil_batch.py --stale --workers 8
+
+
+def get_data_folder(file_path):
+    # Same data folder as SeafoilLogData
+    return os.path.dirname(file_path) + "/data/"
+
+
+def get_configuration(file_path):
+    # Configuration of the log saved by SeafoilLogData (None if the log was never opened)
+    file_name = get_data_folder(file_path) + "configuration.yaml"
+    if not os.path.exists(file_name):
+        return None
+    with open(file_name, 'r') as file:
+        return yaml.load(file, Loader=yaml.FullLoader)
+
+
+def get_log_size(file_path):
+    if os.path.isfile(file_path):
+        return os.path.getsize(file_path)
+    return sum(entry.stat().st_size for entry in os.scandir(file_path) if entry.is_file())
+
+
+def is_log_stale(log, file_path):
+    # Statistics missing, or computed by another version (of the statistics or of the topics they use)
+    if log['statistics_id'] is None or log['starting_time'] is None:
+        return True
+    manifest = SeafoilCacheManifest(get_data_folder(file_path))
+    topic_classes = SeafoilLogData.get_topic_classes(file_path.endswith(".gpx"))
+    if not SeafoilStatistics.get_graph(topic_classes, configuration=get_configuration(file_path)).is_up_to_date(
+            manifest, SeafoilStatistics.statistics_signals):
+        return True
+    if file_path.endswith(".gpx"):
+        return False
+    return not all(manifest.is_up_to_date(topic, SeafoilLogData.topic_classes[topic].generator_version)
+                   for topic in SeafoilLogData.statistics_topics)
+
+
+def process_log(log, nb_read_workers=1):
+    # Run in a worker process: only the results are sent back (the data of the log is released with the worker)
+    # The bag of the log is read by nb_read_workers processes (chunks of the mcap files read in parallel)
+    log_id, file_path = log
+    t0 = time.perf_counter()
+    result = {"id": log_id, "file_path": file_path, "size": 0, "error": None}
+    try:
+        result["size"] = get_log_size(file_path)
+        sfb = open_log(file_path, topics=SeafoilLogData.statistics_topics, nb_workers=nb_read_workers)
+        statistics = sfb.get_statistics()
+        result["statistics"] = {key: statistics[key] for key in SeafoilDB.statistics_columns}
+        result["starting_time"] = sfb.get_starting_time_timestamp()
+        result["ending_time"] = sfb.get_ending_time_timestamp()
+    except Exception as e:
+        result["error"] = str(e)
+    result["duration"] = time.perf_counter() - t0
+    return result
+
+
+def process_logs(logs, nb_workers, nb_read_workers=1, max_logs_per_worker=10):
+    # Results of the logs, in the order they are processed
+    if nb_read_workers > 1:
+        # Logs processed one by one, the chunks of each bag read in parallel
+        for log in logs:
+            yield process_log(log, nb_read_workers)
+        return
+    # Spawned processes, as the readers of the bags (get_process_pool)
+    with multiprocessing.get_context('spawn').Pool(max(1, min(nb_workers, len(logs))),
+                                                   maxtasksperchild=max_logs_per_worker) as pool:
+        for result in pool.imap_unordered(process_log, logs):
+            yield result
+
+
+def save_results(db, results):
+    # All the results of the batch in a single transaction
+    for result in results:
+        db.add_log_statistics(result["id"], result["statistics"], commit=False)
+        db.update_log_time(result["id"], result["starting_time"], result["ending_time"], commit=False)
+    db.commit()
+
+
+def parse_date(date):
+    return datetime.datetime.strptime(date, "%Y-%m-%d").timestamp()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Process the logs of the Seafoil library without the user interface '
+                                                 '(all the logs without selection)')
+    parser.add_argument('--ids', type=int, nargs='+', help='ids of the logs')
+    parser.add_argument('--rider', type=int, help='id of the rider of the logs')
+    parser.add_argument('--start', type=parse_date, help='logs starting after this date (YYYY-MM-DD)')
+    parser.add_argument('--end', type=parse_date, help='logs starting before this date (YYYY-MM-DD)')
+    parser.add_argument('--stale', action='store_true', help='only the logs without up to date statistics')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='number of logs processed in parallel')
+    parser.add_argument('--read-workers', type=int, default=1,
+                        help='number of processes reading the bag of each log (logs then processed one by one)')
+    parser.add_argument('--batch-size', type=int, default=20, help='number of logs saved in a single transaction')
+    parser.add_argument('--max-logs-per-worker', type=int, default=10,
+                        help='number of logs processed by a worker before it is restarted (memory released)')
+    args = parser.parse_args()
+
+    db = SeafoilDB()
+    logs = []
+    for log in db.get_logs_filtered(args.ids, args.rider, args.start, args.end):
+        file_path = db.get_log_directory(log['id'], log['name'])
+        if not os.path.exists(file_path):
+            print("Oops!  log not found ", log['id'], file_path)
+            continue
+        if args.stale and not is_log_stale(log, file_path):
+            continue
+        logs.append((log['id'], file_path))
+    print("Logs to process: ", len(logs))
+    if len(logs) == 0:
+        return 0
+
+    t0 = time.perf_counter()
+    nb_processed = 0
+    nb_failed = 0
+    nb_bytes = 0
+    results = []
+    for result in process_logs(logs, args.workers, args.read_workers, args.max_logs_per_worker):
+        nb_processed += 1
+        nb_bytes += result["size"]
+        if result["error"] is not None:
+            nb_failed += 1
+            print("Oops!  error processing log ", result["id"], result["file_path"], result["error"])
+        else:
+            results.append(result)
+            print("[%d/%d] log %d processed in %.1f s (%.1f MB)" % (nb_processed, len(logs), result["id"],
+                                                                     result["duration"], result["size"] / 1e6))
+        if len(results) >= args.batch_size:
+            save_results(db, results)
+            results = []
+    save_results(db, results)
+
+    duration = time.perf_counter() - t0
+    print("Processed %d logs (%d failed) in %.1f s: %.1f logs/min, %.1f MB/s" % (
+        nb_processed, nb_failed, duration, 60 * nb_processed / duration, nb_bytes / 1e6 / duration))
+    return 1 if nb_failed > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from log_analyzer.seafoil_data.seafoil_geodesy import earth_radius
+from log_analyzer.tools.seafoil_alpha import get_alphas, get_close_pairs
+
+# Tests of the alphas detected around the jibes
+# example: python3 -m pytest test_alpha.py
+
+alpha_fields = ["start", "end", "speed", "distance", "gate_distance", "starting_time", "ending_time"]
+
+
+def get_positions(east, north, latitude_0=48.4, longitude_0=-4.5):
+    # Latitude and longitude of points of a local frame (m)
+    latitude = latitude_0 + np.degrees(np.asarray(north) / earth_radius)
+    longitude = longitude_0 + np.degrees(np.asarray(east) / (earth_radius * np.cos(np.radians(latitude_0))))
+    return latitude, longitude
+
+
+def get_out_and_back(length=200., offset=20., speed=10., dt=0.5):
+    # Run east, half circle to the north (jibe), run back west offset by the diameter of the jibe
+    n = int(round(length / (speed * dt)))
+    east_out = np.arange(n) * speed * dt
+    angle = np.linspace(-np.pi / 2, np.pi / 2, 10)
+    east_jibe = east_out[-1] + speed * dt + offset / 2 * np.cos(angle)
+    north_jibe = offset / 2 + offset / 2 * np.sin(angle)
+    east_back = east_out[::-1]
+    east = np.concatenate((east_out, east_jibe, east_back))
+    north = np.concatenate((np.zeros(n), north_jibe, np.full(n, offset)))
+    time = np.arange(len(east)) * dt
+    latitude, longitude = get_positions(east, north)
+    return time, latitude, longitude, n, n + len(angle) - 1
+
+
+def check_empty(alphas):
+    assert sorted(alphas.keys()) == sorted(alpha_fields)
+    assert all(len(alphas[name]) == 0 for name in alpha_fields)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_close_pairs(seed):
+    # Same pairs than the comparison of all the points
+    rng = np.random.default_rng(seed)
+    x_1, y_1 = rng.uniform(-300., 300., (2, 400))
+    x_2, y_2 = rng.uniform(-300., 300., (2, 300))
+    index_1, index_2 = get_close_pairs(x_1, y_1, x_2, y_2, 50.)
+    distance = np.hypot(x_1[:, None] - x_2[None, :], y_1[:, None] - y_2[None, :])
+    expected = set(zip(*np.nonzero(distance <= 50.)))
+    assert len(index_1) == len(expected)
+    assert set(zip(index_1, index_2)) == expected
+
+
+def test_close_pairs_empty():
+    index_1, index_2 = get_close_pairs(np.zeros(0), np.zeros(0), np.ones(3), np.ones(3), 50.)
+    assert len(index_1) == 0 and len(index_2) == 0
+
+
+def test_alpha():
+    time, latitude, longitude, jibe_start, jibe_end = get_out_and_back()
+    alphas = get_alphas(time, latitude, longitude, [jibe_start], [jibe_end])
+    assert len(alphas["start"]) == 1
+    assert alphas["start"][0] <= jibe_start and alphas["end"][0] >= jibe_end
+    assert alphas["gate_distance"][0] <= 50.
+    assert alphas["distance"][0] <= 500.
+    assert np.isclose(alphas["speed"][0], 10., rtol=0.05)
+    assert alphas["starting_time"][0] == time[alphas["start"][0]]
+
+
+def test_no_alpha():
+    # Gate too small for the diameter of the jibe
+    time, latitude, longitude, jibe_start, jibe_end = get_out_and_back(offset=80.)
+    check_empty(get_alphas(time, latitude, longitude, [jibe_start], [jibe_end]))
+    # No jibes
+    check_empty(get_alphas(time, latitude, longitude, [], []))
+
+
+@pytest.mark.parametrize("n", [0, 1])
+def test_no_samples(n):
+    latitude, longitude = get_positions(np.zeros(n), np.zeros(n))
+    check_empty(get_alphas(np.arange(n, dtype='double'), latitude, longitude, [], []))
+
+
+def test_jibe_at_boundaries():
+    # Jibe starting at the first sample or ending at the last sample: no run before or after it
+    time, latitude, longitude, jibe_start, jibe_end = get_out_and_back()
+    alphas = get_alphas(time[jibe_start:], latitude[jibe_start:], longitude[jibe_start:], [0],
+                        [jibe_end - jibe_start])
+    assert np.array_equal(alphas["start"], [0])
+    alphas = get_alphas(time[:jibe_end + 1], latitude[:jibe_end + 1], longitude[:jibe_end + 1], [jibe_start],
+                        [jibe_end])
+    assert np.array_equal(alphas["end"], [jibe_end])
+
+    # Whole track in the jibe
+    alphas = get_alphas(time[jibe_start:jibe_end + 1], latitude[jibe_start:jibe_end + 1],
+                        longitude[jibe_start:jibe_end + 1], [0], [jibe_end - jibe_start])
+    assert np.array_equal(alphas["start"], [0]) and np.array_equal(alphas["end"], [jibe_end - jibe_start])
+    assert np.all(alphas["gate_distance"] <= 50.)
@@ -0,0 +1,112 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from log_analyzer.seafoil_data import seafoil_mcap_reader
+from log_analyzer.seafoil_data.seafoil_bag_reader import SeafoilBagReader, SeafoilTopicMessages
+
+# Tests of the bag reader: chunks read by a process pool give the same messages than a single reader
+# example: python3 -m pytest test_bag_reader.py
+
+topics = ["/sample", "/text"]
+
+
+def get_date(t):
+    return datetime.datetime.fromtimestamp(t * 1e-9)
+
+
+def read(bag_path, nb_workers, offset_date=datetime.datetime(2019, 1, 1), end_date=None):
+    messages = SeafoilBagReader(bag_path, offset_date, nb_workers=nb_workers, end_date=end_date).read(topics)
+    return {topic_name: (messages[topic_name].finish(), messages[topic_name]) for topic_name in topics}
+
+
+def check_same_messages(messages, reference):
+    for topic_name in topics:
+        records, topic_messages = messages[topic_name]
+        reference_records, reference_messages = reference[topic_name]
+        assert len(topic_messages) == len(reference_messages)
+        assert np.array_equal(topic_messages.time, reference_messages.time)
+        if reference_records is None:
+            assert records is None
+            assert topic_messages.data == reference_messages.data
+        else:
+            assert np.array_equal(records, reference_records)
+
+
+@pytest.mark.parametrize("chunk_size", [500, None])
+def test_parallel_read(mcap_bag, expected_messages, monkeypatch, chunk_size):
+    # Messages written outside of chunks read by groups of 20 kB
+    monkeypatch.setattr(seafoil_mcap_reader, "mcap_records_size", 20000)
+    bag_path, messages = mcap_bag(chunk_size=chunk_size)
+    assert len(SeafoilBagReader(bag_path).get_backend().get_chunks(topics)) > 1
+    reference = read(bag_path, 1)
+    check_same_messages(read(bag_path, 3), reference)
+
+    data, time = expected_messages(messages, "/sample")
+    records, topic_messages = reference["/sample"]
+    assert np.array_equal(topic_messages.time, time)
+    assert np.array_equal(records["index"], np.arange(len(data)))
+    assert np.array_equal(records["vector"][:, 1], 2 * np.arange(len(data)))
+    data, time = expected_messages(messages, "/text")
+    assert reference["/text"][1].data == data
+
+
+def test_parallel_read_window(mcap_bag, expected_messages):
+    # Chunks outside the window not read, messages of the chunks at the limits filtered
+    bag_path, messages = mcap_bag(chunk_size=400)
+    start_time, end_time = messages[700][1], messages[2300][1]
+    reference = read(bag_path, 1, get_date(start_time), get_date(end_time))
+    check_same_messages(read(bag_path, 2, get_date(start_time), get_date(end_time)), reference)
+
+    data, time = expected_messages(messages, "/sample", start_time, end_time)
+    assert np.array_equal(reference["/sample"][1].time, time)
+
+
+def get_chunk(reader, payloads, times, batch_size=4096):
+    topic_messages = SeafoilTopicMessages("/sample", reader.get_backend().get_type_map()["/sample"],
+                                          reader.get_backend().get_fields)
+    topic_messages.batch_size = batch_size
+    for payload, t in zip(payloads, times):
+        topic_messages.append(payload, t)
+    return topic_messages
+
+
+@pytest.mark.parametrize("is_padded", [[False, True], [True, False], [False, True, False], [True, False, True]])
+def test_merge_fixed_and_variable(mcap_bag, expected_messages, is_padded):
+    # Chunks of messages of another size (not decoded in bulk, kept serialized by the worker) merged with the chunks
+    # decoded in bulk: all the messages converted to records
+    bag_path, messages = mcap_bag(nb_messages=300)
+    reader = SeafoilBagReader(bag_path)
+    data, time = expected_messages(messages, "/sample")
+    reference = get_chunk(reader, data, time)
+    reference_records = reference.finish()
+
+    merged = get_chunk(reader, [], [])
+    for k, padded in enumerate(is_padded):
+        part = slice(k * len(data) // len(is_padded), (k + 1) * len(data) // len(is_padded))
+        payloads = [payload + b'\x00' * 8 for payload in data[part]] if padded else data[part]
+        chunk = get_chunk(reader, payloads, time[part])
+        chunk.finish()
+        assert chunk.is_fixed is not padded
+        merged.merge(chunk)
+    records = merged.finish()
+
+    assert len(merged) == len(data)
+    assert np.array_equal(merged.time, time)
+    assert np.array_equal(records, reference_records)
+
+
+def test_batches_fixed_and_variable(mcap_bag, expected_messages):
+    # Batches of messages of another size read by a single reader: converted to records
+    bag_path, messages = mcap_bag(nb_messages=300)
+    reader = SeafoilBagReader(bag_path)
+    data, time = expected_messages(messages, "/sample")
+    reference_records = get_chunk(reader, data, time).finish()
+
+    payloads = data[:100] + [payload + b'\x00' * 8 for payload in data[100:]]
+    topic_messages = get_chunk(reader, payloads, time, batch_size=64)
+    records = topic_messages.finish()
+    assert len(topic_messages) == len(data)
+    assert np.array_equal(topic_messages.time, time)
+    assert np.array_equal(records, reference_records)
@@ -0,0 +1,73 @@
+import os
+
+from log_analyzer.seafoil_data.seafoil_cache_manifest import SeafoilCacheManifest
+from log_analyzer.seafoil_log_data import SeafoilLogData, open_log
+from test_gpx import write_track, get_track
+
+# Tests of the manifest of the data folder (how the saved data was computed)
+# example: python3 -m pytest test_cache_manifest.py
+
+fingerprint = {"bag_0.mcap": {"size": 1000, "mtime": 1}}
+
+
+def test_unknown_entry(tmp_path):
+    # Data without entry is stale, the manifest is not written by the checks
+    data_folder = str(tmp_path / "data")
+    manifest = SeafoilCacheManifest(data_folder, fingerprint)
+    assert not manifest.is_valid("/driver/fix", "1")
+    assert not manifest.is_up_to_date("/driver/fix", "1")
+    manifest.save()
+    assert not os.path.exists(manifest.file_name)
+    assert manifest.entries == {}
+
+
+def test_update_and_save(tmp_path):
+    # Entries written at once by save
+    data_folder = str(tmp_path / "data")
+    manifest = SeafoilCacheManifest(data_folder, fingerprint)
+    manifest.update("/driver/fix", "1")
+    manifest.update("signal:gnss_filter", "abc", {"max_acc_kt": 4.0})
+    assert manifest.is_valid("/driver/fix", "1")
+    assert not os.path.exists(manifest.file_name)
+    manifest.save()
+
+    manifest = SeafoilCacheManifest(data_folder, fingerprint)
+    assert manifest.is_valid("/driver/fix", "1")
+    assert not manifest.is_valid("/driver/fix", "2")
+    assert manifest.is_valid("signal:gnss_filter", "abc", {"max_acc_kt": 4.0})
+    assert not manifest.is_valid("signal:gnss_filter", "abc", {"max_acc_kt": 5.0})
+    # Other bag files
+    assert not SeafoilCacheManifest(data_folder, {"bag_0.mcap": {"size": 1000, "mtime": 2}}).is_valid("/driver/fix",
+                                                                                                      "1")
+    assert SeafoilCacheManifest(data_folder).is_up_to_date("/driver/fix", "1")
+
+    # Not written again without change
+    os.remove(manifest.file_name)
+    manifest.save()
+    assert not os.path.exists(manifest.file_name)
+    manifest.remove("/driver/fix")
+    manifest.save()
+    assert list(SeafoilCacheManifest(data_folder, fingerprint).entries) == ["signal:gnss_filter"]
+
+
+def test_saved_once_per_load(tmp_path, monkeypatch):
+    # Manifest written once at the end of the loading of a log (topics and statistics)
+    file_name = str(tmp_path / "track.gpx")
+    write_track(file_name, *get_track())
+    writes = []
+    save = SeafoilCacheManifest.save
+
+    def save_manifest(manifest):
+        if manifest.is_modified:
+            writes.append(dict(manifest.entries))
+        save(manifest)
+    monkeypatch.setattr(SeafoilCacheManifest, "save", save_manifest)
+    log_data = open_log(file_name, topics=SeafoilLogData.statistics_topics)
+    log_data.configuration_finalizer.detach()
+    assert len(writes) == 1
+    assert "signal:gnss_filter" in writes[0]
+
+    # Reopened: data up to date, nothing written
+    log_data = open_log(file_name, topics=SeafoilLogData.statistics_topics)
+    log_data.configuration_finalizer.detach()
+    assert len(writes) == 1
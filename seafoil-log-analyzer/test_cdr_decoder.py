@@ -0,0 +1,190 @@
+import struct
+
+import numpy as np
+import pytest
+
+from log_analyzer.seafoil_data.seafoil_cdr_decoder import decode_cdr_messages, deserialize_cdr_message, \
+    primitive_types
+from log_analyzer.seafoil_data.seafoil_bag_reader import SeafoilTopicMessages
+
+# Tests of the bulk CDR decoder and of the generic deserializer against the serialized values (and the
+# deserializer of ROS when installed)
+# example: python3 -m pytest test_cdr_decoder.py
+
+message_fields = {
+    "builtin_interfaces/Time": {"sec": "int32", "nanosec": "uint32"},
+    "std_msgs/Header": {"stamp": "builtin_interfaces/Time", "frame_id": "string"},
+    # Fields of every size after the header string (alignment relative to the encapsulation header)
+    "test_msgs/Fix": {"header": "std_msgs/Header", "status": "int8", "latitude": "double", "satellites": "uint16",
+                      "speed": "float", "mode": "uint8", "covariance": "double[3]", "valid": "boolean"},
+    "test_msgs/Log": {"header": "std_msgs/Header", "level": "uint8", "msg": "string", "values": "sequence<float>"},
+}
+
+
+def get_fields(type_name):
+    return message_fields[type_name]
+
+
+class CdrWriter(object):
+    # Serialization of a message (little endian CDR), alignment relative to the end of the encapsulation header
+    def __init__(self):
+        self.buffer = bytearray(b'\x00\x01\x00\x00')
+
+    def align(self, size):
+        self.buffer += b'\x00' * ((-(len(self.buffer) - 4)) % min(size, 8))
+
+    def write_primitive(self, ros_type, value):
+        fmt = primitive_types[ros_type]
+        self.align(int(fmt[1:]))
+        self.buffer += np.array(value, dtype='<' + fmt).tobytes()
+
+    def write_string(self, value):
+        data = value.encode('utf-8') + b'\x00'
+        self.align(4)
+        self.buffer += struct.pack('<I', len(data)) + data
+
+    def write_message(self, type_name, values):
+        for name, ros_type in get_fields(type_name).items():
+            value = values[name]
+            if ros_type in primitive_types:
+                self.write_primitive(ros_type, value)
+            elif ros_type == "string":
+                self.write_string(value)
+            elif ros_type.endswith(']'):
+                for v in value:
+                    self.write_primitive(ros_type.split('[')[0], v)
+            elif ros_type.startswith("sequence"):
+                self.align(4)
+                self.buffer += struct.pack('<I', len(value))
+                for v in value:
+                    self.write_primitive(ros_type[len("sequence<"):-1], v)
+            else:
+                self.write_message(ros_type, value)
+
+    def get_payload(self):
+        # Payloads padded to 4 bytes
+        return bytes(self.buffer + b'\x00' * (-len(self.buffer) % 4))
+
+
+def get_fix(i, frame_id="gnss"):
+    return {"header": {"stamp": {"sec": 1700000000 + i, "nanosec": 1000 * i}, "frame_id": frame_id},
+            "status": -1 + i % 3, "latitude": 48.4 + 1e-5 * i, "satellites": 10 + i, "speed": 0.5 * i,
+            "mode": 3, "covariance": [0.1 * i, 0.2, 0.3], "valid": i % 2 == 0}
+
+
+def serialize(type_name, values):
+    writer = CdrWriter()
+    writer.write_message(type_name, values)
+    return writer.get_payload()
+
+
+def check_record(record, values):
+    # Same values than the serialized message
+    assert record["header.stamp.sec"] == values["header"]["stamp"]["sec"]
+    assert record["header.stamp.nanosec"] == values["header"]["stamp"]["nanosec"]
+    assert record["status"] == values["status"]
+    assert record["latitude"] == values["latitude"]
+    assert record["satellites"] == values["satellites"]
+    assert record["speed"] == np.float32(values["speed"])
+    assert record["mode"] == values["mode"]
+    assert np.array_equal(record["covariance"], values["covariance"])
+    assert bool(record["valid"]) == values["valid"]
+
+
+@pytest.mark.parametrize("frame_id", ["", "a", "gnss", "base_link"])
+def test_decode_aligned_fields(frame_id):
+    # The size of the header string moves the fields after it (and their padding)
+    fixes = [get_fix(i, frame_id) for i in range(10)]
+    data = [serialize("test_msgs/Fix", fix) for fix in fixes]
+    records = decode_cdr_messages(data, "test_msgs/Fix", get_fields)
+    assert records is not None and len(records) == len(data)
+    for record, fix in zip(records, fixes):
+        check_record(record, fix)
+
+
+@pytest.mark.parametrize("frame_id", ["", "a", "base_link"])
+def test_deserialize(frame_id):
+    # Same values than the bulk decoder
+    fixes = [get_fix(i, frame_id) for i in range(3)]
+    data = [serialize("test_msgs/Fix", fix) for fix in fixes]
+    for record, payload, fix in zip(decode_cdr_messages(data, "test_msgs/Fix", get_fields), data, fixes):
+        msg = deserialize_cdr_message(payload, "test_msgs/Fix", get_fields)
+        assert msg.header.frame_id == frame_id
+        assert msg.header.stamp.sec == record["header.stamp.sec"] == fix["header"]["stamp"]["sec"]
+        assert msg.status == record["status"]
+        assert msg.latitude == record["latitude"]
+        assert msg.satellites == record["satellites"]
+        assert np.float32(msg.speed) == record["speed"]
+        assert msg.mode == record["mode"]
+        assert np.array_equal(msg.covariance, record["covariance"])
+        assert msg.valid == fix["valid"]
+
+
+def test_decode_different_header_strings():
+    # Same payload size but header strings of different sizes: not decoded in bulk
+    data = [serialize("test_msgs/Fix", get_fix(0, "a")), serialize("test_msgs/Fix", get_fix(1, "ab"))]
+    assert len(data[0]) == len(data[1])
+    assert decode_cdr_messages(data, "test_msgs/Fix", get_fields) is None
+
+
+def test_decode_variable_size():
+    data = [serialize("test_msgs/Log", {"header": get_fix(0)["header"], "level": 20, "msg": "started",
+                                        "values": [1., 2.]})]
+    assert decode_cdr_messages(data, "test_msgs/Log", get_fields) is None
+    msg = deserialize_cdr_message(data[0], "test_msgs/Log", get_fields)
+    assert msg.msg == "started" and msg.level == 20
+    assert np.array_equal(msg.values, [1., 2.])
+
+
+def test_topic_messages_batches():
+    # Batches of messages with header strings of different sizes decoded message by message, time kept in order
+    frame_ids = ["a", "ab", "abc", "abcd", "gnss"]
+    fixes = [get_fix(i, frame_ids[(i // 4) % len(frame_ids)]) for i in range(23)]
+    topic_messages = SeafoilTopicMessages("/gps/fix", "test_msgs/Fix", get_fields)
+    topic_messages.batch_size = 5
+    for i, fix in enumerate(fixes):
+        topic_messages.append(serialize("test_msgs/Fix", fix), 1000 * i)
+    records = topic_messages.finish()
+
+    assert len(topic_messages) == len(fixes)
+    assert np.array_equal(topic_messages.time, 1000 * np.arange(len(fixes)))
+    for record, fix in zip(records, fixes):
+        check_record(record, fix)
+
+
+def test_topic_messages_variable_size():
+    # Messages of variable size kept serialized
+    topic_messages = SeafoilTopicMessages("/rosout", "test_msgs/Log", get_fields)
+    data = [serialize("test_msgs/Log", {"header": get_fix(i)["header"], "level": 20, "msg": "message " * i,
+                                        "values": [0.5] * i}) for i in range(7)]
+    for i, payload in enumerate(data):
+        topic_messages.append(payload, i)
+    assert topic_messages.finish() is None
+    assert topic_messages.data == data
+    assert np.array_equal(topic_messages.time, np.arange(len(data)))
+
+
+def test_ros_deserializer():
+    # Same values than the deserializer of ROS (installed distribution only)
+    pytest.importorskip("rclpy")
+    from rclpy.serialization import serialize_message, deserialize_message
+    from sensor_msgs.msg import NavSatFix
+
+    data = []
+    for i in range(10):
+        msg = NavSatFix()
+        msg.header.stamp.sec = 1700000000 + i
+        msg.header.frame_id = "gnss"
+        msg.status.status = i % 3 - 1
+        msg.latitude = 48.4 + 1e-5 * i
+        msg.longitude = -4.5
+        msg.position_covariance = [0.1 * i] * 9
+        data.append(serialize_message(msg))
+    records = decode_cdr_messages(data, "sensor_msgs/msg/NavSatFix")
+    for record, payload in zip(records, data):
+        msg = deserialize_message(payload, NavSatFix)
+        assert record["header.stamp.sec"] == msg.header.stamp.sec
+        assert record["status.status"] == msg.status.status
+        assert record["latitude"] == msg.latitude
+        assert record["longitude"] == msg.longitude
+        assert np.array_equal(record["position_covariance"], msg.position_covariance)
@@ -0,0 +1,149 @@
+import datetime
+
+import gpxpy
+import gpxpy.geo
+import gpxpy.gpx
+import numpy as np
+import pytest
+
+from log_analyzer.seafoil_data.seafoil_geodesy import get_distance, get_bearing
+from log_analyzer.seafoil_data.seafoil_gpx import SeafoilGpxReader, SeafoilGpx, correction_of_malformed_gpx
+
+# Tests of the streaming gpx reader and of the geodesy functions against gpxpy
+# example: python3 -m pytest test_gpx.py
+
+extension = """
+        <extensions>
+          <gpxtpx:TrackPointExtension>
+            <gpxtpx:hr>120</gpxtpx:hr>
+            <gpxtpx:speed>4.2</gpxtpx:speed>
+          </gpxtpx:TrackPointExtension>
+        </extensions>"""
+
+
+def get_track(n=600, seed=0):
+    # Track at about 10 m/s, points every second (or 200 ms), time with and without microseconds
+    rng = np.random.default_rng(seed)
+    heading = np.cumsum(rng.normal(0., 0.2, n))
+    step = 10. + rng.normal(0., 2., n)
+    latitude = 48.4 + np.cumsum(step * np.cos(heading)) / 111000.
+    longitude = -4.5 + np.cumsum(step * np.sin(heading)) / 74000.
+    t0 = datetime.datetime(2024, 5, 1, 10, 0, tzinfo=datetime.timezone.utc)
+    times = [t0 + datetime.timedelta(seconds=i if i < n // 2 else n // 2 + 0.2 * (i - n // 2)) for i in range(n)]
+    return times, latitude, longitude
+
+
+def write_track(file_name, times, latitude, longitude, segments=2):
+    gpx = gpxpy.gpx.GPX()
+    track = gpxpy.gpx.GPXTrack()
+    gpx.tracks.append(track)
+    for part in np.array_split(np.arange(len(times)), segments):
+        segment = gpxpy.gpx.GPXTrackSegment()
+        track.segments.append(segment)
+        for i in part:
+            segment.points.append(gpxpy.gpx.GPXTrackPoint(latitude[i], longitude[i], time=times[i]))
+    content = gpx.to_xml()
+    with open(file_name, 'w') as file:
+        file.write(content)
+    return content
+
+
+def get_gpxpy_points(content):
+    gpx = gpxpy.parse(correction_of_malformed_gpx(content))
+    return [point for track in gpx.tracks for segment in track.segments for point in segment.points
+            if point.time is not None]
+
+
+def check_points(read, points):
+    time_gnss, latitude, longitude = read
+    assert len(time_gnss) == len(points)
+    assert np.allclose(time_gnss, [point.time.timestamp() for point in points], rtol=0., atol=1e-6)
+    assert np.array_equal(latitude, [point.latitude for point in points])
+    assert np.array_equal(longitude, [point.longitude for point in points])
+
+
+def test_read_track(tmp_path):
+    file_name = str(tmp_path / "track.gpx")
+    content = write_track(file_name, *get_track())
+    check_points(SeafoilGpxReader().read(file_name), get_gpxpy_points(content))
+
+
+def test_geodesy():
+    times, latitude, longitude = get_track()
+    distance = get_distance(latitude[:-1], longitude[:-1], latitude[1:], longitude[1:])
+    bearing = get_bearing(latitude[:-1], longitude[:-1], latitude[1:], longitude[1:])
+    for k in range(len(distance)):
+        args = (latitude[k], longitude[k], latitude[k + 1], longitude[k + 1])
+        assert distance[k] == pytest.approx(gpxpy.geo.haversine_distance(*args), rel=1e-9)
+        course = gpxpy.geo.get_course(*args, loxodromic=False)
+        assert (bearing[k] - course + 180.) % 360. - 180. == pytest.approx(0., abs=1e-6)
+
+    # Long distances (haversine)
+    assert get_distance(0., 0., 0., 180.) == pytest.approx(np.pi * gpxpy.geo.EARTH_RADIUS)
+    assert get_distance(48.4, -4.5, 40.7, -74.0) == pytest.approx(gpxpy.geo.haversine_distance(48.4, -4.5, 40.7, -74.0))
+    assert get_bearing(48.4, -4.5, 49.4, -4.5) == pytest.approx(0.)
+    assert get_bearing(48.4, -4.5, 48.4, -5.5) == pytest.approx(270., abs=0.5)
+
+
+def test_speed_and_distance(tmp_path):
+    # Speed and distance of the log against gpxpy (2d distance of gpxpy approximated for the short steps)
+    file_name = str(tmp_path / "track.gpx")
+    content = write_track(file_name, *get_track(), segments=1)
+    points = get_gpxpy_points(content)
+    gpx = SeafoilGpx(file_name, data_folder=str(tmp_path / "data"))
+
+    assert gpx.nb_elements == len(points)
+    assert gpx.starting_time == points[0].time
+    assert np.allclose(gpx.time, [(point.time - points[0].time).total_seconds() for point in points])
+    speed = [0.] + [point.speed_between(previous) for previous, point in zip(points[:-1], points[1:])]
+    assert np.allclose(gpx.speed, speed, rtol=1e-3)
+    assert gpx.distance[-1] == pytest.approx(gpxpy.parse(content).length_2d(), rel=1e-3)
+    distance = np.cumsum([0.] + [gpxpy.geo.haversine_distance(previous.latitude, previous.longitude,
+                                                              point.latitude, point.longitude)
+                                 for previous, point in zip(points[:-1], points[1:])])
+    assert np.allclose(gpx.distance, distance, rtol=1e-9)
+
+
+def test_points_without_time_and_extensions(tmp_path):
+    # Points without time (or with a time that can not be read) ignored, extensions with undeclared prefixes skipped
+    file_name = str(tmp_path / "track.gpx")
+    content = write_track(file_name, *get_track(50), segments=1)
+    lines = content.splitlines()
+    points = [k for k, line in enumerate(lines) if "<trkpt" in line]
+    for k in points[::7]:
+        lines[k + 1] = ""
+    for k in points[3::5]:
+        lines[k] += extension
+    lines[points[10] + 1] = "<time>garbage</time>"
+    lines[points[11] + 1] = "<time>2024-05-01T12:00:11+02:00</time>"
+    content = "\n".join(lines)
+    with open(file_name, 'w') as file:
+        file.write(content)
+
+    read = SeafoilGpxReader().read(file_name)
+    expected = [point for point in get_gpxpy_points(content.replace("<time>garbage</time>", ""))]
+    assert len(expected) == 50 - len(points[::7]) - 1
+    check_points(read, expected)
+    # Time zone of the time taken into account
+    assert datetime.datetime(2024, 5, 1, 10, 0, 11, tzinfo=datetime.timezone.utc).timestamp() in read[0]
+
+
+def test_truncated_file(tmp_path):
+    # Points read before the end of the file kept
+    file_name = str(tmp_path / "track.gpx")
+    content = write_track(file_name, *get_track(100), segments=1)
+    with open(file_name, 'w') as file:
+        file.write(content[:len(content) // 2])
+
+    time_gnss, latitude, longitude = SeafoilGpxReader().read(file_name)
+    points = get_gpxpy_points(content)
+    assert 0 < len(time_gnss) < len(points)
+    check_points((time_gnss, latitude, longitude), points[:len(time_gnss)])
+
+
+def test_no_point(tmp_path):
+    file_name = str(tmp_path / "empty.gpx")
+    with open(file_name, 'w') as file:
+        file.write(gpxpy.gpx.GPX().to_xml())
+    time_gnss, latitude, longitude = SeafoilGpxReader().read(file_name)
+    assert len(time_gnss) == len(latitude) == len(longitude) == 0
@@ -0,0 +1,132 @@
+import os
+
+import numpy as np
+import pytest
+
+from log_analyzer.seafoil_data.seafoil_log_store import SeafoilLogStore, store_footer
+from log_analyzer.seafoil_data.seafoil_string_column import SeafoilStringColumn
+
+# Tests of the log store (single file with the columns of a log)
+# example: python3 -m pytest test_log_store.py
+
+
+def get_columns(n=1000):
+    return {"time": np.arange(n, dtype='double') * 0.04,
+            "speed": np.linspace(0., 20., n, dtype='float32'),
+            "mode": (np.arange(n) % 4).astype('uint8'),
+            "position": np.ones((n, 3), dtype='int64'),
+            "empty": np.zeros(0, dtype='double'),
+            "name": np.array(["node_" + str(i % 3) for i in range(n)], dtype=object),
+            "msg": np.array(["message " + str(i) + " é" for i in range(n)], dtype=object)}
+
+
+def check_columns(loaded, columns):
+    assert sorted(loaded.keys()) == sorted(columns.keys())
+    for name, column in columns.items():
+        if column.dtype.hasobject:
+            assert isinstance(loaded[name], SeafoilStringColumn)
+            assert list(loaded[name]) == list(column)
+        else:
+            assert loaded[name].dtype == column.dtype
+            assert np.array_equal(loaded[name], column)
+
+
+def test_round_trip(tmp_path):
+    file_name = str(tmp_path / "data" / "log.store")
+    columns = get_columns()
+    store = SeafoilLogStore(file_name)
+    store.save_group("/gps/fix", columns)
+    check_columns(store.load_group("/gps/fix"), columns)
+
+    # Opened again (directory read from the file)
+    store = SeafoilLogStore(file_name)
+    assert store.get_groups() == ["/gps/fix"]
+    check_columns(store.load_group("/gps/fix"), columns)
+    loaded = store.load_group("/gps/fix", names=["time", "name"])
+    assert sorted(loaded.keys()) == ["name", "time"]
+    assert loaded["name"][-1] == columns["name"][-1]
+
+
+def test_replace_and_remove_groups(tmp_path):
+    file_name = str(tmp_path / "log.store")
+    store = SeafoilLogStore(file_name)
+    store.save_group("signal:a", {"value": np.arange(10)})
+    store.save_group("signal:b", {"value": np.arange(20)})
+    store.save_group("signal:a", {"value": np.arange(30)})
+    assert np.array_equal(store.load_group("signal:a")["value"], np.arange(30))
+    assert np.array_equal(store.load_group("signal:b")["value"], np.arange(20))
+    assert store.get_unused_size() > 0
+
+    store.remove_group("signal:a")
+    assert not store.has_group("signal:a")
+    store = SeafoilLogStore(file_name)
+    assert store.get_groups() == ["signal:b"]
+    assert np.array_equal(store.load_group("signal:b")["value"], np.arange(20))
+
+
+def test_compact(tmp_path):
+    # Arrays of the replaced groups removed from the file when they are larger than the used ones
+    file_name = str(tmp_path / "log.store")
+    store = SeafoilLogStore(file_name)
+    for i in range(4):
+        store.save_group("signal:a", {"value": np.full(200000, i, dtype='double')})
+    assert store.get_unused_size() <= store.get_used_size()
+    assert os.path.getsize(file_name) < 3 * 200000 * 8
+    assert np.all(SeafoilLogStore(file_name).load_group("signal:a")["value"] == 3)
+
+
+@pytest.mark.parametrize("corruption", ["truncated", "magic", "directory"])
+def test_corrupted_footer(tmp_path, corruption):
+    # Interrupted write: empty store, saved again from the start
+    file_name = str(tmp_path / "log.store")
+    SeafoilLogStore(file_name).save_group("/gps/fix", get_columns())
+    size = os.path.getsize(file_name)
+    with open(file_name, 'r+b') as file:
+        if corruption == "truncated":
+            file.truncate(size - 3)
+        elif corruption == "magic":
+            file.seek(size - 1)
+            file.write(b'X')
+        else:
+            end_offset = store_footer.unpack(file.read()[-store_footer.size:])[0]
+            file.seek(end_offset)
+            file.write(b'}')
+
+    store = SeafoilLogStore(file_name)
+    assert store.get_groups() == []
+    assert not store.has_group("/gps/fix")
+    store.save_group("/gps/fix", {"time": np.arange(5.)})
+    assert SeafoilLogStore(file_name).get_groups() == ["/gps/fix"]
+
+
+def test_object_array_refused(tmp_path):
+    # Python objects other than strings are never pickled
+    store = SeafoilLogStore(str(tmp_path / "log.store"))
+    with pytest.raises(ValueError):
+        store.save_group("/rosout", {"value": np.array([1, "a", None], dtype=object)})
+
+
+def test_string_column_index(tmp_path):
+    # Strings indexed from the end (as lists), out of range indexes refused
+    file_name = str(tmp_path / "log.store")
+    columns = {"name": np.array(["node_" + str(i % 3) for i in range(10)], dtype=object),
+               "msg": np.array(["message " + str(i) for i in range(10)], dtype=object)}
+    SeafoilLogStore(file_name).save_group("/rosout", columns)
+    loaded = SeafoilLogStore(file_name).load_group("/rosout")
+    for name in columns:
+        assert loaded[name][-1] == columns[name][-1]
+        assert loaded[name][-10] == columns[name][0]
+        assert list(loaded[name][-3:]) == list(columns[name][-3:])
+        with pytest.raises(IndexError):
+            loaded[name][10]
+        with pytest.raises(IndexError):
+            loaded[name][-11]
+
+
+@pytest.mark.parametrize("compression", ["zstd", "lz4"])
+def test_compression(tmp_path, compression):
+    pytest.importorskip({"zstd": "zstandard", "lz4": "lz4"}[compression])
+    file_name = str(tmp_path / "log.store")
+    columns = get_columns()
+    SeafoilLogStore(file_name).save_group("/gps/fix", columns, compression=compression)
+    check_columns(SeafoilLogStore(file_name).load_group("/gps/fix"), columns)
@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+
+from log_analyzer.tools.seafoil_manoeuvres import get_manoeuvres, manoeuvre_jibe, manoeuvre_tack
+from log_analyzer.tools.seafoil_statistics import SeafoilStatistics
+
+# Tests of the segmentation of the jibes and tacks
+# example: python3 -m pytest test_manoeuvres.py
+
+manoeuvre_fields = ["start", "end", "starting_time", "ending_time", "type", "heading_change", "mid_heading",
+                    "entry_speed", "minimum_speed", "exit_speed"]
+
+
+def get_track(segments, dt=0.2, speed=8., turn_speed=5.):
+    # Track (degrees) and speed of segments (duration in s, turn rate in deg/s), slower in the turns
+    time = [0.]
+    heading = [0.]
+    speeds = [speed]
+    for duration, turn_rate in segments:
+        for k in range(int(round(duration / dt))):
+            time.append(time[-1] + dt)
+            heading.append(heading[-1] + turn_rate * dt)
+            speeds.append(speed if turn_rate == 0 else turn_speed)
+    return np.array(time), np.array(heading) % 360., np.array(speeds)
+
+
+def check_empty(manoeuvres):
+    assert sorted(manoeuvres.keys()) == sorted(manoeuvre_fields)
+    assert all(len(manoeuvres[name]) == 0 for name in manoeuvre_fields)
+
+
+@pytest.mark.parametrize("n", [0, 1])
+def test_no_samples(n):
+    check_empty(get_manoeuvres(np.arange(n, dtype='double'), np.zeros(n), np.full(n, 8.)))
+
+
+def test_no_turns():
+    time, track, speed = get_track([(120., 0.)])
+    check_empty(get_manoeuvres(time, track, speed))
+
+    # Slow turns, and turns of less than 90 degrees
+    time, track, speed = get_track([(30., 0.), (30., 6.), (30., 0.), (2., -30.), (30., 0.)])
+    check_empty(get_manoeuvres(time, track, speed))
+
+
+def test_jibes_and_tacks():
+    # Two jibes through 90 degrees (downwind) and a tack through 270 degrees
+    time, track, speed = get_track([(30., 0.), (5., 36.), (30., 0.), (5., -36.), (30., 0.), (5., -36.), (30., 0.)])
+    manoeuvres = get_manoeuvres(time, track, speed)
+    assert len(manoeuvres["start"]) == 3
+    assert np.array_equal(manoeuvres["type"], [manoeuvre_jibe, manoeuvre_jibe, manoeuvre_tack])
+    assert np.allclose(manoeuvres["heading_change"], [180., -180., -180.])
+    assert np.allclose(manoeuvres["mid_heading"], [90., 90., 270.])
+    assert np.allclose(manoeuvres["starting_time"], time[manoeuvres["start"]])
+    assert np.all(np.abs(manoeuvres["starting_time"] - [30., 65., 100.]) <= 0.5)
+    assert np.allclose(manoeuvres["entry_speed"], 8.)
+    assert np.allclose(manoeuvres["minimum_speed"], 5.)
+    assert np.allclose(manoeuvres["exit_speed"], 8.)
+
+
+def test_slow_entry():
+    time, track, speed = get_track([(30., 0.), (5., 36.), (30., 0.)], speed=3., turn_speed=2.)
+    check_empty(get_manoeuvres(time, track, speed))
+    assert len(get_manoeuvres(time, track, speed, entry_speed_min=2.)["start"]) == 1
+
+
+def test_turn_at_start():
+    # No speed before the first sample: rejected by the entry speed
+    time, track, speed = get_track([(5., 36.), (30., 0.)])
+    check_empty(get_manoeuvres(time, track, speed))
+    manoeuvres = get_manoeuvres(time, track, speed, entry_speed_min=0.)
+    assert np.array_equal(manoeuvres["start"], [0])
+    assert np.allclose(manoeuvres["exit_speed"], 8.)
+
+
+def test_turn_at_end():
+    # Exit speed of the last samples (mean speed ending at the last sample)
+    time, track, speed = get_track([(30., 0.), (5., 36.)])
+    manoeuvres = get_manoeuvres(time, track, speed)
+    assert len(manoeuvres["start"]) == 1
+    assert manoeuvres["end"][0] == len(time) - 1
+    assert np.allclose(manoeuvres["heading_change"], 180.)
+    assert np.isclose(manoeuvres["exit_speed"][0], speed[-1])
+
+
+def test_wind_heading():
+    # Wind heading of the configuration (direction the wind comes from) instead of the estimation from the turns
+    time, track, speed = get_track([(30., 0.), (5., 36.), (30., 0.), (5., -36.), (30., 0.), (5., -36.), (30., 0.)])
+    assert np.array_equal(get_manoeuvres(time, track, speed, wind_heading=270.)["type"],
+                          [manoeuvre_jibe, manoeuvre_jibe, manoeuvre_tack])
+    assert np.array_equal(get_manoeuvres(time, track, speed, wind_heading=90.)["type"],
+                          [manoeuvre_tack, manoeuvre_tack, manoeuvre_jibe])
+
+    # Single tack: estimated as a jibe (most common manoeuvre)
+    time, track, speed = get_track([(30., 0.), (5., 36.), (30., 0.)])
+    assert np.array_equal(get_manoeuvres(time, track, speed)["type"], [manoeuvre_jibe])
+    assert np.array_equal(get_manoeuvres(time, track, speed, wind_heading=80.)["type"], [manoeuvre_tack])
+
+
+@pytest.mark.parametrize("configuration, wind_heading", [(None, None), ({}, None), ({"analysis": {}}, None),
+                                                          ({"analysis": {"wind_heading": 0}}, None),
+                                                          ({"analysis": {"wind_heading": 225.0}}, 225.)])
+def test_configuration_wind_heading(configuration, wind_heading):
+    # Default wind heading of the configuration (0) not used
+    assert SeafoilStatistics.get_wind_heading(configuration) == wind_heading
+    graph = SeafoilStatistics.get_graph({}, configuration=configuration)
+    assert graph.get_parameters("manoeuvres")["wind_heading"] == wind_heading
@@ -0,0 +1,129 @@
+import os
+
+import pytest
+
+from log_analyzer.seafoil_data.seafoil_mcap_reader import SeafoilMcapBackend, SeafoilMcapFile, parse_ros2msg, \
+    convert_ros2msg_type
+
+# Tests of the mcap reader on generated rosbags: chunked, without chunks, truncated, and read in a time window
+# example: python3 -m pytest test_mcap_reader.py
+
+topics = ["/sample", "/text"]
+
+
+def get_mcap_file(bag_path):
+    return os.path.join(bag_path, os.path.basename(bag_path) + "_0.mcap")
+
+
+def read_messages(backend, topics, start_time=None, end_time=None):
+    # Messages read, filtered as the bag reader (start excluded, end included)
+    return [(topic, data, t) for topic, data, t in backend.read_messages(topics, start_time, end_time)
+            if (start_time is None or t > start_time) and (end_time is None or t <= end_time)]
+
+
+def get_expected(messages, topics, start_time=None, end_time=None):
+    return [(topic, data, t) for topic, t, data in messages if topic in topics
+            and (start_time is None or t > start_time) and (end_time is None or t <= end_time)]
+
+
+@pytest.mark.parametrize("chunk_size", [1000, 1, None])
+def test_read_messages(mcap_bag, chunk_size):
+    bag_path, messages = mcap_bag(chunk_size=chunk_size)
+    backend = SeafoilMcapBackend([get_mcap_file(bag_path)])
+    assert read_messages(backend, topics) == get_expected(messages, topics)
+    assert read_messages(backend, ["/text"]) == get_expected(messages, ["/text"])
+    assert read_messages(backend, ["/unknown"]) == []
+
+    metadata = backend.read_metadata()
+    assert metadata["topics"]["/sample"] == {"type": "test_msgs/msg/Sample", "message_count": 3000}
+    assert metadata["topics"]["/text"]["message_count"] == 300
+    assert metadata["starting_time"] == messages[0][1]
+    assert metadata["ending_time"] == messages[-1][1]
+
+
+@pytest.mark.parametrize("chunk_size", [1000, None])
+def test_read_chunks(mcap_bag, chunk_size):
+    # Chunks read one by one (process pool): same messages, in recording order
+    bag_path, messages = mcap_bag(chunk_size=chunk_size)
+    backend = SeafoilMcapBackend([get_mcap_file(bag_path)])
+    chunks = backend.get_chunks(topics)
+    assert len(chunks) > 0
+    assert [message for chunk in chunks for message in backend.read_chunk(chunk, topics)] \
+        == get_expected(messages, topics)
+
+
+@pytest.mark.parametrize("chunk_size", [1000, None])
+def test_read_without_summary(mcap_bag, chunk_size):
+    # Recording interrupted: no summary, the file is scanned
+    bag_path, messages = mcap_bag(chunk_size=chunk_size, summary=False)
+    mcap_file = SeafoilMcapFile(get_mcap_file(bag_path))
+    assert len(mcap_file.chunk_indexes) > 0
+    assert sum(mcap_file.message_count.values()) == len(messages)
+    assert read_messages(SeafoilMcapBackend([mcap_file.file_path]), topics) == get_expected(messages, topics)
+
+
+@pytest.mark.parametrize("chunk_size", [1000, None])
+def test_read_truncated(mcap_bag, chunk_size):
+    # Footer and end of the last chunk missing: the complete chunks (or messages) are read
+    bag_path, messages = mcap_bag(chunk_size=chunk_size)
+    file_path = get_mcap_file(bag_path)
+    with open(file_path, 'r+b') as file:
+        file.truncate(int(os.path.getsize(file_path) * 0.8))
+    backend = SeafoilMcapBackend([file_path])
+    read = read_messages(backend, topics)
+    assert 0 < len(read) < len(messages)
+    assert read == get_expected(messages, topics)[:len(read)]
+    assert backend.read_metadata()["topics"]["/sample"]["message_count"] \
+        == sum(1 for topic, _, _ in read if topic == "/sample")
+
+
+@pytest.mark.parametrize("chunk_size", [400, None])
+def test_read_window(mcap_bag, chunk_size):
+    bag_path, messages = mcap_bag(chunk_size=chunk_size)
+    backend = SeafoilMcapBackend([get_mcap_file(bag_path)])
+    start_time, end_time = messages[1000][1], messages[2000][1]
+    assert read_messages(backend, topics, start_time, end_time) == get_expected(messages, topics, start_time,
+                                                                                 end_time)
+    if chunk_size is not None:
+        # Chunks entirely outside the window are not read
+        assert len(backend.get_chunks(topics, start_time, end_time)) < len(backend.get_chunks(topics))
+    assert read_messages(backend, topics, messages[-1][1] + 1) == []
+
+
+def test_schema(mcap_bag):
+    bag_path, messages = mcap_bag(nb_messages=10)
+    backend = SeafoilMcapBackend([get_mcap_file(bag_path)])
+    assert backend.get_type_map() == {"/sample": "test_msgs/msg/Sample", "/text": "test_msgs/msg/Text"}
+    assert backend.get_fields("test_msgs/msg/Sample") == {"header": "std_msgs/Header", "value": "double",
+                                                          "index": "int32", "vector": "float[3]"}
+    # Constants and comments skipped
+    assert backend.get_fields("test_msgs/Text") == {"header": "std_msgs/Header", "level": "uint8",
+                                                    "text": "string", "values": "sequence<float>"}
+    assert backend.get_fields("std_msgs/Header") == {"stamp": "builtin_interfaces/Time", "frame_id": "string"}
+
+    msg = backend.deserialize(messages[1][2], "test_msgs/msg/Text")
+    assert msg.level == 20 and msg.text == "" and len(msg.values) == 0
+    msg = backend.deserialize(messages[0][2], "test_msgs/msg/Sample")
+    assert msg.header.frame_id == "base_link" and msg.header.stamp.sec == messages[0][1] // 1000000000
+
+
+def test_ros2msg_types():
+    assert convert_ros2msg_type("float64[]", "pkg") == "sequence<double>"
+    assert convert_ros2msg_type("int32[<=5]", "pkg") == "sequence<int32, 5>"
+    assert convert_ros2msg_type("uint8[16]", "pkg") == "uint8[16]"
+    assert convert_ros2msg_type("Point", "geometry_msgs") == "geometry_msgs/Point"
+    assert convert_ros2msg_type("geometry_msgs/msg/Point[2]", "pkg") == "geometry_msgs/Point[2]"
+    assert convert_ros2msg_type("string<=10", "pkg") == "string<=10"
+    assert parse_ros2msg("pkg/msg/A", "int8 X=1\nstring S=\"a=b\"\nbool flag # comment\nB b\n"
+                                      "===\nMSG: pkg/B\nchar c") \
+        == {"pkg/A": {"flag": "boolean", "b": "pkg/B"}, "pkg/B": {"c": "uint8"}}
+
+
+@pytest.mark.parametrize("compression", ["zstd", "lz4"])
+def test_compressed_chunks(mcap_bag, compression):
+    pytest.importorskip({"zstd": "zstandard", "lz4": "lz4"}[compression])
+    from conftest import write_mcap
+    bag_path, messages = mcap_bag(nb_messages=500)
+    write_mcap(get_mcap_file(bag_path), messages, chunk_size=200, compression=compression)
+    backend = SeafoilMcapBackend([get_mcap_file(bag_path)])
+    assert read_messages(backend, topics) == get_expected(messages, topics)
@@ -0,0 +1,122 @@
+import numpy as np
+import pytest
+
+from log_analyzer.tools.seafoil_speed import get_speed_for_distances, get_speed_for_durations, get_best_windows
+
+# Tests of the speed engines against the loops they replace
+# example: python3 -m pytest test_speed.py
+
+
+def compute_speed_for_distance(time, distance_data, distance):
+    # Previous loop of SeafoilStatistics (speed over a distance ending at each sample)
+    speed_distance = np.zeros(len(distance_data))
+    d0_idx_last = 0
+    for d1_idx in range(1, len(distance_data)):
+        d1 = distance_data[d1_idx]
+        d0 = distance_data[d0_idx_last]
+        if (d1 - d0) >= distance:
+            for d0_idx in range(d0_idx_last, d1_idx):
+                d0 = distance_data[d0_idx]
+                if d1 - d0 <= distance:
+                    dt = time[d1_idx] - time[d0_idx]
+                    if dt > 0:
+                        speed_distance[d1_idx] = (d1 - d0) / dt
+                    else:
+                        speed_distance[d1_idx] = 0
+                    d0_idx_last = max(0, d0_idx - 1)
+                    break
+    return speed_distance
+
+
+def get_track(n, seed=0):
+    # Cumulative distance with stops, jumps longer than the distances and repeated time stamps
+    rng = np.random.default_rng(seed)
+    step = rng.exponential(0.4, n)
+    step[rng.random(n) < 0.02] = 0.
+    step[rng.random(n) < 0.002] = 600.
+    time = np.cumsum(np.where(rng.random(n) < 0.01, 0., 0.04))
+    return time, np.cumsum(step)
+
+
+@pytest.mark.parametrize("n", [0, 1, 2, 5, 3000])
+def test_speed_for_distances(n):
+    time, distance = get_track(n)
+    distances = [100., 500., 1852.]
+    speed_distances = get_speed_for_distances(time, distance, distances)
+    for d in distances:
+        speed, start = speed_distances[d]
+        assert np.array_equal(speed, compute_speed_for_distance(time, distance, d))
+        assert len(start) == n and np.all(start <= np.arange(n))
+
+
+def test_speed_for_distances_constant_speed():
+    # Steps of 2 m in 0.5 s (exact): windows of 250 steps
+    time = np.arange(1000) * 0.5
+    speed, start = get_speed_for_distances(time, 4. * time, [500.])[500.]
+    assert np.all(speed[:250] == 0.)
+    assert np.all(speed[250:] == 4.)
+    assert np.array_equal(start[250:], np.arange(750))
+
+
+def get_mean_speed(time, speed, start_time, end_time, max_time_step):
+    # Integral of the speed held until the next sample, step by step (null over the gaps)
+    integral = 0.
+    for k in range(len(time) - 1):
+        dt = time[k + 1] - time[k]
+        if dt <= 0 or dt > max_time_step:
+            continue
+        overlap = min(time[k + 1], end_time) - max(time[k], start_time)
+        if overlap > 0:
+            integral += speed[k] * overlap
+    return integral / (end_time - start_time)
+
+
+def get_gnss_track(n, seed=0):
+    # Samples of the receiver with jitter, gaps and repeated time stamps
+    rng = np.random.default_rng(seed)
+    dt = rng.uniform(0.1, 0.3, n)
+    dt[rng.random(n) < 0.02] = 3.
+    dt[rng.random(n) < 0.02] = 0.
+    speed = np.abs(rng.normal(10., 3., n))
+    speed[rng.random(n) < 0.01] = np.nan
+    return np.cumsum(dt), speed
+
+
+@pytest.mark.parametrize("n", [0, 1, 2, 500])
+def test_speed_for_durations(n):
+    time, speed = get_gnss_track(n)
+    durations = [2., 10.]
+    speed_durations = get_speed_for_durations(time, speed, durations)
+    for duration in durations:
+        expected = np.full(n, np.nan)
+        for i in range(n):
+            if time[i] - duration >= time[0]:
+                expected[i] = get_mean_speed(time, np.nan_to_num(speed), time[i] - duration, time[i], 1.0)
+        assert np.allclose(speed_durations[duration], expected, equal_nan=True)
+
+
+def test_best_windows():
+    time, speed = get_gnss_track(2000, seed=1)
+    duration = 10.
+    speed_duration = get_speed_for_durations(time, speed, [duration])[duration]
+    windows = get_best_windows(time, speed_duration, duration, 5)
+    assert len(windows) == 5
+
+    # Greedy selection: best window, then the best one not overlapping the windows already selected
+    candidates = np.where(np.isnan(speed_duration), -np.inf, speed_duration)
+    for end, mean_speed in windows:
+        assert mean_speed == candidates.max()
+        assert speed_duration[end] == mean_speed
+        candidates[np.abs(time - time[end]) < duration] = -np.inf
+    ends = np.sort([time[end] for end, _ in windows])
+    assert np.all(np.diff(ends) >= duration)
+
+
+def test_best_windows_short_log():
+    # Less windows than requested (log shorter than the duration, or empty)
+    time = np.arange(50) * 0.2
+    speed_duration = get_speed_for_durations(time, np.ones(50), [10.])[10.]
+    assert get_best_windows(time, speed_duration, 10., 5) == []
+    assert get_best_windows(np.zeros(0), np.zeros(0), 10., 5) == []
+    speed_duration = get_speed_for_durations(time, np.ones(50), [5.])[5.]
+    assert len(get_best_windows(time, speed_duration, 5., 5)) == 1